@@ -0,0 +1,64 @@
+"""Microbenchmark of the auth dependency with and without the token/user caches.
+
+Usage::
+
+    python -m benchmarks.bench_auth --iterations 5000
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+from fastapi import HTTPException
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from contacts_api import async_crud, auth_cache
+from contacts_api.auth import create_access_token, decode_access_token
+from contacts_api.database import Base
+from contacts_api.models import User
+
+async def uncached(db, token):
+    """The auth dependency as it was: verify the JWT and load the user row on every request."""
+    payload = decode_access_token(token)
+    if payload is None:
+        raise HTTPException(status_code=401)
+    return await async_crud.get_user_by_id(db, int(payload["sub"]))
+
+async def run(iterations: int) -> dict:
+    """Times `iterations` authentications per path and counts the queries issued."""
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}", connect_args={"check_same_thread": False})
+        Base.metadata.create_all(bind=engine)
+        queries = []
+        event.listen(engine, "before_cursor_execute", lambda *args: queries.append(1))
+        db = sessionmaker(bind=engine)()
+        user = User(username="bench", email="bench@example.com", hashed_password="x")
+        db.add(user)
+        db.commit()
+        token = create_access_token({"sub": str(user.id)})
+
+        results = {}
+        for label, dependency in (("uncached", uncached), ("cached", auth_cache.load_current_user)):
+            queries.clear()
+            start = time.perf_counter()
+            for _ in range(iterations):
+                await dependency(db, token)
+            elapsed = time.perf_counter() - start
+            results[label] = {"us_per_call": elapsed / iterations * 1e6, "queries": len(queries)}
+        results["cache"] = auth_cache.cache_stats()
+        db.close()
+        engine.dispose()
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=5000)
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args.iterations))
+    for label in ("uncached", "cached"):
+        print(f"{label:>9}: {results[label]['us_per_call']:8.1f} us/call  {results[label]['queries']:6} queries")
+    print(f"    cache: {results['cache']}")
+
+if __name__ == "__main__":
+    main()
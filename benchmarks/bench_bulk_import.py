@@ -0,0 +1,66 @@
+"""Compares the per-row contact insert path with the bulk import path.
+
+Runs against a throwaway on-disk SQLite database so commit/fsync costs are
+included. Usage::
+
+    python -m benchmarks.bench_bulk_import --rows 5000
+"""
+import argparse
+import os
+import tempfile
+import time
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from contacts_api import bulk, crud
+from contacts_api.database import Base
+from contacts_api.models import User
+
+def make_records(count: int) -> list[dict]:
+    """Builds `count` distinct, valid contact records."""
+    return [
+        {
+            "first_name": f"First{i}",
+            "last_name": f"Last{i % 97}",
+            "email": f"contact{i}@example.com",
+            "phone_number": f"+1555{i:07d}",
+        }
+        for i in range(count)
+    ]
+
+def run(rows: int) -> dict:
+    """Times both insert paths on a fresh database each and returns the timings in seconds."""
+    records = make_records(rows)
+    timings = {}
+    for label in ("per_row", "bulk"):
+        with tempfile.TemporaryDirectory() as tmp:
+            engine = create_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+            Base.metadata.create_all(bind=engine)
+            db = sessionmaker(autocommit=False, autoflush=False, bind=engine)()
+            user = User(username="bench", email="bench@example.com", hashed_password="x")
+            db.add(user)
+            db.commit()
+
+            start = time.perf_counter()
+            if label == "per_row":
+                for record in records:
+                    crud.create_contact(db, user.id, record)
+            else:
+                bulk.import_contacts(db, user.id, records)
+            timings[label] = time.perf_counter() - start
+
+            db.close()
+            engine.dispose()
+    return timings
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=5000)
+    args = parser.parse_args()
+
+    timings = run(args.rows)
+    for label, seconds in timings.items():
+        print(f"{label:>8}: {seconds:8.3f}s  {args.rows / seconds:10.0f} rows/s")
+    print(f"speedup: {timings['per_row'] / timings['bulk']:.1f}x")
+
+if __name__ == "__main__":
+    main()
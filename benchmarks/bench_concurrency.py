@@ -0,0 +1,138 @@
+"""Load-tests the contact routes with the sync and the async database layer.
+
+Starts the app under uvicorn once per layer (USE_ASYNC_DB=false/true) on a
+seeded throwaway SQLite database, then drives GET /contacts/ with a growing
+number of concurrent clients and reports throughput and latency percentiles.
+The sync layer flattens out at the threadpool size; the async layer keeps
+scaling until the database itself is saturated. Results are stored as JSON
+for `benchmarks.results compare`. Usage::
+
+    python -m benchmarks.bench_concurrency --concurrency 10 40 100 200 --duration 5
+"""
+import argparse
+import asyncio
+import os
+import shutil
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import httpx
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker
+from benchmarks import results
+from contacts_api.auth import create_access_token
+from contacts_api.database import Base
+from contacts_api.models import Contact, User
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def seed(directory: str, contacts: int) -> str:
+    """Creates contacts.db in `directory` with one user and returns a token for that user."""
+    engine = create_engine(f"sqlite:///{os.path.join(directory, 'contacts.db')}")
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine)()
+    user = User(username="bench", email="bench@example.com", hashed_password="x")
+    db.add(user)
+    db.commit()
+    db.execute(
+        insert(Contact),
+        [{"first_name": f"First{i}", "last_name": f"Last{i}", "user_id": user.id} for i in range(contacts)],
+    )
+    db.commit()
+    token = create_access_token({"sub": str(user.id)})
+    db.close()
+    engine.dispose()
+    return token
+
+def free_port() -> int:
+    """Returns a TCP port that is free right now."""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def start_server(directory: str, port: int, use_async: bool, env: dict = None) -> subprocess.Popen:
+    """Starts uvicorn serving the app from `directory`, with extra environment `env`, and waits until it answers."""
+    env = {**os.environ, "PYTHONPATH": ROOT, "USE_ASYNC_DB": "true" if use_async else "false", **(env or {})}
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "contacts_api.main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=directory,
+        env=env,
+    )
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            httpx.get(f"http://127.0.0.1:{port}/", timeout=1)
+            return process
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    process.kill()
+    raise RuntimeError("Server did not start")
+
+async def load(url: str, token: str, concurrency: int, duration: float) -> dict:
+    """Keeps `concurrency` requests in flight for `duration` seconds and summarizes the latencies."""
+    latencies, errors = [], 0
+    deadline = time.monotonic() + duration
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(headers={"Authorization": f"Bearer {token}"}, limits=limits, timeout=30) as client:
+        async def worker():
+            nonlocal errors
+            while time.monotonic() < deadline:
+                start = time.perf_counter()
+                try:
+                    response = await client.get(url, params={"limit": 50})
+                    failed = response.status_code != 200
+                except httpx.HTTPError:
+                    failed = True
+                errors += failed
+                latencies.append((time.perf_counter() - start) * 1000)
+
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+
+    quantiles = statistics.quantiles(latencies, n=100)
+    return {
+        "rps": len(latencies) / duration,
+        "p50": quantiles[49],
+        "p99": quantiles[98],
+        "errors": errors,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[10, 40, 100, 200])
+    parser.add_argument("--duration", type=float, default=5.0)
+    parser.add_argument("--contacts", type=int, default=2000)
+    parser.add_argument("--output", help="directory of the JSON results")
+    args = parser.parse_args()
+
+    measured = {}
+    print(f"{'layer':>6} {'clients':>8} {'req/s':>8} {'p50 ms':>8} {'p99 ms':>8} {'errors':>7}")
+    for use_async in (False, True):
+        directory = tempfile.mkdtemp()
+        try:
+            token = seed(directory, args.contacts)
+            port = free_port()
+            server = start_server(directory, port, use_async)
+            try:
+                for concurrency in args.concurrency:
+                    result = asyncio.run(
+                        load(f"http://127.0.0.1:{port}/contacts/", token, concurrency, args.duration)
+                    )
+                    measured[f"{'async' if use_async else 'sync'}_{concurrency}"] = result
+                    print(
+                        f"{'async' if use_async else 'sync':>6} {concurrency:>8} {result['rps']:>8.0f} "
+                        f"{result['p50']:>8.1f} {result['p99']:>8.1f} {result['errors']:>7}"
+                    )
+            finally:
+                server.terminate()
+                server.wait()
+        finally:
+            shutil.rmtree(directory, ignore_errors=True)
+    path = results.save("concurrency", measured, args.output, database_url="sqlite (file, WAL)")
+    print(f"Results written to {path}")
+
+if __name__ == "__main__":
+    main()
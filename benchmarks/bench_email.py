@@ -0,0 +1,109 @@
+"""Request latency of sending email inline versus enqueueing it in the outbox.
+
+Runs against a local aiosmtpd server that adds `--handshake-delay` to every
+new session (standing in for TCP and TLS setup to a remote server) and
+`--smtp-delay` to every message.
+
+Usage::
+
+    python -m benchmarks.bench_email --messages 200 --handshake-delay 30 --smtp-delay 10
+"""
+import argparse
+import asyncio
+import os
+import socket
+import statistics
+import tempfile
+import time
+from email.message import EmailMessage
+import aiosmtplib
+from aiosmtpd.controller import Controller
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from contacts_api import outbox
+from contacts_api.database import Base
+
+class SlowHandler:
+    """Accepts every message after the configured delays."""
+
+    def __init__(self, handshake_delay: float, smtp_delay: float):
+        self.handshake_delay = handshake_delay
+        self.smtp_delay = smtp_delay
+        self.delivered = 0
+
+    async def handle_EHLO(self, server, session, envelope, hostname, responses):
+        await asyncio.sleep(self.handshake_delay)
+        session.host_name = hostname
+        return responses
+
+    async def handle_DATA(self, server, session, envelope):
+        await asyncio.sleep(self.smtp_delay)
+        self.delivered += 1
+        return "250 OK"
+
+def percentiles(samples: list[float]) -> dict:
+    """Returns p50/p95/p99 of `samples` in milliseconds."""
+    cuts = statistics.quantiles(samples, n=100)
+    return {"p50": cuts[49] * 1000, "p95": cuts[94] * 1000, "p99": cuts[98] * 1000}
+
+async def run(messages: int, handshake_delay: float, smtp_delay: float) -> dict:
+    """Times `messages` inline sends and enqueues, then the worker draining the queue."""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    handler = SlowHandler(handshake_delay, smtp_delay)
+    controller = Controller(handler, hostname="127.0.0.1", port=port)
+    controller.start()
+    results = {}
+    try:
+        inline = []
+        for i in range(messages):
+            message = EmailMessage()
+            message["From"], message["To"], message["Subject"] = "bench@example.com", f"user{i}@example.com", "Hi"
+            message.set_content("Body")
+            start = time.perf_counter()
+            await aiosmtplib.send(message, hostname="127.0.0.1", port=port, start_tls=False)
+            inline.append(time.perf_counter() - start)
+        results["inline"] = percentiles(inline)
+
+        with tempfile.TemporaryDirectory() as tmp:
+            engine = create_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}", connect_args={"check_same_thread": False})
+            Base.metadata.create_all(bind=engine)
+            factory = sessionmaker(bind=engine)
+            db = factory()
+            queued = []
+            for i in range(messages):
+                start = time.perf_counter()
+                await outbox.enqueue(db, f"user{i}@example{i % 20}.com", "Hi", "Body")
+                queued.append(time.perf_counter() - start)
+            results["queued"] = percentiles(queued)
+
+            smtp = outbox.SMTPConnection(hostname="127.0.0.1", port=port, use_tls=False, start_tls=False, login=False)
+            worker = outbox.OutboxWorker(session_factory=factory, smtp=smtp, rate_limiter=outbox.DomainRateLimiter(0))
+            start = time.perf_counter()
+            while await worker.process_batch():
+                pass
+            results["drain"] = {"seconds": time.perf_counter() - start, "smtp_sessions": smtp.connects}
+            await smtp.close()
+            db.close()
+            engine.dispose()
+    finally:
+        controller.stop()
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--messages", type=int, default=200)
+    parser.add_argument("--handshake-delay", type=float, default=30, help="milliseconds per SMTP session")
+    parser.add_argument("--smtp-delay", type=float, default=10, help="milliseconds per message")
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args.messages, args.handshake_delay / 1000, args.smtp_delay / 1000))
+    for label in ("inline", "queued"):
+        r = results[label]
+        print(f"{label:>6}: p50 {r['p50']:7.2f} ms  p95 {r['p95']:7.2f} ms  p99 {r['p99']:7.2f} ms")
+    drain = results["drain"]
+    print(f" drain: {args.messages} messages in {drain['seconds']:.2f} s over {drain['smtp_sessions']} SMTP session(s)")
+
+if __name__ == "__main__":
+    main()
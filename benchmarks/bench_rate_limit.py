@@ -0,0 +1,84 @@
+"""What the rate limiter costs on every request.
+
+Times a single limiter check on the in-memory backend (and on Redis when
+--redis-url is given), then the same tiny route served in-process with and
+without the app-wide RATE_LIMIT_DEFAULT dependency, so the difference is
+the per-request overhead. Usage::
+
+    python -m benchmarks.bench_rate_limit --requests 5000
+    python -m benchmarks.bench_rate_limit --redis-url redis://localhost:6379/15
+"""
+import argparse
+import asyncio
+import time
+import httpx
+from fastapi import Depends, FastAPI
+from redis import asyncio as aioredis
+from benchmarks import results
+from contacts_api import rate_limit
+from contacts_api.rate_limit import Rate, RateLimiter
+
+async def time_checks(limiter: RateLimiter, checks: int, keys: int) -> dict:
+    """Times `checks` allowed hits spread over `keys` keys."""
+    rate = Rate(10**9, 60)
+    start = time.perf_counter()
+    for i in range(checks):
+        await limiter.hit(f"bench:{i % keys}", rate)
+    elapsed = time.perf_counter() - start
+    return {"us_per_op": elapsed / checks * 1e6, "ops_per_s": checks / elapsed}
+
+async def time_route(limited: bool, requests: int) -> dict:
+    """Times `requests` sequential in-process requests to a trivial route."""
+    app = FastAPI(dependencies=[Depends(rate_limit.limit_route)] if limited else [])
+
+    @app.get("/ping")
+    async def ping():
+        return {"ok": True}
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for _ in range(100):
+            await client.get("/ping")
+        start = time.perf_counter()
+        for _ in range(requests):
+            await client.get("/ping")
+        elapsed = time.perf_counter() - start
+    return {"us_per_op": elapsed / requests * 1e6, "ops_per_s": requests / elapsed}
+
+async def run(checks: int, requests: int, redis_url: str = None) -> dict:
+    """Runs every measurement and returns them keyed by name."""
+    measured = {
+        "memory_check_hot_key": await time_checks(RateLimiter(), checks, keys=1),
+        "memory_check_100k_keys": await time_checks(RateLimiter(maxsize=100_000), checks, keys=100_000),
+    }
+    if redis_url:
+        client = aioredis.Redis.from_url(redis_url)
+        try:
+            limiter = RateLimiter(use_redis=True, redis_factory=lambda: client)
+            measured["redis_check"] = await time_checks(limiter, checks // 10, keys=1000)
+        finally:
+            await client.aclose()
+
+    rate_limit.settings.RATE_LIMIT_DEFAULT = "1000000000/minute"
+    measured["route_unlimited"] = await time_route(False, requests)
+    measured["route_limited"] = await time_route(True, requests)
+    measured["overhead_per_request"] = {
+        "us_per_op": measured["route_limited"]["us_per_op"] - measured["route_unlimited"]["us_per_op"]
+    }
+    return measured
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--checks", type=int, default=200_000)
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--redis-url", help="also time the Redis backend, e.g. redis://localhost:6379/15")
+    parser.add_argument("--output", help="directory of the JSON results")
+    args = parser.parse_args()
+
+    measured = asyncio.run(run(args.checks, args.requests, args.redis_url))
+    for name, row in measured.items():
+        print(f"{name:>24}: {row['us_per_op']:8.2f} us/op")
+    print(f"Results written to {results.save('rate_limit', measured, args.output)}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""Measures contact search latency against contact-book size.
+
+Compares the leading-wildcard ILIKE scan with the FTS5 index on a throwaway
+on-disk SQLite database. Usage::
+
+    python -m benchmarks.bench_search --sizes 1000 10000 100000
+"""
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import time
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker
+from contacts_api import search
+from contacts_api.database import Base
+from contacts_api.models import Contact, User
+
+WORDS = ["anna", "boris", "carla", "dmytro", "elena", "fedir", "galyna", "ivan", "kateryna", "lev",
+         "maria", "nazar", "olha", "petro", "roman", "sofia", "taras", "ulana", "vira", "yurii"]
+
+def seed(db, user_id: int, size: int):
+    """Inserts `size` random contacts for the user."""
+    rng = random.Random(size)
+    rows = [
+        {
+            "first_name": rng.choice(WORDS).title(),
+            "last_name": f"{rng.choice(WORDS).title()}enko{i % 500}",
+            "email": f"user{i}@{rng.choice(WORDS)}.example.com",
+            "user_id": user_id,
+        }
+        for i in range(size)
+    ]
+    for start in range(0, size, 5000):
+        db.execute(insert(Contact), rows[start:start + 5000])
+    db.commit()
+
+def timed(func, repeat: int) -> float:
+    """Returns the median wall time of `func` in milliseconds."""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+def run(size: int, repeat: int) -> dict:
+    """Seeds a fresh database with `size` contacts and times both search paths."""
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+        Base.metadata.create_all(bind=engine)
+        search.ensure_search_index(engine)
+        db = sessionmaker(autocommit=False, autoflush=False, bind=engine)()
+        user = User(username="bench", email="bench@example.com", hashed_password="x")
+        db.add(user)
+        db.commit()
+        seed(db, user.id, size)
+
+        result = {
+            "like": timed(lambda: search.search_like(db, user.id, "kater"), repeat),
+            "fts": timed(lambda: search.search_contacts(db, user.id, "kater"), repeat),
+            "fts_typo": timed(lambda: search.search_contacts(db, user.id, "katreyna"), repeat),
+        }
+        db.close()
+        engine.dispose()
+    return result
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    print(f"{'contacts':>10} {'ilike ms':>10} {'fts ms':>10} {'fts typo ms':>12}")
+    for size in args.sizes:
+        result = run(size, args.repeat)
+        print(f"{size:>10} {result['like']:>10.2f} {result['fts']:>10.2f} {result['fts_typo']:>12.2f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""Compares the ways a contact list can be loaded and encoded as a JSON response.
+
+For each list size, times three paths over the same seeded contacts:
+
+* ``orm_pydantic``: ORM entities validated into ``ContactOut`` and dumped by
+  Pydantic, as the birthdays route did;
+* ``orm_response_model``: ORM entities validated by the response model and
+  encoded with the stdlib ``json`` module, as FastAPI does for routes
+  returning ORM objects (the search route did);
+* ``core_orjson``: Core row tuples mapped to dicts and encoded with orjson,
+  the path the list routes use now.
+
+Each path is timed as a whole and split into loading the rows and encoding
+them. Results are stored as JSON for `benchmarks.results compare`. Usage::
+
+    python -m benchmarks.bench_serialization
+    python -m benchmarks.bench_serialization --sizes 1000 10000 --repeat 5
+"""
+import argparse
+import json
+import os
+import tempfile
+from pydantic import TypeAdapter
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import sessionmaker
+from benchmarks import datagen, results
+from contacts_api import schemas, serialization
+from contacts_api.crud import CONTACT_FIELDS
+from contacts_api.models import Contact
+
+contact_list_adapter = TypeAdapter(list[schemas.ContactOut])
+
+def load_orm(db, user_id: int, size: int) -> list:
+    """Loads `size` contacts as ORM entities, with a fresh identity map."""
+    db.expunge_all()
+    return list(db.scalars(select(Contact).where(Contact.user_id == user_id).order_by(Contact.id).limit(size)))
+
+def load_rows(db, user_id: int, size: int) -> list:
+    """Loads `size` contacts as Core row tuples in `ContactOut` field order."""
+    columns = [CONTACT_FIELDS[name] for name in serialization.CONTACT_OUT_FIELDS]
+    return db.execute(select(*columns).where(Contact.user_id == user_id).order_by(Contact.id).limit(size)).all()
+
+def encode_pydantic(contacts: list) -> bytes:
+    return contact_list_adapter.dump_json(contact_list_adapter.validate_python(contacts, from_attributes=True))
+
+def encode_response_model(contacts: list) -> bytes:
+    validated = contact_list_adapter.validate_python(contacts, from_attributes=True)
+    content = contact_list_adapter.dump_python(validated, mode="json")
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")).encode()
+
+def encode_orjson(rows: list) -> bytes:
+    return serialization.dumps(serialization.row_dicts(rows))
+
+# Path name, loader and encoder
+PATHS = [
+    ("orm_pydantic", load_orm, encode_pydantic),
+    ("orm_response_model", load_orm, encode_response_model),
+    ("core_orjson", load_rows, encode_orjson),
+]
+
+def run(url: str, sizes: list[int], repeat: int) -> dict:
+    """
+    Seeds one user with max(sizes) contacts and times every path at every size.
+
+    Args:
+        url (str): The database URL.
+        sizes (list[int]): List lengths to measure.
+        repeat (int): Repeats per measurement; the median is reported.
+
+    Returns:
+        dict: Per path and size, load, encode and total timings.
+    """
+    seeded = datagen.seed(url, 1, max(sizes))
+    user_id = seeded["user_ids"][0]
+    engine = create_engine(url)
+    db = sessionmaker(bind=engine)()
+    measured = {}
+    try:
+        for size in sizes:
+            for name, load, encode in PATHS:
+                loaded = load(db, user_id, size)
+                number = max(1, 10_000 // size)
+                row = {
+                    "load": results.timeit(lambda: load(db, user_id, size), number=number, repeat=repeat),
+                    "encode": results.timeit(lambda: encode(loaded), number=number, repeat=repeat),
+                    "total": results.timeit(lambda: encode(load(db, user_id, size)), number=number, repeat=repeat),
+                }
+                key = f"{name}_{size}"
+                measured[key] = {
+                    **row["total"],
+                    "load_ms": row["load"]["us_per_op"] / 1000,
+                    "encode_ms": row["encode"]["us_per_op"] / 1000,
+                    "rows_per_s": size * row["total"]["ops_per_s"],
+                }
+                print(f"{key:>28}: {measured[key]['us_per_op'] / 1000:9.1f} ms "
+                      f"(load {measured[key]['load_ms']:8.1f} ms, encode {measured[key]['encode_ms']:8.1f} ms)")
+    finally:
+        db.close()
+        engine.dispose()
+    return measured
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", help="database to seed and use; a throwaway SQLite file by default")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10_000, 100_000])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--output", help="directory of the JSON results")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        url = args.url or f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+        measured = run(url, args.sizes, args.repeat)
+    path = results.save("serialization", measured, args.output, database_url=url)
+    print(f"Results written to {path}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,187 @@
+"""Stores benchmark results as JSON and compares runs for regressions.
+
+Every result file holds one suite's measurements together with the commit,
+Python version, platform and database they were taken on. Comparing a run
+with a baseline flags every timing that got slower (or throughput that
+dropped) by more than the threshold. Usage::
+
+    python -m benchmarks.results compare results/baseline/crud.json results/crud.json --threshold 10
+
+The exit status is 1 when a regression was found, so CI can gate on it.
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+DEFAULT_RESULTS_DIR = Path(os.environ.get("BENCH_RESULTS_DIR", "benchmarks/results"))
+
+# Metrics where a larger value is better; for every other metric smaller is better
+HIGHER_IS_BETTER = {"rps", "ops_per_s"}
+
+# Metrics compared between runs; counts such as errors or queries are reported as they are
+COMPARED = {"p50", "p95", "p99", "mean", "median", "min", "rps", "ops_per_s", "us_per_op"}
+
+def summarize(samples: list[float]) -> dict:
+    """
+    Summarizes latencies in seconds as milliseconds.
+
+    Args:
+        samples (list[float]): The measured durations, in seconds.
+
+    Returns:
+        dict: Count, mean, p50, p95, p99 and max, in milliseconds.
+    """
+    if len(samples) < 2:
+        value = samples[0] * 1000 if samples else 0.0
+        return {"count": len(samples), "mean": value, "p50": value, "p95": value, "p99": value, "max": value}
+    cuts = statistics.quantiles(samples, n=100, method="inclusive")
+    return {
+        "count": len(samples),
+        "mean": statistics.fmean(samples) * 1000,
+        "p50": cuts[49] * 1000,
+        "p95": cuts[94] * 1000,
+        "p99": cuts[98] * 1000,
+        "max": max(samples) * 1000,
+    }
+
+def timeit(func, number: int = 100, repeat: int = 5) -> dict:
+    """
+    Times a callable the way `timeit` does, keeping the best and median repeat.
+
+    Args:
+        func (callable): Called without arguments.
+        number (int): Calls per repeat.
+        repeat (int): Number of repeats.
+
+    Returns:
+        dict: Microseconds per call of the best and median repeat, and calls per second.
+    """
+    runs = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        runs.append((time.perf_counter() - start) / number)
+    return {
+        "us_per_op": statistics.median(runs) * 1e6,
+        "min": min(runs) * 1e6,
+        "ops_per_s": 1 / statistics.median(runs),
+    }
+
+def environment(database_url: str = None) -> dict:
+    """
+    Describes where the results were measured.
+
+    Args:
+        database_url (str, optional): The database the suite ran against; credentials are dropped.
+
+    Returns:
+        dict: Commit, Python version, platform, CPU count, database backend and timestamp.
+    """
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "database": database_url.split("://")[0] if database_url else None,
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+    }
+
+def save(suite: str, results: dict, directory: Path = None, database_url: str = None) -> Path:
+    """
+    Writes a suite's results to ``<directory>/<suite>.json``.
+
+    Args:
+        suite (str): The suite name, e.g. "crud" or "http".
+        results (dict): Measurements keyed by benchmark name, each a dict of metrics.
+        directory (Path, optional): Where to write; BENCH_RESULTS_DIR or benchmarks/results by default.
+        database_url (str, optional): The database the suite ran against.
+
+    Returns:
+        Path: The file written.
+    """
+    directory = Path(directory or DEFAULT_RESULTS_DIR)
+    directory.mkdir(parents=True, exist_ok=True)
+    path = directory / f"{suite}.json"
+    path.write_text(json.dumps(
+        {"suite": suite, "environment": environment(database_url), "results": results}, indent=2, default=str
+    ))
+    return path
+
+def compare(baseline: dict, current: dict, threshold: float = 10.0) -> list[dict]:
+    """
+    Compares two result files metric by metric.
+
+    Args:
+        baseline (dict): The loaded baseline file.
+        current (dict): The loaded file of the new run.
+        threshold (float): Change in percent beyond which a metric counts as regressed or improved.
+
+    Returns:
+        list: One row per metric present in both runs, with the old and new
+        values, the change in percent and a status of "regressed", "improved" or "ok".
+    """
+    rows = []
+    for name, metrics in current["results"].items():
+        old_metrics = baseline["results"].get(name, {})
+        for metric, new in metrics.items():
+            old = old_metrics.get(metric)
+            if metric not in COMPARED or not isinstance(old, (int, float)) or not old:
+                continue
+            change = (new - old) / old * 100
+            worse = -change if metric in HIGHER_IS_BETTER else change
+            status = "regressed" if worse > threshold else "improved" if worse < -threshold else "ok"
+            rows.append({"benchmark": name, "metric": metric, "baseline": old, "current": new,
+                         "change": change, "status": status})
+    return rows
+
+def format_report(rows: list[dict]) -> str:
+    """
+    Renders comparison rows as a table, regressions first.
+
+    Args:
+        rows (list): Rows returned by `compare`.
+
+    Returns:
+        str: The report.
+    """
+    order = {"regressed": 0, "improved": 1, "ok": 2}
+    width = max((len(row["benchmark"]) for row in rows), default=9)
+    lines = [f"{'benchmark':<{width}} {'metric':>9} {'baseline':>12} {'current':>12} {'change':>8}  status"]
+    for row in sorted(rows, key=lambda row: (order[row["status"]], row["benchmark"], row["metric"])):
+        lines.append(
+            f"{row['benchmark']:<{width}} {row['metric']:>9} {row['baseline']:>12.2f} {row['current']:>12.2f} "
+            f"{row['change']:>+7.1f}%  {row['status']}"
+        )
+    regressed = sum(row["status"] == "regressed" for row in rows)
+    lines.append(f"{regressed} regression(s) in {len(rows)} metrics")
+    return "\n".join(lines)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    compare_parser = subparsers.add_parser("compare", help="compare a run with a baseline")
+    compare_parser.add_argument("baseline", type=Path)
+    compare_parser.add_argument("current", type=Path)
+    compare_parser.add_argument("--threshold", type=float, default=10.0, help="percent change treated as significant")
+    args = parser.parse_args()
+
+    rows = compare(json.loads(args.baseline.read_text()), json.loads(args.current.read_text()), args.threshold)
+    print(format_report(rows))
+    sys.exit(1 if any(row["status"] == "regressed" for row in rows) else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.concurrency import iterate_in_threadpool, run_in_threadpool
+from contacts_api import crud
+from contacts_api.models import Contact
+
+async def run_sync(db, func, *args, **kwargs):
+    """
+    Awaits a sync function that takes a session as its first argument.
+
+    On an `AsyncSession` the function runs through `AsyncSession.run_sync`,
+    so its queries go through the async driver without leaving the event loop.
+    On a regular `Session` it runs in the threadpool, as sync handlers did.
+
+    Args:
+        db (AsyncSession or Session): The database session object.
+        func (callable): The function to call as ``func(session, *args, **kwargs)``.
+
+    Returns:
+        Any: Whatever `func` returns.
+    """
+    if isinstance(db, AsyncSession):
+        return await db.run_sync(func, *args, **kwargs)
+    return await run_in_threadpool(func, db, *args, **kwargs)
+
+async def get_contacts(db, user_id: int):
+    """Async version of `crud.get_contacts`."""
+    return await run_sync(db, crud.get_contacts, user_id)
+
+async def get_contacts_page(db, user_id: int, **kwargs):
+    """Async version of `crud.get_contacts_page`."""
+    return await run_sync(db, crud.get_contacts_page, user_id, **kwargs)
+
+async def stream_contacts(db, user_id: int, fields: list[str], batch_size: int = 1000):
+    """
+    Async version of `crud.stream_contacts`.
+
+    On an `AsyncSession` the rows are streamed natively with `AsyncSession.stream`.
+
+    Yields:
+        list: A batch of row tuples ordered by contact ID.
+    """
+    if not isinstance(db, AsyncSession):
+        async for rows in iterate_in_threadpool(crud.stream_contacts(db, user_id, fields, batch_size)):
+            yield rows
+        return
+    stmt = (
+        select(*[crud.CONTACT_FIELDS[name] for name in fields])
+        .where(Contact.user_id == user_id, Contact.deleted_at.is_(None))
+        .order_by(Contact.id)
+        .execution_options(yield_per=batch_size)
+    )
+    result = await db.stream(stmt)
+    try:
+        async for rows in result.partitions():
+            yield rows
+    finally:
+        await result.close()
+
+async def get_contact_changes(db, user_id: int, **kwargs):
+    """Async version of `crud.get_contact_changes`."""
+    return await run_sync(db, crud.get_contact_changes, user_id, **kwargs)
+
+async def get_contacts_by_ids(db, user_id: int, ids: list[int], **kwargs):
+    """Async version of `crud.get_contacts_by_ids`."""
+    return await run_sync(db, crud.get_contacts_by_ids, user_id, ids, **kwargs)
+
+async def batch_contacts(db, user_id: int, operations: list[dict]):
+    """Async version of `crud.batch_contacts`."""
+    return await run_sync(db, crud.batch_contacts, user_id, operations)
+
+async def get_contact_by_id(db, user_id: int, contact_id: int):
+    """Async version of `crud.get_contact_by_id`."""
+    return await run_sync(db, crud.get_contact_by_id, user_id, contact_id)
+
+async def get_contacts_version(db, user_id: int):
+    """Async version of `crud.get_contacts_version`."""
+    return await run_sync(db, crud.get_contacts_version, user_id)
+
+async def create_contact(db, user_id: int, contact_data: dict):
+    """Async version of `crud.create_contact`."""
+    return await run_sync(db, crud.create_contact, user_id, contact_data)
+
+async def update_contact(db, user_id: int, contact_id: int, update_data: dict):
+    """Async version of `crud.update_contact`."""
+    return await run_sync(db, crud.update_contact, user_id, contact_id, update_data)
+
+async def delete_contact(db, user_id: int, contact_id: int):
+    """Async version of `crud.delete_contact`."""
+    return await run_sync(db, crud.delete_contact, user_id, contact_id)
+
+async def search_contacts(db, user_id: int, query: str, **kwargs):
+    """Async version of `crud.search_contacts`."""
+    return await run_sync(db, crud.search_contacts, user_id, query, **kwargs)
+
+async def get_contact_facets(db, user_id: int):
+    """Async version of `crud.get_contact_facets`."""
+    return await run_sync(db, crud.get_contact_facets, user_id)
+
+async def get_upcoming_birthdays(db, user_id: int, **kwargs):
+    """Async version of `crud.get_upcoming_birthdays`."""
+    return await run_sync(db, crud.get_upcoming_birthdays, user_id, **kwargs)
+
+async def get_upcoming_birthday_rows(db, user_id: int, **kwargs):
+    """Async version of `crud.get_upcoming_birthday_rows`."""
+    return await run_sync(db, crud.get_upcoming_birthday_rows, user_id, **kwargs)
+
+async def get_user_by_id(db, user_id: int):
+    """Async version of `crud.get_user_by_id`."""
+    return await run_sync(db, crud.get_user_by_id, user_id)
+
+async def get_user_by_username(db, username: str):
+    """Async version of `crud.get_user_by_username`."""
+    return await run_sync(db, crud.get_user_by_username, username)
+
+async def get_user_by_email(db, email: str):
+    """Async version of `crud.get_user_by_email`."""
+    return await run_sync(db, crud.get_user_by_email, email)
+
+async def create_user(db, user_data: dict):
+    """Async version of `crud.create_user`."""
+    return await run_sync(db, crud.create_user, user_data)
+
+async def update_user(db, user_id: int, update_data: dict):
+    """Async version of `crud.update_user`."""
+    return await run_sync(db, crud.update_user, user_id, update_data)
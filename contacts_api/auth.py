@@ -1,9 +1,6 @@
-from passlib.context import CryptContext
 from jose import JWTError, jwt
 from datetime import datetime, timedelta
-
-# Password hashing context
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+from contacts_api.passwords import crypt_context
 
 # Secret key and algorithm for JWT token encoding
 SECRET_KEY = "secret_key"
@@ -12,7 +9,9 @@ ACCESS_TOKEN_EXPIRE_MINUTES = 30
 
 def hash_password(password: str) -> str:
     """
-    Hashes the given password using bcrypt.
+    Hashes the given password using bcrypt, blocking the calling thread.
+
+    Request handlers should await `passwords.hash_password` instead.
 
     Args:
         password (str): The plain text password to be hashed.
@@ -20,11 +19,13 @@ def hash_password(password: str) -> str:
     Returns:
         str: The hashed password.
     """
-    return pwd_context.hash(password)
+    return crypt_context().hash(password)
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """
-    Verifies if the given plain password matches the hashed password.
+    Verifies if the given plain password matches the hashed password, blocking the calling thread.
+
+    Request handlers should await `passwords.verify_password` instead.
 
     Args:
         plain_password (str): The plain text password to verify.
@@ -33,7 +34,7 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
     Returns:
         bool: True if the passwords match, False otherwise.
     """
-    return pwd_context.verify(plain_password, hashed_password)
+    return crypt_context().verify(plain_password, hashed_password)
 
 def create_access_token(data: dict) -> str:
     """
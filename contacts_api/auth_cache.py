@@ -0,0 +1,122 @@
+import time
+from fastapi import HTTPException
+from sqlalchemy import event
+from sqlalchemy.orm import Session, object_session
+from contacts_api import async_crud, schemas
+from contacts_api.auth import decode_access_token
+from contacts_api.cache import TTLCache, TwoTierCache
+from contacts_api.config import Lazy, settings
+from contacts_api.models import User
+
+# Decoded token payloads, keyed by the token's signature segment
+token_cache = Lazy(lambda: TTLCache(maxsize=settings.TOKEN_CACHE_SIZE, ttl=settings.TOKEN_CACHE_TTL))
+
+# Snapshots of user rows, keyed by user ID, in a per-worker L1 and the shared Redis tier.
+# A worker only drops its own L1 entry on invalidation, so USER_CACHE_TTL bounds how
+# long other workers may serve a stale row.
+user_cache = Lazy(lambda: TwoTierCache(
+    "user",
+    schemas.UserCached,
+    TTLCache(maxsize=settings.USER_CACHE_SIZE, ttl=settings.USER_CACHE_TTL),
+    ttl=settings.USER_CACHE_REDIS_TTL,
+))
+
+def decode_token(token: str) -> dict:
+    """
+    Decodes an access token, verifying its signature only the first time it is seen.
+
+    The payload is cached under the token's signature until the token's `exp`,
+    so an expired token is never served from the cache. The signed part of the
+    token is stored with the payload and compared on every hit, so a token
+    that reuses a known signature with a different payload is not accepted.
+
+    Args:
+        token (str): The JWT access token.
+
+    Returns:
+        dict or None: The decoded payload if valid, otherwise None.
+    """
+    signing_input, _, signature = token.rpartition(".")
+    cached = token_cache.get(signature)
+    if cached is not None and cached[0] == signing_input:
+        return cached[1]
+
+    payload = decode_access_token(token)
+    if payload is not None and "exp" in payload:
+        token_cache.set(signature, (signing_input, payload), ttl=payload["exp"] - time.time())
+    return payload
+
+async def invalidate_user(user_id: int):
+    """
+    Drops a user's cached row from both cache tiers, so the next request reloads it.
+
+    Committed changes to User rows are invalidated automatically; call this
+    after writes that bypass the ORM, such as bulk UPDATE statements.
+
+    Args:
+        user_id (int): The ID of the user whose row changed.
+    """
+    await user_cache.invalidate(user_id)
+
+async def load_current_user(db, token: str) -> schemas.UserCached:
+    """
+    Resolves an access token to the authenticated user.
+
+    Repeat requests with the same token are answered from the token and user
+    caches without touching the database.
+
+    Args:
+        db (AsyncSession or Session): The database session object.
+        token (str): The JWT access token.
+
+    Raises:
+        HTTPException: If the token is invalid or expired, or the user does not exist.
+
+    Returns:
+        schemas.UserCached: A snapshot of the authenticated user.
+    """
+    payload = decode_token(token)
+    if payload is None:
+        raise HTTPException(status_code=401, detail="Invalid or expired token")
+    try:
+        user_id = int(payload["sub"])
+    except (KeyError, TypeError, ValueError):
+        raise HTTPException(status_code=401, detail="Invalid or expired token")
+
+    user = await user_cache.get(user_id)
+    if user is not None:
+        return user
+    row = await async_crud.get_user_by_id(db, user_id=user_id)
+    if not row:
+        raise HTTPException(status_code=401, detail="Invalid user")
+    user = schemas.UserCached.model_validate(row)
+    await user_cache.set(user_id, user)
+    return user
+
+def cache_stats() -> dict:
+    """
+    Reports hit/miss counters of the auth caches.
+
+    Returns:
+        dict: Stats of the token and user caches.
+    """
+    return {"tokens": token_cache.stats(), "users": user_cache.stats()}
+
+@event.listens_for(User, "after_update")
+@event.listens_for(User, "after_delete")
+def _mark_user_changed(mapper, connection, target):
+    """Remembers changed users on their session, to be invalidated once the change commits."""
+    session = object_session(target)
+    if session is not None:
+        session.info.setdefault("changed_user_ids", set()).add(target.id)
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_changed_users(session):
+    """Invalidates the cached rows of users changed in the committed transaction."""
+    for user_id in session.info.pop("changed_user_ids", ()):
+        user_cache.invalidate_nowait(user_id)
+
+@event.listens_for(Session, "after_rollback")
+def _forget_changed_users(session):
+    """Discards pending invalidations of a rolled back transaction."""
+    session.info.pop("changed_user_ids", None)
@@ -0,0 +1,311 @@
+import hashlib
+import os
+import re
+import time
+from abc import ABC, abstractmethod
+from io import BytesIO
+from pathlib import Path
+from fastapi import HTTPException, Request
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import UploadFile
+from starlette.formparsers import MultiPartException, MultiPartParser
+from contacts_api import metrics
+from contacts_api.cache import TTLCache
+from contacts_api.config import settings
+
+# Multipart boundaries and part headers around the file
+MULTIPART_OVERHEAD = 16 * 1024
+AVATAR_SIZES = (64, 256, 512)
+# The variant stored as the user's avatar_url
+DEFAULT_SIZE = 256
+
+# Leading bytes of the accepted formats; the client's content type is not trusted
+SIGNATURES = {
+    "image/jpeg": (b"\xff\xd8\xff",),
+    "image/png": (b"\x89PNG\r\n\x1a\n",),
+    "image/webp": (b"RIFF",),
+}
+SNIFF_BYTES = 12
+
+# Cloudinary URLs built by CloudinaryAvatarStorage.url; keys are immutable, so entries only expire to bound memory
+URL_CACHE_SIZE = 10_000
+URL_CACHE_TTL = 24 * 3600
+
+# Variant keys are "<user_id>/<digest>_<size>.webp", the digest being that of the WebP bytes: it makes them immutable
+VARIANT_KEY = re.compile(r"^(\d+)/([0-9a-f]{16})_(\d+)\.webp$")
+
+def sniff_image_type(head: bytes):
+    """
+    Identifies an image format from its magic bytes.
+
+    Args:
+        head (bytes): At least the first SNIFF_BYTES bytes of the file.
+
+    Returns:
+        str or None: The MIME type, or None if the format is not accepted.
+    """
+    for content_type, prefixes in SIGNATURES.items():
+        if head.startswith(prefixes):
+            if content_type == "image/webp" and head[8:12] != b"WEBP":
+                continue
+            return content_type
+    return None
+
+def _too_large():
+    max_mb = settings.AVATAR_MAX_FILE_SIZE // (1024 * 1024)
+    return HTTPException(status_code=413, detail=f"File too large. Max size is {max_mb}MB.")
+
+def _unsupported():
+    return HTTPException(status_code=415, detail="Invalid file type. Only JPEG, PNG and WebP allowed.")
+
+async def _limit(stream, limit: int, sniff: bool = False):
+    """Passes chunks through, failing as soon as `limit` bytes are exceeded or the head is not an image."""
+    size = 0
+    head = b""
+    async for chunk in stream:
+        size += len(chunk)
+        if size > limit:
+            raise _too_large()
+        if sniff and len(head) < SNIFF_BYTES:
+            head += chunk[:SNIFF_BYTES]
+            if len(head) >= SNIFF_BYTES and sniff_image_type(head) is None:
+                raise _unsupported()
+        yield chunk
+
+async def read_upload(request: Request) -> bytes:
+    """
+    Reads an uploaded image, enforcing AVATAR_MAX_FILE_SIZE while the body streams in.
+
+    Accepts the image either as the raw request body or as the `file` field
+    of a multipart form. Oversized bodies are rejected from Content-Length or
+    as soon as the limit is crossed, without reading the rest.
+
+    Args:
+        request (Request): The upload request.
+
+    Raises:
+        HTTPException: 413 if the file is too large, 415 if it is not a JPEG,
+        PNG or WebP image, 400 if the form has no file.
+
+    Returns:
+        bytes: The image file.
+    """
+    length = request.headers.get("content-length")
+    if request.headers.get("content-type", "").startswith("multipart/form-data"):
+        limit = settings.AVATAR_MAX_FILE_SIZE + MULTIPART_OVERHEAD
+        if length and length.isdigit() and int(length) > limit:
+            raise _too_large()
+        parser = MultiPartParser(request.headers, _limit(request.stream(), limit), max_files=1, max_fields=10)
+        try:
+            form = await parser.parse()
+        except MultiPartException as e:
+            raise HTTPException(status_code=400, detail=e.message)
+        try:
+            upload = form.get("file")
+            if not isinstance(upload, UploadFile):
+                raise HTTPException(status_code=400, detail="Missing file upload")
+            data = await upload.read()
+        finally:
+            await form.close()
+        if len(data) > settings.AVATAR_MAX_FILE_SIZE:
+            raise _too_large()
+    else:
+        if length and length.isdigit() and int(length) > settings.AVATAR_MAX_FILE_SIZE:
+            raise _too_large()
+        data = b"".join([chunk async for chunk in _limit(request.stream(), settings.AVATAR_MAX_FILE_SIZE, sniff=True)])
+
+    if sniff_image_type(data[:SNIFF_BYTES]) is None:
+        raise _unsupported()
+    return data
+
+def render_variants(data: bytes) -> dict[int, bytes]:
+    """
+    Decodes an image and renders the square WebP variants.
+
+    JPEGs are decoded at a reduced scale when the largest variant allows it.
+    Each variant is center-cropped and downscaled from the largest one.
+
+    Args:
+        data (bytes): The image file.
+
+    Raises:
+        HTTPException: 400 if the image cannot be decoded or has more than AVATAR_MAX_PIXELS pixels.
+
+    Returns:
+        dict[int, bytes]: WebP bytes by edge length.
+    """
+    # Pillow is imported on the first upload, so workers that never resize images do not load it
+    from PIL import Image, ImageOps, UnidentifiedImageError
+
+    largest = max(AVATAR_SIZES)
+    try:
+        with Image.open(BytesIO(data)) as image:
+            if image.width * image.height > settings.AVATAR_MAX_PIXELS:
+                raise HTTPException(status_code=400, detail="Image dimensions too large.")
+            image.draft("RGB", (largest, largest))
+            image = ImageOps.exif_transpose(image)
+            image = image.convert("RGBA" if "A" in image.getbands() or "transparency" in image.info else "RGB")
+            base = ImageOps.fit(image, (largest, largest), Image.LANCZOS)
+    except (UnidentifiedImageError, Image.DecompressionBombError, OSError, SyntaxError):
+        raise HTTPException(status_code=400, detail="Invalid image file.")
+
+    variants = {}
+    for size in AVATAR_SIZES:
+        variant = base if size == largest else base.resize((size, size), Image.LANCZOS)
+        buffer = BytesIO()
+        variant.save(buffer, "WEBP", quality=settings.AVATAR_WEBP_QUALITY, method=4)
+        variants[size] = buffer.getvalue()
+    return variants
+
+def variant_key(user_id: int, image: bytes, size: int) -> str:
+    """Builds the storage key of an avatar variant from a digest of its WebP bytes."""
+    return f"{user_id}/{hashlib.sha256(image).hexdigest()[:16]}_{size}.webp"
+
+def variant_etag(key: str) -> str:
+    """Builds the strong ETag of a variant; keys are content-addressed, so the key identifies the bytes."""
+    match = VARIANT_KEY.match(key)
+    return f'"{match.group(2)}-{match.group(3)}"'
+
+class AvatarStorage(ABC):
+    """Stores avatar variants under their keys."""
+
+    @abstractmethod
+    async def save(self, key: str, data: bytes) -> str:
+        """
+        Stores a variant.
+
+        Args:
+            key (str): The variant key.
+            data (bytes): The WebP image.
+
+        Returns:
+            str: The URL clients load the variant from.
+        """
+
+    @abstractmethod
+    async def load(self, key: str):
+        """
+        Loads a variant served by the API itself.
+
+        Args:
+            key (str): The variant key.
+
+        Returns:
+            bytes or None: The WebP image, or None if it is not stored here.
+        """
+
+    @abstractmethod
+    def url(self, key: str) -> str:
+        """Returns the URL clients load a variant from."""
+
+class LocalAvatarStorage(AvatarStorage):
+    """Stores variants as files under a directory and serves them through `GET /avatars/`.
+
+    Attributes:
+        root (Path): The directory holding one subdirectory per user.
+    """
+
+    def __init__(self, root: str = None):
+        self.root = Path(root or settings.AVATAR_DIR)
+
+    def _write(self, key: str, data: bytes):
+        path = self.root / key
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(".tmp")
+        tmp.write_bytes(data)
+        os.replace(tmp, path)
+
+    def _read(self, key: str):
+        try:
+            return (self.root / key).read_bytes()
+        except FileNotFoundError:
+            return None
+
+    async def save(self, key: str, data: bytes) -> str:
+        await run_in_threadpool(self._write, key, data)
+        return self.url(key)
+
+    async def load(self, key: str):
+        return await run_in_threadpool(self._read, key)
+
+    def url(self, key: str) -> str:
+        return f"/avatars/{key}"
+
+class CloudinaryAvatarStorage(AvatarStorage):
+    """Uploads variants to Cloudinary, which serves them from its CDN.
+
+    Requires the `cloudinary` package and the CLOUDINARY_* settings.
+    """
+
+    def __init__(self):
+        import cloudinary
+        import cloudinary.uploader
+
+        cloudinary.config(
+            cloud_name=settings.CLOUDINARY_CLOUD_NAME,
+            api_key=settings.CLOUDINARY_API_KEY,
+            api_secret=settings.CLOUDINARY_API_SECRET,
+            secure=True,
+        )
+        self._cloudinary = cloudinary
+        self._urls = TTLCache(maxsize=URL_CACHE_SIZE, ttl=URL_CACHE_TTL)
+
+    async def save(self, key: str, data: bytes) -> str:
+        public_id = f"avatars/{key.removesuffix('.webp')}"
+        start = time.perf_counter()
+        try:
+            result = await run_in_threadpool(
+                self._cloudinary.uploader.upload, data, public_id=public_id, format="webp", overwrite=False
+            )
+        except Exception:
+            metrics.cloudinary_uploads.inc(("failed",))
+            raise
+        finally:
+            metrics.cloudinary_upload_duration.observe((), time.perf_counter() - start)
+        metrics.cloudinary_uploads.inc(("uploaded",))
+        self._urls.set(key, result["secure_url"])
+        return result["secure_url"]
+
+    async def load(self, key: str):
+        return None
+
+    def url(self, key: str) -> str:
+        url = self._urls.get(key)
+        if url is None:
+            url = self._cloudinary.CloudinaryImage(f"avatars/{key.removesuffix('.webp')}").build_url(format="webp")
+            self._urls.set(key, url)
+        return url
+
+_storage = None
+
+def get_storage() -> AvatarStorage:
+    """
+    Returns the configured avatar storage backend, creating it on first use.
+
+    Returns:
+        AvatarStorage: The local or Cloudinary backend, per AVATAR_STORAGE.
+    """
+    global _storage
+    if _storage is None:
+        _storage = CloudinaryAvatarStorage() if settings.AVATAR_STORAGE == "cloudinary" else LocalAvatarStorage()
+    return _storage
+
+async def process_avatar(user_id: int, data: bytes, storage: AvatarStorage = None) -> dict[int, str]:
+    """
+    Renders the variants of an uploaded image in the threadpool and stores them.
+
+    Variants are keyed by a digest of their WebP bytes, so their URLs never
+    change content, even if the rendering settings change, and re-uploading
+    the same image yields the same URLs.
+
+    Args:
+        user_id (int): The ID of the avatar's owner.
+        data (bytes): The image file, as returned by `read_upload`.
+        storage (AvatarStorage, optional): The backend; the configured one by default.
+
+    Returns:
+        dict[int, str]: Variant URLs by edge length.
+    """
+    storage = storage or get_storage()
+    variants = await run_in_threadpool(render_variants, data)
+    return {size: await storage.save(variant_key(user_id, image, size), image) for size, image in variants.items()}
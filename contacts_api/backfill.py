@@ -0,0 +1,321 @@
+"""Online backfills: rewrite the rows of a large table in small, throttled, resumable batches.
+
+A schema change that needs existing rows filled in (a derived column, a
+column about to become NOT NULL, a format conversion) must not rewrite a
+live multi-million-row table in one statement, which would lock every row
+until it commits. A `Backfill` walks the table in primary key order with
+keyset pagination instead, one short transaction per batch, and records the
+last key done in ``backfill_checkpoints`` in the same transaction, so an
+interrupted run resumes where it stopped. Batches are spaced by ``sleep``
+seconds and halved while they take longer than ``max_batch_seconds``, which
+leaves room for the application's own queries.
+
+The Alembic revisions under ``contacts_api/migrations`` run the registered
+backfills; they can also be run, resumed and watched by hand::
+
+    python -m contacts_api.backfill status
+    python -m contacts_api.backfill run contacts_birthday_md --batch-size 500 --sleep 0.1
+    python -m contacts_api.backfill run contacts_birthday_md --reset    # start over from the first row
+"""
+import argparse
+import json
+import logging
+import time
+from sqlalchemy import Column, Date, DateTime, Integer, MetaData, String, Table, and_, bindparam, cast, column, create_engine, extract, func, or_, select, table, update
+from sqlalchemy.engine import Engine
+from contacts_api.config import settings
+from contacts_api.extra_data import is_json_object, parse_legacy
+from contacts_api.models import Contact, utcnow
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 1000
+MIN_BATCH_SIZE = 50
+BATCH_SLEEP = 0.05
+MAX_BATCH_SECONDS = 0.5
+
+# Seconds between progress log lines when no progress callback is given
+PROGRESS_INTERVAL = 10
+
+# Kept out of the application's metadata: the table only exists where a backfill has run
+checkpoint_metadata = MetaData()
+checkpoints = Table(
+    "backfill_checkpoints",
+    checkpoint_metadata,
+    Column("name", String, primary_key=True),
+    Column("last_key", Integer, nullable=True),
+    Column("rows_scanned", Integer, nullable=False, default=0),
+    Column("rows_updated", Integer, nullable=False, default=0),
+    Column("started_at", DateTime, nullable=False),
+    Column("updated_at", DateTime, nullable=False),
+    Column("finished_at", DateTime, nullable=True),
+)
+
+class Backfill:
+    """
+    A named, resumable rewrite of the rows of one table.
+
+    Each batch selects the next rows matching `where` in primary key order.
+    `where` should stop matching a row once it is filled, so a rerun or a
+    reset skips the rows already done. The rows are then rewritten either
+    with `assign`, in one UPDATE per batch bounded by the batch's keys, or
+    with `values`, a function of each row returning its new values.
+
+    Attributes:
+        name (str): Unique name, also the key of the backfill's checkpoint.
+        table (TableClause): The table to rewrite. A lightweight `table()` without the
+            models' Python-side defaults, so that updates do not touch `updated_at`.
+        key (ColumnClause): The integer primary key of the table.
+        where (ColumnElement): Condition of the rows still to fill.
+        assign (dict, optional): Column names mapped to SQL expressions or values. A
+            callable is called once per batch, e.g. `models.utcnow`.
+        columns (tuple): Columns or labelled expressions read for `values`, besides the key.
+        values (Callable[[Row], dict], optional): Returns the new values of a row, always
+            with the same keys, or None to leave the row as it is.
+        description (str): What the backfill does, shown by ``status``.
+    """
+
+    def __init__(self, name: str, table, key, where, assign: dict = None, columns: tuple = (),
+                 values=None, description: str = ""):
+        if (assign is None) == (values is None):
+            raise ValueError("A backfill takes either assign or values")
+        self.name = name
+        self.table = table
+        self.key = key
+        self.where = where
+        self.assign = assign
+        self.columns = columns
+        self.values = values
+        self.description = description
+
+def _run_batch(conn, backfill: Backfill, after, size: int) -> tuple:
+    """Fills the next `size` rows after key `after`; returns the rows scanned, the rows updated and the last key."""
+    key = backfill.key
+    query = select(key, *backfill.columns).where(backfill.where).order_by(key).limit(size)
+    if after is not None:
+        query = query.where(key > after)
+    rows = conn.execute(query).all()
+    if not rows:
+        return 0, 0, after
+    last = rows[-1][0]
+    if backfill.values is None:
+        bounds = [key <= last] if after is None else [key > after, key <= last]
+        assign = {name: value() if callable(value) else value for name, value in backfill.assign.items()}
+        updated = conn.execute(update(backfill.table).where(*bounds, backfill.where).values(assign)).rowcount
+    else:
+        changes = []
+        for row in rows:
+            values = backfill.values(row)
+            if values is not None:
+                changes.append({"_key": row[0], **values})
+        if changes:
+            conn.execute(update(backfill.table).where(key == bindparam("_key")), changes)
+        updated = len(changes)
+    return len(rows), updated, last
+
+def _progress(report: dict, first_key, last_key, start_key, elapsed: float, finished: bool) -> dict:
+    """Adds the rate, the share of the key range done and the estimated time left to a run's report."""
+    report["seconds"] = round(elapsed, 3)
+    report["rows_per_s"] = round(report["scanned"] / elapsed, 1) if elapsed else 0.0
+    done = report["last_key"]
+    if finished or last_key is None or (done is not None and done >= last_key):
+        report["percent"], report["eta_seconds"] = 100.0, 0.0
+        return report
+    if done is None:
+        report["percent"], report["eta_seconds"] = 0.0, None
+        return report
+    report["percent"] = round(100 * (done - first_key + 1) / (last_key - first_key + 1), 1)
+    covered = done - (first_key - 1 if start_key is None else start_key)
+    report["eta_seconds"] = round((last_key - done) * elapsed / covered, 1) if covered > 0 else None
+    return report
+
+def _log_progress(report: dict):
+    logger.info(
+        "Backfill %s: %d rows scanned, %d updated, %.1f%% of keys, %.0f rows/s, ETA %s s",
+        report["name"], report["scanned"], report["updated"], report["percent"],
+        report["rows_per_s"], report["eta_seconds"],
+    )
+
+def run(engine: Engine, backfill: Backfill, batch_size: int = BATCH_SIZE, sleep: float = BATCH_SLEEP,
+        max_batch_seconds: float = MAX_BATCH_SECONDS, reset: bool = False, progress=None) -> dict:
+    """
+    Runs a backfill to the end of its table, resuming from its checkpoint.
+
+    Every batch commits together with the checkpoint, so a run stopped at any
+    point (an error, a deploy, Ctrl+C) loses no work and repeats none. A
+    finished backfill run again only visits the rows added since. Batches
+    taking longer than `max_batch_seconds` halve the batch size, down to
+    MIN_BATCH_SIZE; quick ones double it back up to `batch_size`.
+
+    Args:
+        engine (Engine): The engine of the database. Each batch takes its own connection and transaction.
+        backfill (Backfill): The backfill to run.
+        batch_size (int): The largest number of rows read and written per transaction.
+        sleep (float): Seconds to wait between batches.
+        max_batch_seconds (float): The batch duration above which batches are made smaller.
+        reset (bool): Whether to discard the checkpoint and start from the first row.
+        progress (Callable[[dict], None], optional): Called with the run's report after every
+            batch; by default the report is logged every PROGRESS_INTERVAL seconds.
+
+    Returns:
+        dict: The rows scanned and updated by this run, the batches, the last key done,
+        the rate, the share of the key range done, the estimated seconds left and the seconds taken.
+    """
+    checkpoints.create(engine, checkfirst=True)
+    name = checkpoints.c.name == backfill.name
+    with engine.begin() as conn:
+        if reset:
+            conn.execute(checkpoints.delete().where(name))
+        checkpoint = conn.execute(select(checkpoints).where(name)).first()
+        if checkpoint is None:
+            now = utcnow()
+            conn.execute(checkpoints.insert().values(name=backfill.name, started_at=now, updated_at=now))
+            checkpoint = conn.execute(select(checkpoints).where(name)).one()
+        first_key, last_key = conn.execute(select(func.min(backfill.key), func.max(backfill.key))).one()
+
+    start_key = checkpoint.last_key
+    report = {"name": backfill.name, "scanned": 0, "updated": 0, "batches": 0, "last_key": start_key,
+              "batch_size": batch_size}
+    started = last_logged = time.perf_counter()
+    size = batch_size
+    while True:
+        batch_started = time.perf_counter()
+        with engine.begin() as conn:
+            scanned, updated, report["last_key"] = _run_batch(conn, backfill, report["last_key"], size)
+            finished = scanned < size
+            now = utcnow()
+            conn.execute(checkpoints.update().where(name).values(
+                last_key=report["last_key"],
+                rows_scanned=checkpoints.c.rows_scanned + scanned,
+                rows_updated=checkpoints.c.rows_updated + updated,
+                updated_at=now,
+                finished_at=now if finished else None,
+            ))
+        report["scanned"] += scanned
+        report["updated"] += updated
+        report["batches"] += 1
+        batch_seconds = time.perf_counter() - batch_started
+        if batch_seconds > max_batch_seconds:
+            size = max(MIN_BATCH_SIZE, size // 2)
+        elif batch_seconds < max_batch_seconds / 4:
+            size = min(batch_size, size * 2)
+        report["batch_size"] = size
+
+        elapsed = time.perf_counter() - started
+        _progress(report, first_key, last_key, start_key, elapsed, finished)
+        if progress is not None:
+            progress(report)
+        elif finished or time.perf_counter() - last_logged >= PROGRESS_INTERVAL:
+            _log_progress(report)
+            last_logged = time.perf_counter()
+        if finished:
+            return report
+        time.sleep(sleep)
+
+def status(engine: Engine) -> list[dict]:
+    """
+    Lists the checkpoints of the backfills that have run on a database.
+
+    Args:
+        engine (Engine): The engine of the database.
+
+    Returns:
+        list[dict]: One dict per checkpoint, by name; empty when no backfill has run.
+    """
+    checkpoints.create(engine, checkfirst=True)
+    with engine.connect() as conn:
+        rows = conn.execute(select(checkpoints).order_by(checkpoints.c.name)).mappings().all()
+    return [dict(row) for row in rows]
+
+def _extra_data_values(row):
+    """Converts a legacy string `extra_data` value to a JSON object, or returns None when it already is one."""
+    converted = parse_legacy(row.extra_data)
+    try:
+        unchanged = json.loads(row.extra_data) == converted
+    except ValueError:
+        unchanged = False
+    return None if unchanged else {"extra_data": converted}
+
+# The columns of `contacts` the backfills read and write
+contacts = table(
+    "contacts",
+    column("id", Integer),
+    column("first_name", String),
+    column("last_name", String),
+    column("birthday", Date),
+    column("birthday_md", Integer),
+    column("updated_at", DateTime),
+    column("extra_data", Contact.__table__.c.extra_data.type),
+)
+
+# The backfills of the schema migrations, by name
+BACKFILLS = {
+    backfill.name: backfill
+    for backfill in (
+        Backfill(
+            "contacts_birthday_md",
+            contacts,
+            contacts.c.id,
+            where=and_(contacts.c.birthday.isnot(None), contacts.c.birthday_md.is_(None)),
+            assign={"birthday_md": cast(extract("month", contacts.c.birthday) * 100 + extract("day", contacts.c.birthday), Integer)},
+            description="Derives birthday_md (month * 100 + day) from birthday",
+        ),
+        Backfill(
+            "contacts_updated_at",
+            contacts,
+            contacts.c.id,
+            where=contacts.c.updated_at.is_(None),
+            assign={"updated_at": utcnow},
+            description="Sets updated_at on contacts created before the changes feed",
+        ),
+        Backfill(
+            "contacts_extra_data_json",
+            contacts,
+            contacts.c.id,
+            where=and_(contacts.c.extra_data.isnot(None), ~is_json_object(contacts.c.extra_data)),
+            columns=(cast(contacts.c.extra_data, String).label("extra_data"),),
+            values=_extra_data_values,
+            description="Converts legacy string extra_data values to JSON objects",
+        ),
+        Backfill(
+            "contacts_names",
+            contacts,
+            contacts.c.id,
+            where=or_(contacts.c.first_name.is_(None), contacts.c.last_name.is_(None)),
+            assign={
+                "first_name": func.coalesce(contacts.c.first_name, ""),
+                "last_name": func.coalesce(contacts.c.last_name, ""),
+            },
+            description="Replaces NULL names with empty strings before they become NOT NULL",
+        ),
+    )
+}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("command", choices=["run", "status"])
+    parser.add_argument("name", nargs="?", choices=sorted(BACKFILLS), help="the backfill to run")
+    parser.add_argument("--url", help="database URL; DATABASE_URL by default")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    parser.add_argument("--sleep", type=float, default=BATCH_SLEEP, help="seconds between batches")
+    parser.add_argument("--max-batch-seconds", type=float, default=MAX_BATCH_SECONDS)
+    parser.add_argument("--reset", action="store_true", help="discard the checkpoint and start over")
+    args = parser.parse_args()
+    if args.command == "run" and args.name is None:
+        parser.error("run needs the name of a backfill")
+
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    engine = create_engine(args.url or settings.DATABASE_URL)
+    try:
+        if args.command == "run":
+            report = run(engine, BACKFILLS[args.name], args.batch_size, args.sleep, args.max_batch_seconds, args.reset)
+            print(json.dumps(report))
+        else:
+            for checkpoint in status(engine):
+                checkpoint["description"] = BACKFILLS[checkpoint["name"]].description if checkpoint["name"] in BACKFILLS else ""
+                print(json.dumps(checkpoint, default=str))
+    finally:
+        engine.dispose()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,288 @@
+import csv
+import io
+import json
+from pydantic import ValidationError
+from sqlalchemy import insert, or_, select
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+from starlette.datastructures import UploadFile
+from starlette.formparsers import MultiPartException, MultiPartParser
+from starlette.requests import Request
+from contacts_api import crud
+from contacts_api.models import Contact, birthday_key
+from contacts_api.schemas import ContactCreate
+
+BULK_CHUNK_SIZE = 1000
+MAX_BULK_ROWS = 50_000
+# Largest accepted import body, JSON or file; 50,000 rows of a few hundred bytes each
+MAX_BULK_BYTES = 20 * 1024 * 1024
+# Multipart boundaries and part headers around the file
+MULTIPART_OVERHEAD = 16 * 1024
+
+class ImportTooLarge(ValueError):
+    """Raised when an import body exceeds MAX_BULK_BYTES."""
+
+    def __init__(self):
+        super().__init__(f"Import too large. Max size is {MAX_BULK_BYTES // (1024 * 1024)}MB.")
+
+async def _limit(stream, limit: int):
+    """Passes chunks through, failing as soon as `limit` bytes are exceeded."""
+    size = 0
+    async for chunk in stream:
+        size += len(chunk)
+        if size > limit:
+            raise ImportTooLarge()
+        yield chunk
+
+async def read_records(request: Request) -> list:
+    """
+    Reads and parses the contacts of an import request, enforcing MAX_BULK_BYTES while the body streams in.
+
+    Accepts a JSON array body or a CSV/NDJSON file as the `file` field of a
+    multipart form. Oversized bodies are rejected from Content-Length or as
+    soon as the limit is crossed, without reading the rest.
+
+    Args:
+        request (Request): The import request.
+
+    Returns:
+        list: The parsed records.
+
+    Raises:
+        ImportTooLarge: If the body exceeds MAX_BULK_BYTES.
+        ValueError: If the body or file cannot be parsed, or the form has no file.
+    """
+    length = request.headers.get("content-length")
+    if not request.headers.get("content-type", "").startswith("multipart/form-data"):
+        if length and length.isdigit() and int(length) > MAX_BULK_BYTES:
+            raise ImportTooLarge()
+        return parse_json(b"".join([chunk async for chunk in _limit(request.stream(), MAX_BULK_BYTES)]))
+
+    limit = MAX_BULK_BYTES + MULTIPART_OVERHEAD
+    if length and length.isdigit() and int(length) > limit:
+        raise ImportTooLarge()
+    parser = MultiPartParser(request.headers, _limit(request.stream(), limit), max_files=1, max_fields=10)
+    try:
+        form = await parser.parse()
+    except MultiPartException as e:
+        raise ValueError(e.message)
+    try:
+        upload = form.get("file")
+        if not isinstance(upload, UploadFile):
+            raise ValueError("Missing file upload")
+        content = await upload.read()
+    finally:
+        await form.close()
+    if len(content) > MAX_BULK_BYTES:
+        raise ImportTooLarge()
+    return parse_file(upload.filename, content)
+
+def parse_json(body: bytes) -> list:
+    """
+    Parses a JSON array of contacts.
+
+    Args:
+        body (bytes): The raw request body.
+
+    Returns:
+        list: The array items, validated later row by row.
+
+    Raises:
+        ValueError: If the body is not a JSON array.
+    """
+    try:
+        records = json.loads(body)
+    except ValueError:
+        raise ValueError("Invalid JSON body")
+    if not isinstance(records, list):
+        raise ValueError("Expected a JSON array of contacts")
+    return records
+
+def parse_ndjson(text: str) -> list:
+    """
+    Parses newline-delimited JSON, one contact object per line.
+
+    Lines that are not valid JSON are kept as raw strings, so they fail
+    validation and show up in the per-row report instead of aborting the import.
+
+    Args:
+        text (str): The decoded file content.
+
+    Returns:
+        list: One record per non-empty line.
+    """
+    records = []
+    for line in text.splitlines():
+        if not line.strip():
+            continue
+        try:
+            records.append(json.loads(line))
+        except ValueError:
+            records.append(line)
+    return records
+
+def parse_csv(text: str) -> list:
+    """
+    Parses CSV with a header row naming the contact fields.
+
+    A `tags` column holds comma-separated tag names.
+
+    Args:
+        text (str): The decoded file content.
+
+    Returns:
+        list: One dict per data row, with empty cells mapped to None and tags split into lists.
+    """
+    reader = csv.DictReader(io.StringIO(text))
+    records = [{key: value or None for key, value in row.items() if key} for row in reader]
+    for record in records:
+        if "tags" in record:
+            record["tags"] = record["tags"].split(",") if record["tags"] else []
+    return records
+
+def parse_file(filename: str, content: bytes) -> list:
+    """
+    Parses an uploaded CSV or NDJSON file, chosen by its extension.
+
+    Args:
+        filename (str): The name of the uploaded file.
+        content (bytes): The raw file content.
+
+    Returns:
+        list: The parsed records.
+
+    Raises:
+        ValueError: If the file type is unsupported or the file is not UTF-8.
+    """
+    try:
+        text = content.decode("utf-8-sig")
+    except UnicodeDecodeError:
+        raise ValueError("File must be UTF-8 encoded")
+    name = (filename or "").lower()
+    if name.endswith(".csv"):
+        return parse_csv(text)
+    if name.endswith((".ndjson", ".jsonl")):
+        return parse_ndjson(text)
+    raise ValueError("Unsupported file type. Upload a .csv or .ndjson file.")
+
+def _format_validation_error(error: ValidationError) -> str:
+    """Flattens a Pydantic validation error into one line."""
+    return "; ".join(
+        f"{'.'.join(str(part) for part in item['loc']) or 'row'}: {item['msg']}"
+        for item in error.errors()
+    )
+
+def _existing_keys(db: Session, user_id: int, emails: set, phones: set) -> tuple[set, set]:
+    """Returns which of the given emails and phone numbers the user already has."""
+    conditions = []
+    if emails:
+        conditions.append(Contact.email.in_(emails))
+    if phones:
+        conditions.append(Contact.phone_number.in_(phones))
+    if not conditions:
+        return set(), set()
+    rows = db.execute(
+        select(Contact.email, Contact.phone_number).where(
+            Contact.user_id == user_id, Contact.deleted_at.is_(None), or_(*conditions)
+        )
+    ).all()
+    return {row.email for row in rows}, {row.phone_number for row in rows}
+
+def import_contacts(
+    db: Session,
+    user_id: int,
+    records: list,
+    dedupe: bool = False,
+    chunk_size: int = BULK_CHUNK_SIZE,
+) -> dict:
+    """
+    Validates and inserts contacts in chunks, one transaction per chunk.
+
+    Each chunk is validated with `ContactCreate`, then written with a single
+    executemany INSERT and one commit, instead of an INSERT, COMMIT and
+    SELECT per contact. A chunk that fails to insert is rolled back on its own
+    and reported, without undoing the chunks committed before it.
+
+    Args:
+        db (Session): The database session object.
+        user_id (int): The ID of the user who will own the contacts.
+        records (list): The raw records to import.
+        dedupe (bool): Skip records whose email or phone number already exists,
+            either in the user's contacts or earlier in the same import.
+        chunk_size (int): The number of records validated and inserted per transaction.
+
+    Returns:
+        dict: The import report with totals and per-row errors (rows are 1-based).
+
+    Raises:
+        ValueError: If more than `MAX_BULK_ROWS` records are submitted.
+    """
+    if len(records) > MAX_BULK_ROWS:
+        raise ValueError(f"Too many rows. Max is {MAX_BULK_ROWS}.")
+
+    report = {"total": len(records), "created": 0, "skipped": 0, "failed": 0, "errors": []}
+    seen_emails, seen_phones = set(), set()
+
+    for start in range(0, len(records), chunk_size):
+        valid = []
+        for row, record in enumerate(records[start:start + chunk_size], start=start + 1):
+            try:
+                contact = ContactCreate.model_validate(record)
+            except ValidationError as e:
+                report["failed"] += 1
+                report["errors"].append({"row": row, "detail": _format_validation_error(e)})
+                continue
+            valid.append((row, contact.model_dump()))
+
+        if dedupe and valid:
+            emails = {values["email"] for _, values in valid if values["email"]}
+            phones = {values["phone_number"] for _, values in valid if values["phone_number"]}
+            known_emails, known_phones = _existing_keys(db, user_id, emails, phones)
+            seen_emails |= known_emails
+            seen_phones |= known_phones
+            # The chunk's own keys count as seen only once its insert commits
+            chunk_emails, chunk_phones = set(), set()
+            unique = []
+            for row, values in valid:
+                email, phone = values["email"], values["phone_number"]
+                if (email and (email in seen_emails or email in chunk_emails)) or (
+                    phone and (phone in seen_phones or phone in chunk_phones)
+                ):
+                    report["skipped"] += 1
+                    report["errors"].append({"row": row, "detail": "Duplicate email or phone number"})
+                    continue
+                if email:
+                    chunk_emails.add(email)
+                if phone:
+                    chunk_phones.add(phone)
+                unique.append((row, values))
+            valid = unique
+
+        if not valid:
+            continue
+        try:
+            # Bumped first, so the chunk's updated_at is assigned while the user's writes are serialized
+            crud.bump_contacts_version(db, user_id)
+            tags = [values.pop("tags", None) for _, values in valid]
+            rows = [
+                {**values, "user_id": user_id, "birthday_md": birthday_key(values["birthday"])}
+                for _, values in valid
+            ]
+            if any(tags):
+                ids = db.scalars(insert(Contact).returning(Contact.id, sort_by_parameter_order=True), rows).all()
+                crud.add_contact_tags(db, user_id, {contact_id: names for contact_id, names in zip(ids, tags) if names})
+            else:
+                db.execute(insert(Contact), rows)
+            db.commit()
+        except SQLAlchemyError as e:
+            db.rollback()
+            report["failed"] += len(valid)
+            detail = f"Chunk insert failed: {e.__class__.__name__}"
+            report["errors"].extend({"row": row, "detail": detail} for row, _ in valid)
+            continue
+        if dedupe:
+            seen_emails |= chunk_emails
+            seen_phones |= chunk_phones
+        report["created"] += len(valid)
+
+    return report
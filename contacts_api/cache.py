@@ -0,0 +1,284 @@
+import asyncio
+import logging
+import sys
+import threading
+import time
+from collections import OrderedDict
+from pydantic import BaseModel, ValidationError
+from contacts_api.config import settings
+
+logger = logging.getLogger(__name__)
+
+_redis_client = None
+
+# Stored in place of an invalidated Redis entry for REDIS_INVALIDATION_TTL seconds
+INVALIDATED = b"invalidated"
+
+class TTLCache:
+    """A thread-safe, size-bounded LRU cache whose entries expire at a per-entry deadline.
+
+    Attributes:
+        maxsize (int): Maximum number of entries; the least recently used entry is evicted beyond it.
+        ttl (float): Default lifetime of an entry in seconds.
+        hits (int): Number of lookups answered from the cache.
+        misses (int): Number of lookups that found no live entry.
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """
+        Returns the live value stored under `key`, or None.
+
+        Args:
+            key (Hashable): The cache key.
+
+        Returns:
+            Any or None: The cached value if present and not expired.
+        """
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] <= now:
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key, value, ttl: float = None):
+        """
+        Stores `value` under `key`.
+
+        Args:
+            key (Hashable): The cache key.
+            value (Any): The value to cache.
+            ttl (float, optional): Lifetime in seconds, capped at the cache's default TTL.
+        """
+        ttl = self.ttl if ttl is None else min(ttl, self.ttl)
+        if ttl <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def pop(self, key):
+        """Removes the entry stored under `key`, if any."""
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        """Removes every entry and resets the counters."""
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = 0
+
+    def stats(self) -> dict:
+        """
+        Reports the cache's size and hit/miss counters.
+
+        Returns:
+            dict: Current size, maximum size, hits and misses.
+        """
+        with self._lock:
+            return {"size": len(self._entries), "maxsize": self.maxsize, "hits": self.hits, "misses": self.misses}
+
+def get_redis():
+    """
+    Returns the shared async Redis client, creating it on first use.
+
+    The client keeps a bounded connection pool shared by every cache in the worker.
+
+    Returns:
+        redis.asyncio.Redis or None: The client, or None when REDIS_URL is not configured.
+    """
+    global _redis_client
+    if _redis_client is None and settings.REDIS_URL:
+        from redis import asyncio as aioredis
+
+        _redis_client = aioredis.Redis.from_url(
+            settings.REDIS_URL,
+            max_connections=settings.REDIS_MAX_CONNECTIONS,
+            socket_timeout=settings.REDIS_SOCKET_TIMEOUT,
+            socket_connect_timeout=settings.REDIS_SOCKET_TIMEOUT,
+        )
+    return _redis_client
+
+def redis_errors() -> tuple:
+    """
+    Returns the exceptions a Redis call may raise, for `except` clauses.
+
+    redis is only imported once a client is created, and no Redis error can
+    be raised before that, so its exception classes are looked up lazily.
+
+    Returns:
+        tuple: RedisError, when redis is loaded, and OSError.
+    """
+    exceptions = sys.modules.get("redis.exceptions")
+    return (exceptions.RedisError, OSError) if exceptions is not None else (OSError,)
+
+async def close_redis():
+    """Closes the shared Redis client's connections, if it was created."""
+    global _redis_client
+    if _redis_client is not None:
+        client, _redis_client = _redis_client, None
+        await client.aclose()
+
+class TwoTierCache:
+    """A cache of Pydantic models with an in-process L1 and an optional, shared Redis L2.
+
+    Lookups try the L1 first, then Redis; Redis hits are copied into the L1.
+    Values are stored in Redis as the schema's JSON and validated back into
+    the schema on the way out. When Redis is not configured or fails, the cache
+    keeps working on the L1 alone and retries Redis after REDIS_RETRY_INTERVAL.
+
+    `set` fills a missing entry with a value just read from the database. An
+    invalidation overwrites the Redis entry with a marker instead of deleting
+    it, and fills only write where no entry is (SET NX). So a request that
+    read the row before a change and fills after its invalidation leaves the
+    marker in place, and the next request reads the row again.
+
+    Attributes:
+        namespace (str): Prefix of the Redis keys.
+        schema (type[BaseModel]): The model cached values are validated into.
+        l1 (TTLCache): The in-process tier.
+        ttl (int): Lifetime of Redis entries in seconds.
+    """
+
+    def __init__(self, namespace: str, schema: type[BaseModel], l1: TTLCache, ttl: int, redis_factory=get_redis):
+        self.namespace = namespace
+        self.schema = schema
+        self.l1 = l1
+        self.ttl = ttl
+        self._redis_factory = redis_factory
+        self._retry_at = 0.0
+        self._loop = None
+        self._tasks = set()
+        self.l2_hits = 0
+        self.l2_misses = 0
+        self.l2_errors = 0
+
+    def _key(self, key) -> str:
+        return f"{self.namespace}:{key}"
+
+    def _redis(self):
+        """Returns the Redis client, or None while it is unconfigured or backing off after an error."""
+        if time.monotonic() < self._retry_at:
+            return None
+        self._loop = asyncio.get_running_loop()
+        return self._redis_factory()
+
+    def _redis_failed(self, error: Exception):
+        """Falls back to the L1 alone for a while after a Redis error."""
+        self.l2_errors += 1
+        self._retry_at = time.monotonic() + settings.REDIS_RETRY_INTERVAL
+        logger.warning("Redis unavailable for %s cache, using L1 only: %s", self.namespace, error)
+
+    async def get(self, key):
+        """
+        Returns the cached value for `key` from either tier.
+
+        Args:
+            key (Hashable): The cache key.
+
+        Returns:
+            BaseModel or None: The cached value, validated into `schema`.
+        """
+        value = self.l1.get(key)
+        if value is not None:
+            return value
+        client = self._redis()
+        if client is None:
+            return None
+        try:
+            raw = await client.get(self._key(key))
+        except redis_errors() as e:
+            self._redis_failed(e)
+            return None
+        if raw is None or raw == INVALIDATED:
+            self.l2_misses += 1
+            return None
+        try:
+            value = self.schema.model_validate_json(raw)
+        except ValidationError:
+            self.l2_misses += 1
+            return None
+        self.l2_hits += 1
+        self.l1.set(key, value)
+        return value
+
+    async def set(self, key, value: BaseModel):
+        """
+        Stores `value` in both tiers, in Redis only if it holds no entry and no invalidation marker.
+
+        Args:
+            key (Hashable): The cache key.
+            value (BaseModel): An instance of `schema`.
+        """
+        self.l1.set(key, value)
+        client = self._redis()
+        if client is None:
+            return
+        try:
+            await client.set(self._key(key), value.model_dump_json(), ex=self.ttl, nx=True)
+        except redis_errors() as e:
+            self._redis_failed(e)
+
+    async def invalidate(self, key):
+        """
+        Removes `key` from the L1 and replaces it in Redis with an invalidation marker.
+
+        Args:
+            key (Hashable): The cache key.
+        """
+        self.l1.pop(key)
+        client = self._redis()
+        if client is None:
+            return
+        try:
+            await client.set(self._key(key), INVALIDATED, ex=settings.REDIS_INVALIDATION_TTL)
+        except redis_errors() as e:
+            self._redis_failed(e)
+
+    def invalidate_nowait(self, key):
+        """
+        Removes `key` from the L1 now and from Redis in the background.
+
+        For synchronous callers such as ORM events, which may run in a worker
+        thread. The Redis delete is scheduled on the event loop the cache last
+        ran on.
+
+        Args:
+            key (Hashable): The cache key.
+        """
+        self.l1.pop(key)
+        try:
+            task = asyncio.get_running_loop().create_task(self.invalidate(key))
+        except RuntimeError:
+            if self._loop is not None and self._loop.is_running():
+                asyncio.run_coroutine_threadsafe(self.invalidate(key), self._loop)
+            return
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    def stats(self) -> dict:
+        """
+        Reports the counters of both tiers.
+
+        Returns:
+            dict: L1 stats and Redis hits, misses and errors.
+        """
+        return {
+            "l1": self.l1.stats(),
+            "l2": {"hits": self.l2_hits, "misses": self.l2_misses, "errors": self.l2_errors},
+        }
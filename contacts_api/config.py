@@ -1,7 +1,8 @@
-from pydantic import BaseSettings
-import redis
-
-redis_client = redis.StrictRedis(host='localhost', port=6379, db=0, decode_responses=True)
+import threading
+from functools import lru_cache
+from pathlib import Path
+from typing import Literal, Optional
+from pydantic_settings import BaseSettings, SettingsConfigDict
 
 class Settings(BaseSettings):
     SECRET_KEY: str
@@ -10,8 +11,203 @@ class Settings(BaseSettings):
     SMTP_USERNAME: str
     SMTP_PASSWORD: str
     FRONTEND_URL: str
+    SMTP_USE_TLS: bool = True
+    SMTP_START_TLS: bool = False
+    SMTP_TIMEOUT: float = 10
+
+    # Email outbox worker: batch size, idle poll interval and how long an idle SMTP session is kept
+    EMAIL_WORKER_ENABLED: bool = True
+    EMAIL_BATCH_SIZE: int = 50
+    EMAIL_POLL_INTERVAL: float = 5
+    EMAIL_SMTP_IDLE_TIMEOUT: int = 60
+    # Retries back off exponentially from the base delay; messages are dead-lettered after the last attempt
+    EMAIL_MAX_ATTEMPTS: int = 8
+    EMAIL_RETRY_BASE_DELAY: int = 30
+    EMAIL_RETRY_MAX_DELAY: int = 3600
+    # Messages per minute per recipient domain and worker, 0 disables the limit
+    EMAIL_DOMAIN_RATE_LIMIT: int = 60
+    # Seconds a claimed message stays reserved before another worker may retry it
+    EMAIL_CLAIM_TIMEOUT: int = 300
+    # Seconds the outbox counts reported at /metrics are reused before the outbox is counted again
+    EMAIL_STATS_TTL: int = 30
+
+    # Database engine
+    DATABASE_URL: str = "sqlite:///./contacts.db"
+    ASYNC_DATABASE_URL: str = "sqlite+aiosqlite:///./contacts.db"
+    USE_ASYNC_DB: bool = False
+
+    # Connection pool, sized against the number of workers sharing the database
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: int = 30
+    DB_POOL_PRE_PING: bool = True
+    DB_POOL_RECYCLE: int = 1800
+    # Postgres statement_timeout in milliseconds, 0 disables it
+    DB_STATEMENT_TIMEOUT_MS: int = 0
+
+    # Password hashing: bcrypt cost factor, hashing threads and the most jobs queued before 503s
+    BCRYPT_ROUNDS: int = 12
+    PASSWORD_HASH_WORKERS: int = 4
+    PASSWORD_HASH_QUEUE_LIMIT: int = 64
+
+    # Per-worker auth caches; token entries never outlive the token's exp
+    TOKEN_CACHE_SIZE: int = 10000
+    TOKEN_CACHE_TTL: int = 900
+    USER_CACHE_SIZE: int = 10000
+    USER_CACHE_TTL: int = 60
+    USER_CACHE_REDIS_TTL: int = 3600
+
+    # Deleted contacts are kept as tombstones for the changes feed, and purged every
+    # CONTACT_TOMBSTONE_PURGE_INTERVAL seconds (0 disables it) once older than the retention;
+    # `since` cursors that had not reached a purged tombstone get 410
+    CONTACT_TOMBSTONE_RETENTION_DAYS: int = 30
+    CONTACT_TOMBSTONE_PURGE_INTERVAL: int = 3600
+
+    # Contacts version counters behind the ETags of contact reads; the L1 TTL bounds how long
+    # other workers may answer 304 to a copy made stale by a write on this one
+    CONTACTS_VERSION_CACHE_TTL: float = 2
+    CONTACTS_VERSION_REDIS_TTL: int = 3600
+    # Optional per-worker cache of serialized contact responses, keyed by contacts version
+    RESPONSE_CACHE_ENABLED: bool = False
+    RESPONSE_CACHE_SIZE: int = 1000
+    RESPONSE_CACHE_TTL: int = 300
+    # GET /contacts/facets aggregates the whole contact book, so it uses the response cache regardless
+    FACETS_CACHE_ENABLED: bool = True
+
+    # extra_data keys filtered on often (``extra.<key>=``): an expression index each on SQLite,
+    # one GIN index over the whole column on Postgres; created at startup
+    EXTRA_DATA_INDEXED_KEYS: list[str] = []
+
+    # Prometheus metrics at /metrics; Server-Timing headers split each response's time between DB and bcrypt.
+    # /metrics has no authentication: when enabled, keep it reachable by the scraper only
+    METRICS_ENABLED: bool = False
+    METRICS_SERVER_TIMING: bool = True
+
+    # Query budgets for development and CI: "log" warns about routes over their budget or repeating
+    # a statement more than QUERY_REPEAT_LIMIT times (N+1), "raise" fails them; 0 means no default budget
+    QUERY_BUDGET_MODE: Literal["off", "log", "raise"] = "off"
+    QUERY_BUDGET_DEFAULT: int = 0
+    QUERY_REPEAT_LIMIT: int = 5
+
+    # Sliding window rate limits such as "5/minute"; empty disables one. "redis" shares the
+    # counters through REDIS_URL, "memory" keeps them per worker
+    RATE_LIMIT_ENABLED: bool = True
+    RATE_LIMIT_BACKEND: Literal["memory", "redis"] = "memory"
+    RATE_LIMIT_MAX_KEYS: int = 100_000
+    RATE_LIMIT_TRUST_FORWARDED: bool = False
+    # Proxies in front of the app that append to X-Forwarded-For, when RATE_LIMIT_TRUST_FORWARDED is set
+    RATE_LIMIT_TRUSTED_PROXIES: int = 1
+    RATE_LIMIT_DEFAULT: str = ""
+    RATE_LIMIT_LOGIN_PER_IP: str = "20/minute"
+    RATE_LIMIT_LOGIN_PER_USERNAME: str = "5/minute"
+    RATE_LIMIT_REGISTER_PER_IP: str = "10/hour"
+    RATE_LIMIT_EMAIL_PER_IP: str = "10/hour"
+    RATE_LIMIT_EMAIL_PER_ADDRESS: str = "3/hour"
+
+    # Production server (python -m contacts_api.server). "auto" picks uvloop and httptools when installed.
+    # On SIGTERM readiness fails for SHUTDOWN_DRAIN_DELAY seconds while requests are still served, so
+    # load balancers stop routing to the worker; then requests in flight get SHUTDOWN_TIMEOUT seconds
+    SERVER_HOST: str = "0.0.0.0"
+    SERVER_PORT: int = 8000
+    SERVER_WORKERS: int = 1
+    SERVER_LOOP: Literal["auto", "asyncio", "uvloop"] = "auto"
+    SERVER_HTTP: Literal["auto", "h11", "httptools"] = "auto"
+    SERVER_KEEPALIVE_TIMEOUT: int = 5
+    SHUTDOWN_DRAIN_DELAY: float = 5
+    SHUTDOWN_TIMEOUT: float = 30
+
+    # Startup: create missing tables (unless Alembic manages the schema), then open pool connections, compile the common statements and
+    # load the most active users into the user cache before the worker accepts requests
+    DB_CREATE_ALL: bool = True
+    WARMUP_ENABLED: bool = True
+    WARMUP_POOL_CONNECTIONS: int = 5
+    WARMUP_CACHE_USERS: int = 100
+    HEALTH_CHECK_TIMEOUT: float = 2
+
+    # Shared Redis cache tier, e.g. redis://localhost:6379/0; caches stay in-process when unset
+    REDIS_URL: Optional[str] = None
+    REDIS_MAX_CONNECTIONS: int = 20
+    REDIS_SOCKET_TIMEOUT: float = 0.5
+    REDIS_RETRY_INTERVAL: int = 30
+    # An invalidated Redis entry refuses fills for this many seconds, so a request that read the
+    # database before the change cannot store the old value after it
+    REDIS_INVALIDATION_TTL: int = 10
+
+    # Avatar uploads: "local" stores variants under AVATAR_DIR, "cloudinary" uploads them to Cloudinary
+    AVATAR_STORAGE: Literal["local", "cloudinary"] = "local"
+    AVATAR_DIR: str = "./avatars"
+    AVATAR_MAX_FILE_SIZE: int = 2 * 1024 * 1024
+    AVATAR_MAX_PIXELS: int = 25_000_000
+    AVATAR_WEBP_QUALITY: int = 80
+    CLOUDINARY_CLOUD_NAME: Optional[str] = None
+    CLOUDINARY_API_KEY: Optional[str] = None
+    CLOUDINARY_API_SECRET: Optional[str] = None
+
+    # SQLite connection pragmas: "production" enables WAL, synchronous=NORMAL and mmap
+    SQLITE_PROFILE: Literal["default", "production"] = "production"
+    SQLITE_MMAP_SIZE: int = 256 * 1024 * 1024
+    SQLITE_BUSY_TIMEOUT_MS: int = 5000
+
+    # The package's .env provides defaults, a .env in the working directory overrides them
+    model_config = SettingsConfigDict(
+        env_file=(Path(__file__).parent / ".env", ".env"),
+        extra="ignore",
+    )
+
+@lru_cache(maxsize=None)
+def get_settings() -> Settings:
+    """
+    Reads the settings from the environment and the .env files, once per process.
+
+    Returns:
+        Settings: The settings.
+
+    Raises:
+        pydantic.ValidationError: If a required setting is missing or a value is invalid.
+    """
+    return Settings()
+
+class LazySettings:
+    """Stands in for the `Settings` instance and reads it on first use.
+
+    Modules can import `settings` without the environment being complete;
+    missing variables are reported by whatever first needs a setting.
+    Assignments go through to the settings, so tests can patch them.
+    """
+
+    def __getattr__(self, name):
+        return getattr(get_settings(), name)
+
+    def __setattr__(self, name, value):
+        setattr(get_settings(), name, value)
+
+settings = LazySettings()
+
+class Lazy:
+    """Stands in for an object built from the settings and builds it on first use.
+
+    Lets modules define their singletons (caches, limiters, executors) at
+    import time, like `settings`, without the environment being complete.
+    Attribute reads, assignments and calls go through to the object.
+    """
+
+    def __init__(self, factory):
+        object.__setattr__(self, "_factory", factory)
+        object.__setattr__(self, "_instance", None)
+        object.__setattr__(self, "_lock", threading.Lock())
+
+    def _get(self):
+        if self._instance is None:
+            with self._lock:
+                if self._instance is None:
+                    object.__setattr__(self, "_instance", self._factory())
+        return self._instance
+
+    def __getattr__(self, name):
+        return getattr(self._get(), name)
 
-    class Config:
-        env_file = ".env"
+    def __setattr__(self, name, value):
+        setattr(self._get(), name, value)
 
-settings = Settings()
+    def __call__(self, *args, **kwargs):
+        return self._get()(*args, **kwargs)
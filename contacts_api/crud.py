@@ -1,6 +1,37 @@
+import json
+from sqlalchemy import String, and_, case, cast, delete, exists, func, insert, literal, or_, select, tuple_, union_all, update
 from sqlalchemy.orm import Session
-from contacts_api.models import Contact, User
-from datetime import date, timedelta
+from contacts_api import extra_data, search
+from contacts_api.models import Contact, Tag, User, birthday_key, contact_tags, utcnow
+from contacts_api.pagination import DEFAULT_PAGE_SIZE, CursorExpiredError, decode_cursor, encode_cursor
+from datetime import date, datetime, timedelta
+
+# Columns a client may request through the ``fields=`` projection.
+CONTACT_FIELDS = {
+    "id": Contact.id,
+    "first_name": Contact.first_name,
+    "last_name": Contact.last_name,
+    "email": Contact.email,
+    "phone_number": Contact.phone_number,
+    "birthday": Contact.birthday,
+    "extra_data": Contact.extra_data,
+    "tags": Contact.tags,
+}
+
+# Sort key of the contact listing; must match the composite index on Contact.
+CONTACT_SORT_KEY = (Contact.last_name, Contact.first_name, Contact.id)
+
+def _tagged(user_id: int, tags) -> list:
+    """Builds one EXISTS condition per tag, so a contact must carry all of them."""
+    return [
+        exists().where(
+            contact_tags.c.contact_id == Contact.id,
+            contact_tags.c.tag_id == Tag.id,
+            Tag.user_id == user_id,
+            Tag.name == name,
+        )
+        for name in dict.fromkeys(tags)
+    ]
 
 def get_contacts(db: Session, user_id: int):
     """
@@ -13,11 +44,206 @@ def get_contacts(db: Session, user_id: int):
     Returns:
         list: A list of Contact objects associated with the given user_id.
     """
-    return db.query(Contact).filter(Contact.user_id == user_id).all()
+    return db.query(Contact).filter(Contact.user_id == user_id, Contact.deleted_at.is_(None)).all()
+
+def get_contacts_page(
+    db: Session,
+    user_id: int,
+    limit: int = DEFAULT_PAGE_SIZE,
+    cursor: str | None = None,
+    fields: list[str] | None = None,
+    tags: list[str] | None = None,
+    extra: list[tuple] | None = None,
+):
+    """
+    Retrieves one page of a user's contacts ordered by (last_name, first_name, id).
+
+    Uses keyset pagination: the cursor carries the sort key of the last row of
+    the previous page, so every page is an index range scan regardless of how
+    deep the client has paged. Only the requested columns are selected.
+
+    Args:
+        db (Session): The database session object.
+        user_id (int): The ID of the user whose contacts are to be retrieved.
+        limit (int): The maximum number of contacts to return.
+        cursor (str, optional): The cursor returned with the previous page.
+        fields (list[str], optional): The contact fields to return. All fields if omitted.
+        tags (list[str], optional): Only return contacts carrying every one of these tags.
+        extra (list[tuple], optional): Only return contacts whose `extra_data` fields
+            equal these (key, value) pairs; see `extra_data.parse_filters`.
+
+    Returns:
+        tuple: A list of contact dicts and the cursor of the next page (None on the last page).
+
+    Raises:
+        ValueError: If the cursor is malformed or an unknown field is requested.
+    """
+    fields = list(fields) if fields else list(CONTACT_FIELDS)
+    unknown = [name for name in fields if name not in CONTACT_FIELDS]
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+
+    query = db.query(*[CONTACT_FIELDS[name] for name in fields], *CONTACT_SORT_KEY).filter(
+        Contact.user_id == user_id,
+        Contact.deleted_at.is_(None),
+        *_tagged(user_id, tags or ()),
+        *extra_data.filter_conditions(db.get_bind().dialect.name, extra or ()),
+    )
+    if cursor:
+        last_name, first_name, contact_id = decode_cursor(cursor, len(CONTACT_SORT_KEY))
+        query = query.filter(tuple_(*CONTACT_SORT_KEY) > tuple_(last_name, first_name, contact_id))
+    rows = query.order_by(*CONTACT_SORT_KEY).limit(limit + 1).all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(list(rows[-1][len(fields):]))
+    items = [dict(zip(fields, row[:len(fields)])) for row in rows]
+    return items, next_cursor
+
+def stream_contacts(db: Session, user_id: int, fields: list[str], batch_size: int = 1000):
+    """
+    Streams all of a user's contacts as plain row tuples, batch by batch.
+
+    Selects Core rows rather than ORM entities, so nothing is added to the
+    session's identity map, and fetches through a server-side cursor so only
+    one batch is held in memory at a time.
+
+    Args:
+        db (Session): The database session object.
+        user_id (int): The ID of the user whose contacts are to be streamed.
+        fields (list[str]): The contact fields to select, in output order.
+        batch_size (int): The number of rows fetched from the cursor per batch.
+
+    Yields:
+        list: A batch of row tuples ordered by contact ID.
+    """
+    stmt = (
+        select(*[CONTACT_FIELDS[name] for name in fields])
+        .where(Contact.user_id == user_id, Contact.deleted_at.is_(None))
+        .order_by(Contact.id)
+        .execution_options(yield_per=batch_size)
+    )
+    result = db.execute(stmt)
+    try:
+        yield from result.partitions()
+    finally:
+        result.close()
+
+def get_contact_changes(
+    db: Session,
+    user_id: int,
+    since: str | None = None,
+    limit: int = DEFAULT_PAGE_SIZE,
+):
+    """
+    Retrieves a user's contacts created, modified or deleted after a cursor, oldest change first.
+
+    Without `since` this is a full sync: every live contact, paged the same
+    way; tombstones are skipped, so a page may hold fewer than `limit`
+    contacts while `has_more` is true, but the cursor moves past them. After
+    that, deleted contacts are returned as tombstones with only their id and
+    timestamps. Writes to a user's contacts are serialized by the
+    `contacts_version` bump, and `updated_at` is assigned when the write is
+    flushed after it, so changes commit in `updated_at` order and a cursor
+    never skips one.
+
+    A cursor also records the user's `contacts_purged_until` when it was
+    issued. It expires only if `purge_deleted_contacts` has since removed a
+    tombstone the client has not seen, so neither old rows nor a long pause
+    between syncs expire it.
+
+    Args:
+        db (Session): The database session object.
+        user_id (int): The ID of the user whose changes are to be retrieved.
+        since (str, optional): The cursor returned by the previous call.
+        limit (int): The maximum number of changes to return.
+
+    Returns:
+        tuple: A list of change dicts, the cursor to resume from, and whether more changes are waiting.
+
+    Raises:
+        CursorExpiredError: If tombstones newer than the cursor were purged
+            since it was issued.
+        ValueError: If the cursor is malformed.
+    """
+    purged_until = select(User.contacts_purged_until).where(User.id == user_id)
+    query = db.query(
+        *CONTACT_FIELDS.values(), Contact.updated_at, Contact.deleted_at,
+        purged_until.scalar_subquery().label("purged_until"),
+    ).filter(Contact.user_id == user_id)
+    if since:
+        try:
+            updated_at, contact_id, seen_purge = decode_cursor(since, 3)
+        except ValueError:
+            # Cursors issued before purges were tracked
+            (updated_at, contact_id), seen_purge = decode_cursor(since, 2), None
+        try:
+            updated_at = datetime.fromisoformat(updated_at)
+            seen_purge = datetime.fromisoformat(seen_purge) if seen_purge is not None else None
+        except (TypeError, ValueError):
+            raise ValueError("Invalid cursor")
+        query = query.filter(tuple_(Contact.updated_at, Contact.id) > tuple_(updated_at, contact_id))
+    rows = query.order_by(Contact.updated_at, Contact.id).limit(limit + 1).all()
+
+    purged = rows[0].purged_until if rows else db.scalar(purged_until)
+    if since and purged is not None and purged > updated_at and (seen_purge is None or purged > seen_purge):
+        raise CursorExpiredError("Cursor expired, sync again without `since`")
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    changes = []
+    for row in rows:
+        if row.deleted_at is not None:
+            if since:
+                changes.append({"id": row.id, "updated_at": row.updated_at, "deleted_at": row.deleted_at})
+        else:
+            changes.append({**dict(zip(CONTACT_FIELDS, row)), "updated_at": row.updated_at, "deleted_at": None})
+    if rows:
+        next_cursor = encode_cursor([rows[-1].updated_at.isoformat(), rows[-1].id, purged and purged.isoformat()])
+    else:
+        next_cursor = since
+    return changes, next_cursor, has_more
+
+def purge_deleted_contacts(db: Session, before: datetime) -> int:
+    """
+    Removes tombstones of contacts deleted before a point in time.
+
+    Each affected user's `contacts_purged_until` is moved to the newest
+    tombstone removed, which expires the changes-feed cursors that had not
+    reached it yet. Their `contacts_version` is bumped too, so cached and
+    304 responses of the changes feed do not hide the expiry.
+
+    Args:
+        db (Session): The database session object.
+        before (datetime): Tombstones older than this (UTC) are removed.
+
+    Returns:
+        int: The number of removed rows.
+    """
+    purged = select(Contact.id).where(Contact.deleted_at < before)
+    newest = (
+        select(func.max(Contact.updated_at))
+        .where(Contact.user_id == User.id, Contact.deleted_at < before)
+        .scalar_subquery()
+    )
+    user_ids = db.scalars(select(Contact.user_id).where(Contact.deleted_at < before).distinct()).all()
+    if not user_ids:
+        return 0
+    db.execute(
+        update(User)
+        .where(User.id.in_(user_ids))
+        .values(contacts_purged_until=newest, contacts_version=User.contacts_version + 1)
+        .execution_options(synchronize_session=False)
+    )
+    db.info.setdefault("changed_contacts_user_ids", set()).update(user_ids)
+    db.execute(delete(contact_tags).where(contact_tags.c.contact_id.in_(purged)))
+    result = db.execute(delete(Contact).where(Contact.deleted_at < before))
+    db.commit()
+    return result.rowcount
 
 def get_contact_by_id(db: Session, user_id: int, contact_id: int):
     """
-    Retrieves a specific contact by its ID for a given user.
+    Retrieves a specific contact by its ID for a given user. Deleted contacts are not returned.
 
     Args:
         db (Session): The database session object.
@@ -27,7 +253,270 @@ def get_contact_by_id(db: Session, user_id: int, contact_id: int):
     Returns:
         Contact or None: The Contact object if found, otherwise None.
     """
-    return db.query(Contact).filter(Contact.id == contact_id, Contact.user_id == user_id).first()
+    return db.query(Contact).filter(
+        Contact.id == contact_id, Contact.user_id == user_id, Contact.deleted_at.is_(None)
+    ).first()
+
+def get_contacts_by_ids(db: Session, user_id: int, ids: list[int], fields: list[str] | None = None) -> list[dict]:
+    """
+    Retrieves several of a user's contacts in one query.
+
+    Args:
+        db (Session): The database session object.
+        user_id (int): The ID of the user who owns the contacts.
+        ids (list[int]): The contact IDs; unknown, deleted and other users' IDs are skipped.
+        fields (list[str], optional): The contact fields to return. All fields if omitted.
+
+    Returns:
+        list: Contact dicts in the order of `ids`.
+
+    Raises:
+        ValueError: If an unknown field is requested.
+    """
+    fields = list(fields) if fields else list(CONTACT_FIELDS)
+    unknown = [name for name in fields if name not in CONTACT_FIELDS]
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+    rows = db.execute(
+        select(Contact.id, *[CONTACT_FIELDS[name] for name in fields]).where(
+            Contact.id.in_(ids), Contact.user_id == user_id, Contact.deleted_at.is_(None)
+        )
+    ).all()
+    by_id = {row[0]: dict(zip(fields, row[1:])) for row in rows}
+    return [by_id[contact_id] for contact_id in dict.fromkeys(ids) if contact_id in by_id]
+
+def batch_contacts(db: Session, user_id: int, operations: list[dict]) -> list[dict]:
+    """
+    Runs a batch of get, patch and delete operations on a user's contacts in one transaction.
+
+    Operations are applied set-based rather than one contact at a time:
+    patches with identical data share one ``UPDATE ... WHERE id IN (...)``,
+    all deletes are one soft-delete UPDATE, and both return the IDs of the
+    affected rows with RETURNING; one SELECT then reads back those contacts
+    and the gets. An ID may appear in only one operation, so the order of
+    operations does not matter.
+
+    Args:
+        db (Session): The database session object.
+        user_id (int): The ID of the user who owns the contacts.
+        operations (list[dict]): Operations with `op` ("get", "patch" or "delete"),
+            `id` and, for patches, `data` holding the fields to change.
+
+    Returns:
+        list: One result per operation, in order, with `op`, `id`, `status` (200,
+        400 or 404), and `contact` (a dict of the contact after the operation) or `detail`.
+    """
+    results = [{"op": op["op"], "id": op["id"]} for op in operations]
+    owner = {}
+    patches, deletes, gets = {}, [], []
+    for index, op in enumerate(operations):
+        if op["id"] in owner:
+            results[index].update(status=400, detail="Contact ID repeated in batch")
+            continue
+        owner[op["id"]] = index
+        if op["op"] == "patch":
+            data = dict(op.get("data") or {})
+            if "birthday" in data:
+                data["birthday_md"] = birthday_key(data["birthday"])
+            if data.get("tags") is None:
+                data.pop("tags", None)
+            # Identical patches share one UPDATE; JSON makes the data, extra_data included, hashable
+            key = json.dumps(data, sort_keys=True, default=str)
+            patches.setdefault(key, (data, []))[1].append(op["id"])
+        elif op["op"] == "delete":
+            deletes.append(op["id"])
+        else:
+            gets.append(op["id"])
+
+    def owned(ids):
+        return Contact.id.in_(ids), Contact.user_id == user_id, Contact.deleted_at.is_(None)
+
+    modified = []
+    if patches or deletes:
+        # Bumped first, so updated_at is assigned while the user's writes are serialized
+        bump_contacts_version(db, user_id)
+        now = utcnow()
+        for data, ids in patches.values():
+            values = dict(data)
+            tags = values.pop("tags", None)
+            patched = db.scalars(
+                update(Contact).where(*owned(ids)).values(**values, updated_at=now).returning(Contact.id)
+            ).all()
+            if tags is not None and patched:
+                set_contact_tags(db, user_id, patched, tags)
+            modified += patched
+        if deletes:
+            modified += db.scalars(
+                update(Contact).where(*owned(deletes)).values(deleted_at=now, updated_at=now).returning(Contact.id)
+            ).all()
+    found = {}
+    if gets or modified:
+        # Read back rather than returned, as SQLite evaluates the tags subquery wrongly in RETURNING
+        rows = db.execute(
+            select(*CONTACT_FIELDS.values()).where(
+                Contact.user_id == user_id,
+                or_(Contact.id.in_(modified), and_(Contact.id.in_(gets), Contact.deleted_at.is_(None))),
+            )
+        ).all()
+        found = {row.id: row._asdict() for row in rows}
+    db.commit()
+
+    for contact_id, index in owner.items():
+        contact = found.get(contact_id)
+        if contact is None:
+            results[index].update(status=404, detail="Contact not found or access denied")
+        else:
+            results[index].update(status=200, contact=contact)
+    return results
+
+def get_contacts_version(db: Session, user_id: int) -> int:
+    """
+    Retrieves the version counter of a user's contacts.
+
+    Args:
+        db (Session): The database session object.
+        user_id (int): The ID of the user.
+
+    Returns:
+        int: The current version, 0 if the user does not exist.
+    """
+    return db.scalar(select(User.contacts_version).where(User.id == user_id)) or 0
+
+def bump_contacts_version(db: Session, user_id: int):
+    """
+    Increments the version counter of a user's contacts in the current transaction.
+
+    Call it from every write to a user's contacts, before the contacts are
+    changed: the UPDATE locks the user's row, which serializes the writes, so
+    `updated_at` must be assigned after it for changes to commit in
+    `updated_at` order. The cached version is dropped once the transaction
+    commits (see `response_cache`).
+
+    Args:
+        db (Session): The database session object.
+        user_id (int): The ID of the user whose contacts changed.
+    """
+    db.execute(
+        update(User).where(User.id == user_id).values(contacts_version=User.contacts_version + 1)
+    )
+    db.info.setdefault("changed_contacts_user_ids", set()).add(user_id)
+
+def get_tag_ids(db: Session, user_id: int, names) -> dict:
+    """
+    Resolves a user's tag names to tag IDs, creating the tags that do not exist yet.
+
+    Call it after `bump_contacts_version`, which serializes the user's writes,
+    so two requests do not create the same tag.
+
+    Args:
+        db (Session): The database session object.
+        user_id (int): The ID of the user who owns the tags.
+        names (Iterable[str]): The tag names.
+
+    Returns:
+        dict: Tag IDs keyed by name.
+    """
+    names = list(dict.fromkeys(names))
+    if not names:
+        return {}
+    ids = dict(db.execute(select(Tag.name, Tag.id).where(Tag.user_id == user_id, Tag.name.in_(names))).all())
+    missing = [name for name in names if name not in ids]
+    if missing:
+        ids.update(db.execute(
+            insert(Tag).returning(Tag.name, Tag.id), [{"user_id": user_id, "name": name} for name in missing]
+        ).all())
+    return ids
+
+def add_contact_tags(db: Session, user_id: int, tags_by_contact: dict):
+    """
+    Attaches tags to contacts that do not carry them yet, such as new contacts.
+
+    Args:
+        db (Session): The database session object.
+        user_id (int): The ID of the user who owns the contacts.
+        tags_by_contact (dict): Tag names keyed by contact ID.
+    """
+    tag_ids = get_tag_ids(db, user_id, (name for names in tags_by_contact.values() for name in names))
+    links = [
+        {"contact_id": contact_id, "tag_id": tag_ids[name]}
+        for contact_id, names in tags_by_contact.items()
+        for name in dict.fromkeys(names)
+    ]
+    if links:
+        db.execute(insert(contact_tags), links)
+
+def set_contact_tags(db: Session, user_id: int, contact_ids: list[int], tags: list[str]):
+    """
+    Replaces the tags of contacts in the current transaction.
+
+    Args:
+        db (Session): The database session object.
+        user_id (int): The ID of the user who owns the contacts.
+        contact_ids (list[int]): IDs of contacts the user owns.
+        tags (list[str]): The new tag names of every one of them.
+    """
+    db.execute(delete(contact_tags).where(contact_tags.c.contact_id.in_(contact_ids)))
+    add_contact_tags(db, user_id, {contact_id: tags for contact_id in contact_ids})
+
+def get_contact_tags(db: Session, contact_ids: list[int]) -> dict:
+    """
+    Retrieves the tags of several contacts in one query.
+
+    Args:
+        db (Session): The database session object.
+        contact_ids (list[int]): The contact IDs.
+
+    Returns:
+        dict: Sorted tag names keyed by contact ID; contacts without tags are left out.
+    """
+    rows = db.execute(
+        select(contact_tags.c.contact_id, Tag.name)
+        .join(Tag, Tag.id == contact_tags.c.tag_id)
+        .where(contact_tags.c.contact_id.in_(contact_ids))
+        .order_by(Tag.name)
+    ).all()
+    tags = {}
+    for contact_id, name in rows:
+        tags.setdefault(contact_id, []).append(name)
+    return tags
+
+def get_contact_facets(db: Session, user_id: int) -> dict:
+    """
+    Counts a user's contacts by tag, birthday month and email domain in one aggregate query.
+
+    Args:
+        db (Session): The database session object.
+        user_id (int): The ID of the user whose contacts are counted.
+
+    Returns:
+        dict: For each of "tags", "birthday_months" and "email_domains", a list of
+        ``{"value", "count"}`` dicts; tags and domains most frequent first, months in calendar order.
+    """
+    live = (Contact.user_id == user_id, Contact.deleted_at.is_(None))
+    locate = func.strpos if db.get_bind().dialect.name == "postgresql" else func.instr
+    domain = func.lower(func.substr(Contact.email, locate(Contact.email, "@") + 1))
+    # Grouped by the output label, since the expressions hold bound parameters
+    statement = union_all(
+        select(literal("tags").label("facet"), Tag.name.label("value"), func.count().label("count"))
+        .select_from(Tag)
+        .join(contact_tags, contact_tags.c.tag_id == Tag.id)
+        .join(Contact, Contact.id == contact_tags.c.contact_id)
+        .where(Tag.user_id == user_id, *live)
+        .group_by(Tag.name),
+        select(literal("birthday_months"), cast(Contact.birthday_md // 100, String).label("value"), func.count())
+        .where(*live, Contact.birthday_md.isnot(None))
+        .group_by("value"),
+        select(literal("email_domains"), domain.label("value"), func.count())
+        .where(*live, Contact.email.isnot(None))
+        .group_by("value"),
+    )
+    facets = {"tags": [], "birthday_months": [], "email_domains": []}
+    for facet, value, count in db.execute(statement):
+        facets[facet].append({"value": int(value) if facet == "birthday_months" else value, "count": count})
+    facets["tags"].sort(key=lambda item: (-item["count"], item["value"]))
+    facets["birthday_months"].sort(key=lambda item: item["value"])
+    facets["email_domains"].sort(key=lambda item: (-item["count"], item["value"]))
+    return facets
 
 def create_contact(db: Session, user_id: int, contact_data: dict):
     """
@@ -36,13 +525,21 @@ def create_contact(db: Session, user_id: int, contact_data: dict):
     Args:
         db (Session): The database session object.
         user_id (int): The ID of the user to associate with the new contact.
-        contact_data (dict): A dictionary containing the contact's information.
+        contact_data (dict): A dictionary containing the contact's information,
+            including its `tags` if any.
 
     Returns:
         Contact: The created Contact object.
     """
+    contact_data = dict(contact_data)
+    tags = contact_data.pop("tags", None)
+    # The bump comes first: it locks the user's row, and the contact is only flushed after it
+    bump_contacts_version(db, user_id)
     contact = Contact(**contact_data, user_id=user_id)
     db.add(contact)
+    if tags:
+        db.flush()
+        add_contact_tags(db, user_id, {contact.id: tags})
     db.commit()
     db.refresh(contact)
     return contact
@@ -56,6 +553,7 @@ def update_contact(db: Session, user_id: int, contact_id: int, update_data: dict
         user_id (int): The ID of the user associated with the contact.
         contact_id (int): The ID of the contact to update.
         update_data (dict): A dictionary containing the updated contact data.
+            `tags`, when given, replaces all the contact's tags.
 
     Returns:
         Contact or None: The updated Contact object if found, otherwise None.
@@ -63,14 +561,23 @@ def update_contact(db: Session, user_id: int, contact_id: int, update_data: dict
     contact = get_contact_by_id(db, user_id, contact_id)
     if contact is None:
         return None
+    update_data = dict(update_data)
+    tags = update_data.pop("tags", None)
+    bump_contacts_version(db, user_id)
     for key, value in update_data.items():
         setattr(contact, key, value)
+    if tags is not None:
+        set_contact_tags(db, user_id, [contact.id], tags)
+        contact.updated_at = utcnow()
     db.commit()
     return contact
 
 def delete_contact(db: Session, user_id: int, contact_id: int):
     """
-    Deletes a specific contact from the database.
+    Deletes a specific contact.
+
+    The row is kept as a tombstone with `deleted_at` set, so the changes feed
+    can report the deletion; `purge_deleted_contacts` removes old tombstones.
 
     Args:
         db (Session): The database session object.
@@ -82,11 +589,18 @@ def delete_contact(db: Session, user_id: int, contact_id: int):
     """
     contact = get_contact_by_id(db, user_id, contact_id)
     if contact:
-        db.delete(contact)
+        bump_contacts_version(db, user_id)
+        contact.deleted_at = utcnow()
         db.commit()
     return contact
 
-def search_contacts(db: Session, user_id: int, query: str):
+def search_contacts(
+    db: Session,
+    user_id: int,
+    query: str,
+    limit: int = search.DEFAULT_SEARCH_LIMIT,
+    extra: list[tuple] | None = None,
+):
     """
     Searches for contacts that match the query in the user's contact list.
 
@@ -94,33 +608,143 @@ def search_contacts(db: Session, user_id: int, query: str):
         db (Session): The database session object.
         user_id (int): The ID of the user whose contacts to search.
         query (str): The search query string.
+        limit (int): The maximum number of contacts to return.
+        extra (list[tuple], optional): Only return contacts whose `extra_data` fields
+            equal these (key, value) pairs.
 
     Returns:
-        list: A list of Contact objects that match the search criteria.
+        list: A list of matching Contact objects, most relevant first.
     """
-    return db.query(Contact).filter(
-        Contact.user_id == user_id,
-        (
-            (Contact.first_name.ilike(f"%{query}%")) |
-            (Contact.last_name.ilike(f"%{query}%")) |
-            (Contact.email.ilike(f"%{query}%"))
-        )
+    filters = extra_data.filter_conditions(db.get_bind().dialect.name, extra or ())
+    return search.search_contacts(db, user_id, query, limit=limit, filters=filters)
+
+def _upcoming_birthdays_filter(days: int) -> tuple:
+    """Builds the window condition and the soonest-first ordering of `get_upcoming_birthdays`."""
+    today = date.today()
+    start = birthday_key(today)
+    end = birthday_key(today + timedelta(days=days))
+    if days >= 365:
+        window = Contact.birthday_md.isnot(None)
+    elif start <= end:
+        window = Contact.birthday_md.between(start, end)
+    else:
+        window = or_(Contact.birthday_md >= start, Contact.birthday_md <= end)
+    return window, (case((Contact.birthday_md >= start, 0), else_=1), Contact.birthday_md)
+
+def get_upcoming_birthdays(db: Session, user_id: int, days: int = 7):
+    """
+    Retrieves contacts whose birthday falls within the next `days` days.
+
+    Compares only month and day through the indexed `birthday_md` column, so
+    the birth year is ignored and the window may wrap past December 31st.
+
+    Args:
+        db (Session): The database session object.
+        user_id (int): The ID of the user whose contacts to check for birthdays.
+        days (int): The size of the window in days, starting today.
+
+    Returns:
+        list: A list of Contact objects ordered by how soon their birthday comes.
+    """
+    window, order = _upcoming_birthdays_filter(days)
+    return db.query(Contact).filter(Contact.user_id == user_id, Contact.deleted_at.is_(None), window).order_by(
+        *order
     ).all()
 
-def get_upcoming_birthdays(db: Session, user_id: int):
+def get_upcoming_birthday_rows(db: Session, user_id: int, days: int = 7, fields: list[str] | None = None) -> list[tuple]:
     """
-    Retrieves contacts with upcoming birthdays within the next 7 days.
+    Retrieves the same contacts as `get_upcoming_birthdays` as plain row tuples.
+
+    Selects Core rows rather than ORM entities, so no objects are built or
+    added to the session; the list routes encode the tuples directly.
 
     Args:
         db (Session): The database session object.
         user_id (int): The ID of the user whose contacts to check for birthdays.
+        days (int): The size of the window in days, starting today.
+        fields (list[str], optional): The contact fields to select, in order. All fields if omitted.
 
     Returns:
-        list: A list of Contact objects with birthdays in the upcoming week.
+        list: Row tuples ordered by how soon their birthday comes.
     """
-    today = date.today()
-    upcoming = today + timedelta(days=7)
-    return db.query(Contact).filter(
-        Contact.user_id == user_id,
-        Contact.birthday.between(today, upcoming)
+    window, order = _upcoming_birthdays_filter(days)
+    columns = [CONTACT_FIELDS[name] for name in fields or CONTACT_FIELDS]
+    return db.execute(
+        select(*columns).where(Contact.user_id == user_id, Contact.deleted_at.is_(None), window).order_by(*order)
     ).all()
+
+def get_user_by_id(db: Session, user_id: int):
+    """
+    Retrieves a user by ID.
+
+    Args:
+        db (Session): The database session object.
+        user_id (int): The ID of the user to retrieve.
+
+    Returns:
+        User or None: The User object if found, otherwise None.
+    """
+    return db.query(User).filter(User.id == user_id).first()
+
+def get_user_by_username(db: Session, username: str):
+    """
+    Retrieves a user by username.
+
+    Args:
+        db (Session): The database session object.
+        username (str): The username to look up.
+
+    Returns:
+        User or None: The User object if found, otherwise None.
+    """
+    return db.query(User).filter(User.username == username).first()
+
+def get_user_by_email(db: Session, email: str):
+    """
+    Retrieves a user by email address.
+
+    Args:
+        db (Session): The database session object.
+        email (str): The email address to look up.
+
+    Returns:
+        User or None: The User object if found, otherwise None.
+    """
+    return db.query(User).filter(User.email == email).first()
+
+def create_user(db: Session, user_data: dict):
+    """
+    Creates a new user and saves it to the database.
+
+    Args:
+        db (Session): The database session object.
+        user_data (dict): The user's fields, including the already hashed password.
+
+    Returns:
+        User: The created User object.
+    """
+    user = User(**user_data)
+    db.add(user)
+    db.commit()
+    db.refresh(user)
+    return user
+
+def update_user(db: Session, user_id: int, update_data: dict):
+    """
+    Updates an existing user with new data.
+
+    Args:
+        db (Session): The database session object.
+        user_id (int): The ID of the user to update.
+        update_data (dict): A dictionary containing the updated user fields.
+
+    Returns:
+        User or None: The updated User object if found, otherwise None.
+    """
+    user = get_user_by_id(db, user_id)
+    if user is None:
+        return None
+    for key, value in update_data.items():
+        setattr(user, key, value)
+    db.commit()
+    return user
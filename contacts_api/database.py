@@ -1,11 +1,190 @@
-from sqlalchemy import create_engine
+import threading
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from starlette.concurrency import run_in_threadpool
+from contacts_api import metrics, query_budget
+from contacts_api.config import Lazy, settings
 
-SQLALCHEMY_DATABASE_URL = "sqlite:///./contacts.db"
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    """Applies the SQLite production profile to every new connection."""
+    cursor = dbapi_connection.cursor()
+    cursor.execute(f"PRAGMA busy_timeout = {int(settings.SQLITE_BUSY_TIMEOUT_MS)}")
+    if settings.SQLITE_PROFILE == "production":
+        cursor.execute("PRAGMA journal_mode = WAL")
+        cursor.execute("PRAGMA synchronous = NORMAL")
+        cursor.execute(f"PRAGMA mmap_size = {int(settings.SQLITE_MMAP_SIZE)}")
+    cursor.close()
 
-# Create the SQLAlchemy engine to connect to the SQLite database
-engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False})
+def engine_options(url: str) -> dict:
+    """
+    Builds the `create_engine` keyword arguments for a database URL from the settings.
+
+    Args:
+        url (str): The database URL.
+
+    Returns:
+        dict: Pool and connection options suited to the URL's dialect and driver.
+    """
+    parsed = make_url(url)
+    if parsed.get_backend_name() == "sqlite":
+        options = {"connect_args": {"check_same_thread": False}}
+        if parsed.database in (None, "", ":memory:"):
+            # In-memory databases live in a single connection; pool sizing does not apply
+            return options
+        if parsed.get_driver_name() == "aiosqlite":
+            # aiosqlite defaults to NullPool, which takes no sizing arguments
+            options["poolclass"] = AsyncAdaptedQueuePool
+        return {
+            **options,
+            "pool_size": settings.DB_POOL_SIZE,
+            "max_overflow": settings.DB_MAX_OVERFLOW,
+            "pool_timeout": settings.DB_POOL_TIMEOUT,
+        }
+
+    options = {
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+    }
+    if parsed.get_backend_name() == "postgresql" and settings.DB_STATEMENT_TIMEOUT_MS:
+        timeout = str(settings.DB_STATEMENT_TIMEOUT_MS)
+        if parsed.get_driver_name() == "asyncpg":
+            options["connect_args"] = {"server_settings": {"statement_timeout": timeout}}
+        else:
+            options["connect_args"] = {"options": f"-c statement_timeout={timeout}"}
+    return options
+
+# Cumulative pool counters, keyed by engine
+_pool_counters = {}
+_pool_counters_lock = threading.Lock()
+
+def track_pool(engine: Engine):
+    """
+    Counts connections, checkouts and the peak number of connections in use on an engine's pool.
+
+    Args:
+        engine (Engine): The engine whose pool to instrument.
+    """
+    counters = {"connects": 0, "checkouts": 0, "in_use": 0, "peak_in_use": 0}
+    _pool_counters[engine] = counters
+
+    @event.listens_for(engine, "connect")
+    def on_connect(dbapi_connection, connection_record):
+        with _pool_counters_lock:
+            counters["connects"] += 1
+
+    @event.listens_for(engine, "checkout")
+    def on_checkout(dbapi_connection, connection_record, connection_proxy):
+        with _pool_counters_lock:
+            counters["checkouts"] += 1
+            counters["in_use"] += 1
+            counters["peak_in_use"] = max(counters["peak_in_use"], counters["in_use"])
+
+    @event.listens_for(engine, "checkin")
+    def on_checkin(dbapi_connection, connection_record):
+        with _pool_counters_lock:
+            counters["in_use"] -= 1
+
+def pool_status(engine: Engine) -> dict:
+    """
+    Reports the current state and cumulative counters of an engine's connection pool.
+
+    Args:
+        engine (Engine): The engine to inspect.
+
+    Returns:
+        dict: Pool class, configured size, connections checked in/out, current
+        overflow and the counters collected by `track_pool`.
+    """
+    pool = engine.pool
+    status = {"pool": type(pool).__name__}
+    for name in ("size", "checkedin", "checkedout", "overflow"):
+        if hasattr(pool, name):
+            status[name] = getattr(pool, name)()
+    status["max_overflow"] = getattr(pool, "_max_overflow", None)
+    with _pool_counters_lock:
+        status.update(_pool_counters.get(engine, {}))
+    return status
+
+def create_db_engine(url: str = None) -> Engine:
+    """
+    Creates the sync engine with the pool and connection settings from `config.Settings`.
+
+    Args:
+        url (str, optional): The database URL; DATABASE_URL by default.
+
+    Returns:
+        Engine: The configured engine, with pool tracking, query metrics and SQLite pragmas attached.
+    """
+    url = url or settings.DATABASE_URL
+    engine = create_engine(url, **engine_options(url))
+    if engine.dialect.name == "sqlite":
+        event.listen(engine, "connect", _set_sqlite_pragmas)
+    track_pool(engine)
+    metrics.instrument_engine(engine)
+    query_budget.instrument_engine(engine)
+    return engine
+
+def create_async_db_engine(url: str = None):
+    """
+    Creates the async engine with the same pool and connection settings as the sync one.
+
+    Args:
+        url (str, optional): The async driver URL; ASYNC_DATABASE_URL by default.
+
+    Returns:
+        AsyncEngine: The configured async engine.
+    """
+    url = url or settings.ASYNC_DATABASE_URL
+    async_engine = create_async_engine(url, **engine_options(url))
+    if async_engine.dialect.name == "sqlite":
+        event.listen(async_engine.sync_engine, "connect", _set_sqlite_pragmas)
+    track_pool(async_engine.sync_engine)
+    metrics.instrument_engine(async_engine.sync_engine)
+    query_budget.instrument_engine(async_engine.sync_engine)
+    return async_engine
+
+# The engines are created on first use, so importing the application does not need the settings
+_engine = None
+_async_engine = None
+_engines_lock = threading.Lock()
+
+def get_engine() -> Engine:
+    """
+    Returns the sync engine of DATABASE_URL, creating it on first use.
+
+    Returns:
+        Engine: The application's engine.
+    """
+    global _engine
+    with _engines_lock:
+        if _engine is None:
+            _engine = create_db_engine()
+    return _engine
+
+def get_async_engine():
+    """
+    Returns the async engine of ASYNC_DATABASE_URL, creating it on first use.
+
+    The async engine is only created when USE_ASYNC_DB is set, so its driver
+    is not required otherwise.
+
+    Returns:
+        AsyncEngine or None: The application's async engine, or None if disabled.
+    """
+    global _async_engine
+    if not settings.USE_ASYNC_DB:
+        return None
+    with _engines_lock:
+        if _async_engine is None:
+            _async_engine = create_async_db_engine()
+    return _async_engine
 
 def get_db():
     """
@@ -23,9 +202,32 @@ def get_db():
     finally:
         db.close()
 
+async def get_session():
+    """
+    Creates and manages a session of the configured database layer.
+
+    With USE_ASYNC_DB enabled this is an `AsyncSession` on the async engine,
+    otherwise a regular `Session`. Route handlers pass it to `async_crud`,
+    which accepts either, so the same handlers serve both configurations.
+
+    Returns:
+        AsyncSession or Session: A new database session object.
+    """
+    if get_async_engine() is not None:
+        async with AsyncSessionLocal() as db:
+            yield db
+        return
+    db = SessionLocal()
+    try:
+        yield db
+    finally:
+        await run_in_threadpool(db.close)
+
 # SessionLocal is used to create a new session for database interactions
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+SessionLocal = Lazy(lambda: sessionmaker(autocommit=False, autoflush=False, bind=get_engine()))
+
+# AsyncSessionLocal keeps objects loaded after commit, since async sessions cannot lazy-load them
+AsyncSessionLocal = Lazy(lambda: async_sessionmaker(bind=get_async_engine(), autoflush=False, expire_on_commit=False))
 
 # Base class for all models to be defined using SQLAlchemy's declarative system
 Base = declarative_base()
-
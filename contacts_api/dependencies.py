@@ -1,10 +1,9 @@
-import jwt
+from jose import ExpiredSignatureError, JWTError, jwt
 from datetime import datetime, timedelta
 from fastapi import HTTPException
 from contacts_api.config import settings
 
 # Secret key and encryption algorithm
-SECRET_KEY = settings.JWT_SECRET_KEY 
 ALGORITHM = "HS256"
 
 TOKEN_EXPIRE_HOURS = 24  
@@ -22,7 +21,7 @@ def create_token(payload: dict, expiration_hours: int) -> str:
         str: The generated JWT token.
     """
     payload["exp"] = datetime.utcnow() + timedelta(hours=expiration_hours)
-    return jwt.encode(payload, SECRET_KEY, algorithm=ALGORITHM)
+    return jwt.encode(payload, settings.SECRET_KEY, algorithm=ALGORITHM)
 
 def verify_token(token: str) -> dict:
     """
@@ -39,11 +38,11 @@ def verify_token(token: str) -> dict:
         with an appropriate message.
     """
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[ALGORITHM])
         return payload
-    except jwt.ExpiredSignatureError:
+    except ExpiredSignatureError:
         raise HTTPException(status_code=400, detail="Token has expired")
-    except jwt.InvalidTokenError:
+    except JWTError:
         raise HTTPException(status_code=400, detail="Invalid token")
 
 def create_email_token(email: str) -> str:
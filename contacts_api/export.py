@@ -0,0 +1,55 @@
+import csv
+import io
+import json
+from contacts_api import crud
+from contacts_api.database import SessionLocal
+
+EXPORT_FIELDS = ["id", "first_name", "last_name", "email", "phone_number", "birthday", "extra_data"]
+EXPORT_BATCH_SIZE = 1000
+
+MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}
+
+def _ndjson_chunk(rows: list) -> str:
+    """Encodes a batch of rows as newline-delimited JSON objects."""
+    return "".join(
+        json.dumps(dict(zip(EXPORT_FIELDS, row)), default=str) + "\n" for row in rows
+    )
+
+def _csv_chunk(rows: list, header: bool = False) -> str:
+    """Encodes a batch of rows as CSV lines, optionally preceded by the header; `extra_data` cells hold JSON."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if header:
+        writer.writerow(EXPORT_FIELDS)
+    writer.writerows([json.dumps(value) if isinstance(value, dict) else value for value in row] for row in rows)
+    return buffer.getvalue()
+
+def export_contacts(user_id: int, fmt: str, batch_size: int = EXPORT_BATCH_SIZE):
+    """
+    Generates the export of a user's whole contact book chunk by chunk.
+
+    The generator owns its database session, because it keeps running after
+    the request dependencies have been torn down. It is meant to be passed to a
+    `StreamingResponse`: each chunk is only produced once the previous one has
+    been handed to the client, so a slow reader throttles the cursor instead of
+    letting rows pile up in memory.
+
+    Args:
+        user_id (int): The ID of the user whose contacts are exported.
+        fmt (str): The output format, either "ndjson" or "csv".
+        batch_size (int): The number of rows encoded per chunk.
+
+    Yields:
+        str: The encoded rows of one batch.
+    """
+    db = SessionLocal()
+    try:
+        if fmt == "csv":
+            yield _csv_chunk([], header=True)
+        for rows in crud.stream_contacts(db, user_id, EXPORT_FIELDS, batch_size=batch_size):
+            yield _csv_chunk(rows) if fmt == "csv" else _ndjson_chunk(rows)
+    finally:
+        db.close()
@@ -0,0 +1,261 @@
+"""Structured `Contact.extra_data`: legacy conversion, ``extra.<key>=<value>`` filters, indexes and migration.
+
+`extra_data` holds a flat JSON object of custom fields, stored as JSON text
+on SQLite (queried through JSON1) and as JSONB on Postgres. Usage::
+
+    python -m contacts_api.extra_data migrate    # convert legacy string values to JSON objects
+    python -m contacts_api.extra_data indexes    # create the indexes of EXTRA_DATA_INDEXED_KEYS
+"""
+import argparse
+import json
+import re
+import time
+from sqlalchemy import Boolean, String, case, cast, create_engine, func, inspect, literal_column, text, type_coerce
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.engine import Engine
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.functions import FunctionElement
+from contacts_api.config import settings
+from contacts_api.models import Contact
+
+# Custom field names: identifiers, so they can be inlined in JSON paths and index names
+KEY_PATTERN = r"^[A-Za-z_][A-Za-z0-9_]{0,63}$"
+MAX_EXTRA_KEYS = 50
+MAX_EXTRA_VALUE_LENGTH = 2000
+
+# Query parameters of the form extra.<key>=<value> filter contacts on a custom field
+FILTER_PREFIX = "extra."
+
+# Legacy free-form values that are not "key=value" pairs are kept under this key
+LEGACY_NOTE_KEY = "note"
+
+_KEY = re.compile(KEY_PATTERN)
+_LEGACY_PAIR = re.compile(r"^\s*([A-Za-z_][A-Za-z0-9_]{0,63})\s*[=:]\s*(.*?)\s*$")
+
+MIGRATION_BATCH_SIZE = 1000
+
+def parse_legacy(value):
+    """
+    Converts a legacy free-form `extra_data` string to a JSON object.
+
+    JSON objects are kept, ``company=Acme; title=CTO`` style pairs become one
+    key per pair, and any other text is kept whole under ``"note"``. Values
+    that are not strings are returned as they are, for validation to judge.
+
+    Args:
+        value (Any): The stored or submitted value.
+
+    Returns:
+        dict or None: The custom fields; None for a missing or blank value.
+    """
+    if not isinstance(value, str):
+        return value
+    stripped = value.strip()
+    if not stripped:
+        return None
+    try:
+        parsed = json.loads(stripped)
+    except ValueError:
+        parsed = None
+    if isinstance(parsed, dict):
+        return parsed
+    pairs = [_LEGACY_PAIR.match(part) for part in re.split(r"[;\n]", stripped) if part.strip()]
+    if pairs and all(pairs):
+        return {match.group(1): match.group(2) for match in pairs}
+    return {LEGACY_NOTE_KEY: stripped}
+
+class is_json_object(FunctionElement):
+    """SQL test of whether a stored `extra_data` value is a JSON object rather than legacy text.
+
+    Exact on SQLite (JSON1); elsewhere it checks that the text is wrapped in
+    braces, which is what converted values and JSONB objects look like.
+    """
+    type = Boolean()
+    name = "is_json_object"
+    inherit_cache = True
+
+@compiles(is_json_object)
+def _compile_is_json_object(element, compiler, **kw):
+    [value] = element.clauses
+    return compiler.process(func.trim(cast(value, String)).like("{%}"), **kw)
+
+@compiles(is_json_object, "sqlite")
+def _compile_is_json_object_sqlite(element, compiler, **kw):
+    [value] = element.clauses
+    return compiler.process(case((func.json_valid(value) == 1, func.json_type(value) == "object"), else_=False), **kw)
+
+def parse_filter_value(raw: str):
+    """
+    Reads the value of an ``extra.<key>`` filter.
+
+    JSON literals are taken as such, so ``30``, ``true`` and ``null`` match
+    numbers, booleans and missing fields; anything else, or a quoted JSON
+    string, matches a string.
+
+    Args:
+        raw (str): The query parameter value.
+
+    Returns:
+        str, int, float, bool or None: The value to compare with.
+    """
+    try:
+        value = json.loads(raw)
+    except ValueError:
+        return raw
+    return value if value is None or isinstance(value, (str, int, float, bool)) else raw
+
+def parse_filters(params) -> list[tuple]:
+    """
+    Collects the ``extra.<key>=<value>`` filters of a request's query parameters.
+
+    Args:
+        params (Iterable[tuple[str, str]]): The query parameters, e.g. ``request.query_params.multi_items()``.
+
+    Returns:
+        list[tuple]: (key, value) pairs in request order.
+
+    Raises:
+        ValueError: If a key is not a valid custom field name.
+    """
+    filters = []
+    for name, raw in params:
+        if not name.startswith(FILTER_PREFIX):
+            continue
+        key = name[len(FILTER_PREFIX):]
+        if not _KEY.match(key):
+            raise ValueError(f"Invalid extra_data key: {key!r}")
+        filters.append((key, parse_filter_value(raw)))
+    return filters
+
+def json_path(key: str):
+    """Returns the JSON1 path of a custom field, inlined so SQLite matches it against expression indexes."""
+    return literal_column(f"'$.{key}'", String)
+
+def filter_conditions(dialect: str, filters: list[tuple]) -> list:
+    """
+    Compiles ``extra.<key>=<value>`` filters to JSON path predicates.
+
+    On Postgres a filter is a containment test (``extra_data @> '{"key": value}'``),
+    which the GIN index answers; elsewhere it compares ``json_extract(extra_data, '$.key')``,
+    which the per-key expression indexes answer. A None value matches contacts
+    without the field.
+
+    Args:
+        dialect (str): The database dialect name.
+        filters (list[tuple]): (key, value) pairs, as returned by `parse_filters`.
+
+    Returns:
+        list: One SQL condition per filter.
+    """
+    conditions = []
+    for key, value in filters:
+        if dialect == "postgresql":
+            document = type_coerce(Contact.extra_data, JSONB)
+            condition = document[key].astext.is_(None) if value is None else document.contains({key: value})
+        else:
+            field = func.json_extract(Contact.extra_data, json_path(key))
+            condition = field.is_(None) if value is None else field == value
+        conditions.append(condition)
+    return conditions
+
+def index_ddl(dialect: str, keys) -> list[str]:
+    """
+    Builds the DDL of the indexes backing filters on frequently used keys.
+
+    On SQLite, one expression index per key over
+    ``(user_id, json_extract(extra_data, '$.key'))``. On Postgres, one GIN
+    index (``jsonb_path_ops``) over the whole column, which serves
+    containment filters on every key.
+
+    Args:
+        dialect (str): The database dialect name.
+        keys (Iterable[str]): The custom field names to index.
+
+    Returns:
+        list[str]: CREATE INDEX IF NOT EXISTS statements; empty without keys.
+
+    Raises:
+        ValueError: If a key is not a valid custom field name.
+    """
+    keys = list(dict.fromkeys(keys))
+    for key in keys:
+        if not _KEY.match(key):
+            raise ValueError(f"Invalid extra_data key: {key!r}")
+    if not keys:
+        return []
+    if dialect == "postgresql":
+        return ["CREATE INDEX IF NOT EXISTS ix_contacts_extra_data ON contacts USING GIN (extra_data jsonb_path_ops)"]
+    return [
+        f"CREATE INDEX IF NOT EXISTS ix_contacts_extra_{key.lower()} "
+        f"ON contacts (user_id, json_extract(extra_data, '$.{key}'))"
+        for key in keys
+    ]
+
+def ensure_extra_data_indexes(engine: Engine, keys=None):
+    """
+    Creates the indexes of the keys declared in EXTRA_DATA_INDEXED_KEYS. Safe to call on every startup.
+
+    Args:
+        engine (Engine): The SQLAlchemy engine to create the indexes on.
+        keys (Iterable[str], optional): The keys to index instead of the configured ones.
+    """
+    statements = index_ddl(engine.dialect.name, settings.EXTRA_DATA_INDEXED_KEYS if keys is None else keys)
+    if statements:
+        with engine.begin() as conn:
+            for statement in statements:
+                conn.execute(text(statement))
+
+def migrate_extra_data(engine: Engine, batch_size: int = MIGRATION_BATCH_SIZE, reset: bool = False) -> dict:
+    """
+    Converts legacy string `extra_data` values to JSON objects, batch by batch.
+
+    Runs the ``contacts_extra_data_json`` backfill: rows are read in primary
+    key order with keyset pagination and each batch is committed with its
+    checkpoint, so the migration can be interrupted and resumed; values that
+    already are JSON objects are left untouched. Rows written in the legacy
+    form behind the checkpoint, e.g. by instances of an older version still
+    running, read fine (see `models.ExtraData`) and are converted by a run
+    with `reset`, which only visits the rows still to convert. On Postgres
+    the column is then changed to JSONB. Timestamps and contacts versions are
+    not bumped, since the contacts do not change for clients.
+
+    Args:
+        engine (Engine): The SQLAlchemy engine of the database to migrate.
+        batch_size (int): The number of rows read and written per transaction.
+        reset (bool): Whether to scan the whole table again instead of resuming after the last row done.
+
+    Returns:
+        dict: The number of rows scanned and converted, and the seconds taken.
+    """
+    from contacts_api import backfill  # imports this module
+
+    started = time.perf_counter()
+    result = backfill.run(engine, backfill.BACKFILLS["contacts_extra_data_json"], batch_size, reset=reset)
+    if engine.dialect.name == "postgresql" and not any(
+        column["name"] == "extra_data" and isinstance(column["type"], JSONB)
+        for column in inspect(engine).get_columns("contacts")
+    ):
+        with engine.begin() as conn:
+            conn.execute(text("ALTER TABLE contacts ALTER COLUMN extra_data TYPE JSONB USING extra_data::jsonb"))
+    return {"scanned": result["scanned"], "converted": result["updated"], "seconds": round(time.perf_counter() - started, 3)}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("command", choices=["migrate", "indexes"])
+    parser.add_argument("--url", help="database URL; DATABASE_URL by default")
+    parser.add_argument("--batch-size", type=int, default=MIGRATION_BATCH_SIZE)
+    parser.add_argument("--reset", action="store_true", help="rescan rows already migrated")
+    args = parser.parse_args()
+
+    engine = create_engine(args.url or settings.DATABASE_URL)
+    try:
+        if args.command == "migrate":
+            print(json.dumps(migrate_extra_data(engine, args.batch_size, args.reset)))
+        else:
+            ensure_extra_data_indexes(engine)
+            print(json.dumps(index_ddl(engine.dialect.name, settings.EXTRA_DATA_INDEXED_KEYS), indent=2))
+    finally:
+        engine.dispose()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,314 @@
+import asyncio
+import logging
+import time
+from datetime import timedelta
+from sqlalchemy import inspect, select, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+from contacts_api import async_crud, auth_cache, crud, extra_data, models, passwords, response_cache, schemas, search
+from contacts_api.cache import close_redis, get_redis
+from contacts_api.config import settings
+from contacts_api.database import pool_status
+from contacts_api.models import User, utcnow
+from contacts_api.pagination import DEFAULT_PAGE_SIZE
+
+logger = logging.getLogger(__name__)
+
+# The reads behind the hot routes, run for a user ID that cannot exist, so each
+# statement is compiled into the engine's cache without returning any rows
+WARMUP_QUERIES = (
+    lambda db: crud.get_contacts_page(db, 0, limit=DEFAULT_PAGE_SIZE),
+    lambda db: crud.get_contact_changes(db, 0, limit=DEFAULT_PAGE_SIZE),
+    lambda db: crud.get_contact_by_id(db, 0, 0),
+    lambda db: crud.get_contacts_by_ids(db, 0, [0]),
+    lambda db: crud.get_contacts_version(db, 0),
+    lambda db: crud.get_upcoming_birthdays(db, 0),
+    lambda db: crud.search_contacts(db, 0, "warmup"),
+    lambda db: crud.get_user_by_id(db, 0),
+    lambda db: crud.get_user_by_username(db, ""),
+    lambda db: crud.get_user_by_email(db, ""),
+)
+
+class ServerState:
+    """Where the worker is in its lifecycle, as reported by the health endpoints.
+
+    The phase moves from "starting" to "ready" once the warm-up is done, to
+    "draining" when the server is asked to stop (readiness fails but requests
+    are still served) and to "stopping" once the lifespan shuts down.
+
+    Attributes:
+        phase (str): "starting", "ready", "draining" or "stopping".
+        started_at (float): `time.monotonic()` when the worker started.
+        warmup (dict): The report of the last warm-up.
+    """
+
+    def __init__(self):
+        self.phase = "starting"
+        self.started_at = time.monotonic()
+        self.warmup = {}
+
+    @property
+    def accepting(self) -> bool:
+        """Whether load balancers should send the worker new requests."""
+        return self.phase == "ready"
+
+    def drain(self):
+        """Fails readiness from now on, while requests in flight and in transit are still served."""
+        if self.phase in ("starting", "ready"):
+            logger.info("Draining: readiness now fails")
+            self.phase = "draining"
+
+state = ServerState()
+
+def setup_database(engine: Engine):
+    """
+    Creates missing tables, the full-text search index and the `extra_data` indexes.
+
+    Tables are left alone in a database migrated by Alembic (one with an
+    ``alembic_version`` table), whose schema only `alembic upgrade` changes.
+
+    Args:
+        engine (Engine): The engine of the application's database.
+    """
+    if not inspect(engine).has_table("alembic_version"):
+        models.Base.metadata.create_all(bind=engine)
+    search.ensure_search_index(engine)
+    extra_data.ensure_extra_data_indexes(engine)
+
+def warm_pool(engine: Engine, connections: int) -> int:
+    """
+    Opens connections until the pool holds `connections` of them, and returns them to it.
+
+    The connections are checked out at the same time, so the pool really opens
+    that many instead of reusing one, and each is pinged so a broken one fails here.
+
+    Args:
+        engine (Engine): The engine whose pool to fill.
+        connections (int): How many connections to open, capped at DB_POOL_SIZE.
+
+    Returns:
+        int: The number of connections opened.
+    """
+    size = getattr(engine.pool, "size", lambda: 1)()
+    opened = []
+    try:
+        for _ in range(max(1, min(connections, size))):
+            conn = engine.connect()
+            opened.append(conn)
+            conn.execute(text("SELECT 1"))
+    finally:
+        for conn in opened:
+            conn.close()
+    return len(opened)
+
+async def warm_async_pool(async_engine, connections: int) -> int:
+    """Async version of `warm_pool`."""
+    size = getattr(async_engine.sync_engine.pool, "size", lambda: 1)()
+    opened = []
+    try:
+        for _ in range(max(1, min(connections, size))):
+            conn = await async_engine.connect()
+            opened.append(conn)
+            await conn.execute(text("SELECT 1"))
+    finally:
+        for conn in opened:
+            await conn.close()
+    return len(opened)
+
+async def precompile_statements(db) -> int:
+    """
+    Runs WARMUP_QUERIES, so the first real requests find their SQL in the engine's compiled cache.
+
+    Args:
+        db (AsyncSession or Session): A session on the engine to warm up.
+
+    Returns:
+        int: The number of queries run.
+    """
+    try:
+        for query in WARMUP_QUERIES:
+            await async_crud.run_sync(db, query)
+    finally:
+        await async_crud.run_sync(db, lambda session: session.rollback())
+    return len(WARMUP_QUERIES)
+
+def _recent_users(db: Session, limit: int) -> list:
+    """Returns snapshots of the users whose contacts changed most often."""
+    users = db.scalars(select(User).order_by(User.contacts_version.desc()).limit(limit))
+    return [schemas.UserCached.model_validate(user) for user in users]
+
+async def prime_caches(db, users: int) -> int:
+    """
+    Loads the most active users into this worker's user cache and opens the Redis connection.
+
+    Only the L1 is primed: Redis is shared and already warm after a deploy.
+
+    Args:
+        db (AsyncSession or Session): The database session object.
+        users (int): How many users to load.
+
+    Returns:
+        int: The number of users cached.
+    """
+    client = get_redis()
+    if client is not None:
+        await client.ping()
+    snapshots = await async_crud.run_sync(db, _recent_users, users) if users else []
+    for user in snapshots:
+        auth_cache.user_cache.l1.set(user.id, user)
+    return len(snapshots)
+
+async def _timed(report: dict, name: str, step):
+    """Runs one warm-up step, recording its result and duration; a failure is logged and skipped."""
+    start = time.perf_counter()
+    try:
+        result = await step
+    except Exception as e:
+        logger.warning("Warm-up step %s failed: %s", name, e)
+        report[name] = {"error": str(e)}
+    else:
+        report[name] = {"result": result}
+    report[name]["ms"] = round((time.perf_counter() - start) * 1000, 1)
+
+async def warm_up(engine: Engine, async_engine=None) -> dict:
+    """
+    Fills the connection pools, compiles the common statements and primes the caches.
+
+    Args:
+        engine (Engine): The sync engine.
+        async_engine (AsyncEngine, optional): The async engine, when USE_ASYNC_DB is on.
+
+    Returns:
+        dict: The result and duration of each step.
+    """
+    report = {}
+    connections = settings.WARMUP_POOL_CONNECTIONS
+    await _timed(report, "pool", run_in_threadpool(warm_pool, engine, connections))
+    if async_engine is not None:
+        await _timed(report, "async_pool", warm_async_pool(async_engine, connections))
+        db = AsyncSession(async_engine, expire_on_commit=False)
+    else:
+        db = Session(engine)
+    try:
+        await _timed(report, "statements", precompile_statements(db))
+        await _timed(report, "caches", prime_caches(db, settings.WARMUP_CACHE_USERS))
+    finally:
+        await (db.close() if async_engine is not None else run_in_threadpool(db.close))
+    await _timed(report, "passwords", passwords.warm_up())
+    return report
+
+async def startup(engine: Engine, async_engine=None):
+    """
+    Prepares the worker before it accepts requests.
+
+    Args:
+        engine (Engine): The sync engine.
+        async_engine (AsyncEngine, optional): The async engine, when USE_ASYNC_DB is on.
+    """
+    state.phase = "starting"
+    start = time.perf_counter()
+    if settings.DB_CREATE_ALL:
+        await run_in_threadpool(setup_database, engine)
+    if settings.WARMUP_ENABLED:
+        state.warmup = await warm_up(engine, async_engine)
+    state.phase = "ready"
+    logger.info("Worker ready in %.0f ms", (time.perf_counter() - start) * 1000)
+
+async def shutdown(engine: Engine, async_engine=None):
+    """
+    Releases the worker's connections once the server has stopped serving requests.
+
+    Args:
+        engine (Engine): The sync engine.
+        async_engine (AsyncEngine, optional): The async engine.
+    """
+    state.phase = "stopping"
+    await close_redis()
+    if async_engine is not None:
+        await async_engine.dispose()
+    await run_in_threadpool(engine.dispose)
+
+def purge_tombstones(engine: Engine) -> int:
+    """
+    Removes tombstones older than CONTACT_TOMBSTONE_RETENTION_DAYS.
+
+    Args:
+        engine (Engine): The engine of the application's database.
+
+    Returns:
+        int: The number of removed rows.
+    """
+    with Session(engine) as db:
+        before = utcnow() - timedelta(days=settings.CONTACT_TOMBSTONE_RETENTION_DAYS)
+        return crud.purge_deleted_contacts(db, before)
+
+async def purge_tombstones_periodically(engine: Engine, interval: float):
+    """
+    Runs `purge_tombstones` every `interval` seconds until cancelled; a failed purge is logged and retried.
+
+    Every worker runs it; a purge finding nothing to remove costs one indexed scan.
+
+    Args:
+        engine (Engine): The engine of the application's database.
+        interval (float): Seconds between purges.
+    """
+    while True:
+        try:
+            purged = await run_in_threadpool(purge_tombstones, engine)
+        except Exception:
+            logger.exception("Purging contact tombstones failed")
+        else:
+            if purged:
+                logger.info("Purged %d contact tombstones", purged)
+        await asyncio.sleep(interval)
+
+async def check_database(engine: Engine, async_engine=None) -> dict:
+    """
+    Pings the database through the pool the routes use, within HEALTH_CHECK_TIMEOUT.
+
+    Args:
+        engine (Engine): The sync engine.
+        async_engine (AsyncEngine, optional): The async engine, used instead when given.
+
+    Returns:
+        dict: Whether the ping succeeded, its latency or error, and the pool's status.
+    """
+    async def ping():
+        if async_engine is not None:
+            async with async_engine.connect() as conn:
+                await conn.execute(text("SELECT 1"))
+        else:
+            def ping_sync():
+                with engine.connect() as conn:
+                    conn.execute(text("SELECT 1"))
+            await run_in_threadpool(ping_sync)
+
+    pool = pool_status(async_engine.sync_engine if async_engine is not None else engine)
+    start = time.perf_counter()
+    try:
+        await asyncio.wait_for(ping(), settings.HEALTH_CHECK_TIMEOUT)
+    except Exception as e:
+        return {"ok": False, "error": str(e) or type(e).__name__, "pool": pool}
+    return {"ok": True, "ms": round((time.perf_counter() - start) * 1000, 1), "pool": pool}
+
+async def check_caches() -> dict:
+    """
+    Pings Redis, if configured, and reports the per-worker cache counters.
+
+    The caches keep working on their L1 when Redis is down, so a failed ping
+    is reported but does not make the worker unready.
+
+    Returns:
+        dict: Whether Redis answered ("ok" is None when it is not configured) and the cache stats.
+    """
+    report = {"redis": {"ok": None}, "stats": {**auth_cache.cache_stats(), **response_cache.cache_stats()}}
+    client = get_redis()
+    if client is not None:
+        try:
+            await asyncio.wait_for(client.ping(), settings.HEALTH_CHECK_TIMEOUT)
+            report["redis"] = {"ok": True}
+        except Exception as e:
+            report["redis"] = {"ok": False, "error": str(e) or type(e).__name__}
+    return report
@@ -1,21 +1,51 @@
-from fastapi import FastAPI, Depends, HTTPException
+import asyncio
+import time
+from contextlib import asynccontextmanager, suppress
+from datetime import date
+from typing import Literal, Optional
+from fastapi import FastAPI, Depends, HTTPException, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
-from sqlalchemy.orm import Session
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
 from fastapi.security import OAuth2PasswordBearer
-from contacts_api.models import User
-from contacts_api.database import engine, SessionLocal
-from contacts_api import crud, models, schemas
-from contacts_api.auth import decode_access_token, verify_email_token
-from contacts_api.utils import hash_password  
+from contacts_api.database import get_async_engine, get_engine, get_session, pool_status
+from contacts_api import async_crud, auth_cache, bulk, export, extra_data, lifecycle, metrics, outbox, passwords, query_budget, rate_limit, response_cache, schemas, search, serialization, uploading, verification
+from contacts_api.config import settings
+from contacts_api.routers import auth as auth_router
+from contacts_api.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, CursorExpiredError
 from contacts_api.dependencies import verify_reset_token, generate_reset_token
-from contacts_api.email_service import send_reset_email 
-import redis
-import json
-from fastapi import status
+from contacts_api.user import send_reset_email
 
-models.Base.metadata.create_all(bind=engine)
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Prepares the database and warms the worker up before the server accepts
+    requests, runs the email outbox worker and the tombstone purge, and
+    releases connections on shutdown.
+    """
+    engine, async_engine = get_engine(), get_async_engine()
+    await lifecycle.startup(engine, async_engine)
+    if settings.EMAIL_WORKER_ENABLED:
+        outbox.worker.start()
+    purge = None
+    if settings.CONTACT_TOMBSTONE_PURGE_INTERVAL:
+        purge = asyncio.create_task(
+            lifecycle.purge_tombstones_periodically(engine, settings.CONTACT_TOMBSTONE_PURGE_INTERVAL)
+        )
+    yield
+    if purge is not None:
+        purge.cancel()
+        with suppress(asyncio.CancelledError):
+            await purge
+    if settings.EMAIL_WORKER_ENABLED:
+        await outbox.worker.stop()
+    await lifecycle.shutdown(engine, async_engine)
 
-app = FastAPI()
+# RATE_LIMIT_DEFAULT applies to every route; stricter limits are declared on the routes they protect
+app = FastAPI(
+    lifespan=lifespan,
+    default_response_class=serialization.ORJSONResponse,
+    dependencies=[Depends(rate_limit.limit_route)],
+)
 origins = ["http://localhost:*"]
 app.add_middleware(
     CORSMiddleware,
@@ -25,144 +55,329 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-redis_client = redis.StrictRedis(host='localhost', port=6379, db=0, decode_responses=True)
+# Both read their settings when the app builds its middleware stack, on the first request or lifespan event
+app.add_middleware(query_budget.QueryBudgetMiddleware)
+app.add_middleware(metrics.MetricsMiddleware)
 
-oauth2_scheme = OAuth2PasswordBearer(tokenUrl="login")
+app.include_router(auth_router.router)
+app.include_router(verification.router)
+app.include_router(uploading.router)
 
-def get_db():
-    """Provides a database session for dependency injection."""
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+oauth2_scheme = OAuth2PasswordBearer(tokenUrl="login")
 
-def get_current_user_from_token(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
+async def get_current_user_from_token(token: str = Depends(oauth2_scheme), db=Depends(get_session)):
     """Retrieves the current authenticated user based on the access token."""
-    payload = decode_access_token(token)
-    if payload is None:
-        raise HTTPException(status_code=401, detail="Invalid or expired token")
-    user = crud.get_user_by_id(db, user_id=payload["sub"])
-    if not user:
-        raise HTTPException(status_code=401, detail="Invalid user")
-    return user
+    return await auth_cache.load_current_user(db, token)
 
 @app.get("/")
 async def read_root():
     """Root endpoint providing a welcome message."""
     return {"message": "Welcome to the database"}
 
+@app.get("/health/live", include_in_schema=False)
+async def read_liveness():
+    """Tells the orchestrator the worker's event loop is responsive; dependencies are not checked."""
+    return {"status": "alive", "phase": lifecycle.state.phase,
+            "uptime": round(time.monotonic() - lifecycle.state.started_at, 1)}
+
+@app.get("/health/ready", include_in_schema=False)
+async def read_readiness():
+    """Reports whether the worker should get traffic: warmed up, not draining and the database reachable."""
+    database = await lifecycle.check_database(get_engine(), get_async_engine())
+    ready = lifecycle.state.accepting and database["ok"]
+    body = {
+        "status": "ready" if ready else "unavailable",
+        "phase": lifecycle.state.phase,
+        "database": database,
+        "caches": await lifecycle.check_caches(),
+        "warmup": lifecycle.state.warmup,
+    }
+    return JSONResponse(body, status_code=200 if ready else 503)
+
+POOL_GAUGES = {
+    "size": ("db_pool_size", "Connections the pool keeps open."),
+    "checkedin": ("db_pool_checked_in", "Idle connections held by the pool."),
+    "checkedout": ("db_pool_checked_out", "Connections checked out of the pool."),
+    "overflow": ("db_pool_overflow", "Connections open beyond the pool size."),
+}
+
+def _collect_runtime_metrics() -> list[str]:
+    """Reports the caches, password queue and connection pools, whose counters live in their own modules."""
+    lines = metrics.cache_metrics({**auth_cache.cache_stats(), **response_cache.cache_stats()})
+    lines += metrics.gauge_lines("password_hash_queue_depth", "Password jobs queued or running.", passwords.queue_depth())
+    pools = {"sync": pool_status(get_engine())}
+    async_engine = get_async_engine()
+    if async_engine is not None:
+        pools["async"] = pool_status(async_engine.sync_engine)
+    for key, (name, help) in POOL_GAUGES.items():
+        lines += [f"# HELP {name} {help}", f"# TYPE {name} gauge"]
+        lines += [f'{name}{{engine="{engine_name}"}} {status.get(key, 0)}' for engine_name, status in pools.items()]
+    return lines
+
+def _outbox_metrics(stats: dict) -> list[str]:
+    """Reports outbox messages by status, dead letters included."""
+    return [
+        "# HELP email_outbox_messages Outbox messages by status.", "# TYPE email_outbox_messages gauge",
+        *(f'email_outbox_messages{{status="{status}"}} {count}' for status, count in stats.items()),
+    ]
+
+metrics.REGISTRY.register_collector(_collect_runtime_metrics)
+
+@app.get("/metrics", include_in_schema=False)
+async def read_metrics(db=Depends(get_session)):
+    """
+    Reports request latency, database time, cache, pool, outbox and outgoing call
+    counters in the Prometheus text format.
+    """
+    if not settings.METRICS_ENABLED:
+        raise HTTPException(status_code=404, detail="Not Found")
+    body = metrics.REGISTRY.render() + "\n".join(_outbox_metrics(await outbox.recent_outbox_stats(db))) + "\n"
+    return PlainTextResponse(body, media_type=metrics.CONTENT_TYPE)
+
 @app.post("/contacts/", response_model=schemas.ContactOut)
-def create_contact(
+@query_budget.declare(7)
+async def create_contact(
     contact: schemas.ContactCreate,
-    db: Session = Depends(get_db),
+    db=Depends(get_session),
     user: schemas.User = Depends(get_current_user_from_token),
 ):
     """Creates a new contact."""
-    return crud.create_contact(db, contact, user_id=user.id)
+    return await async_crud.create_contact(db, user_id=user.id, contact_data=contact.model_dump())
+
+@app.post("/contacts/bulk", response_model=schemas.BulkImportReport)
+async def bulk_import_contacts(
+    request: Request,
+    dedupe: bool = False,
+    db=Depends(get_session),
+    user: schemas.User = Depends(get_current_user_from_token),
+):
+    """Imports contacts from a JSON array body or an uploaded CSV/NDJSON file, up to `bulk.MAX_BULK_BYTES`."""
+    try:
+        records = await bulk.read_records(request)
+        return await async_crud.run_sync(db, bulk.import_contacts, user.id, records, dedupe)
+    except bulk.ImportTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@app.post("/contacts/batch", response_model=schemas.ContactBatchResponse)
+async def batch_contacts(
+    batch: schemas.ContactBatchRequest,
+    db=Depends(get_session),
+    user: schemas.User = Depends(get_current_user_from_token),
+):
+    """Runs get, patch and delete operations on several contacts in one transaction, with a status per item."""
+    operations = [
+        {"op": item.op, "id": item.id, "data": item.data.model_dump(exclude_unset=True) if item.data else {}}
+        for item in batch.operations
+    ]
+    results = await async_crud.batch_contacts(db, user.id, operations)
+    return schemas.ContactBatchResponse(results=results)
+
+@app.get("/contacts/", response_model=schemas.ContactPage, response_model_exclude_unset=True)
+@query_budget.declare(3)
+async def read_contacts(
+    request: Request,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    fields: Optional[str] = Query(None, description="Comma-separated contact fields to return"),
+    ids: Optional[str] = Query(None, description="Comma-separated contact IDs to fetch instead of a page"),
+    tag: Optional[list[str]] = Query(None, description="Only contacts carrying this tag; repeat to require several"),
+    db=Depends(get_session),
+    user: schemas.User = Depends(get_current_user_from_token),
+):
+    """
+    Retrieves a page of contacts for the current user, ordered by name, or the contacts listed in `ids`.
 
-@app.get("/contacts/", response_model=list[schemas.ContactOut])
-def read_contacts(
-    db: Session = Depends(get_db),
+    Pages can be filtered on custom fields with ``extra.<key>=<value>`` parameters, e.g. ``extra.company=Acme``.
+    """
+    selected = [name.strip() for name in fields.split(",") if name.strip()] if fields else None
+    try:
+        wanted = [int(value) for value in ids.split(",") if value.strip()] if ids is not None else None
+    except ValueError:
+        raise HTTPException(status_code=400, detail="ids must be comma-separated integers")
+    if wanted is not None and not 1 <= len(wanted) <= MAX_PAGE_SIZE:
+        raise HTTPException(status_code=400, detail=f"ids must list 1 to {MAX_PAGE_SIZE} contacts")
+    tags = sorted({name.strip() for name in tag if name.strip()}) if tag else None
+    try:
+        extra = extra_data.parse_filters(request.query_params.multi_items())
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    async def render():
+        try:
+            if wanted is not None:
+                items = await async_crud.get_contacts_by_ids(db, user.id, wanted, fields=selected)
+                next_cursor = None
+            else:
+                items, next_cursor = await async_crud.get_contacts_page(
+                    db, user_id=user.id, limit=limit, cursor=cursor, fields=selected, tags=tags, extra=extra
+                )
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        return serialization.dumps({"items": items, "next_cursor": next_cursor})
+
+    params = (limit, cursor, tuple(selected) if selected else None, tuple(wanted) if wanted else None,
+              tuple(tags) if tags else None, tuple(extra))
+    return await response_cache.cached_json(request, db, user.id, "contacts", params, render)
+
+@app.get("/contacts/export")
+def export_contacts(
+    format: Literal["ndjson", "csv"] = "ndjson",
+    user: schemas.User = Depends(get_current_user_from_token),
+):
+    """Streams the current user's whole contact book as NDJSON or CSV."""
+    return StreamingResponse(
+        export.export_contacts(user.id, format),
+        media_type=export.MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="contacts.{format}"'},
+    )
+
+@app.get("/contacts/changes", response_model=schemas.ContactChanges)
+@query_budget.declare(3)
+async def read_contact_changes(
+    request: Request,
+    since: Optional[str] = Query(None, description="The next_cursor of the previous call; omit for a full sync"),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    db=Depends(get_session),
+    user: schemas.User = Depends(get_current_user_from_token),
+):
+    """Retrieves the current user's contacts created, modified or deleted since a cursor."""
+    async def render():
+        try:
+            items, next_cursor, has_more = await async_crud.get_contact_changes(
+                db, user_id=user.id, since=since, limit=limit
+            )
+        except CursorExpiredError as e:
+            raise HTTPException(status_code=410, detail=str(e))
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        return serialization.dumps({"items": items, "next_cursor": next_cursor, "has_more": has_more})
+
+    return await response_cache.cached_json(request, db, user.id, "changes", (since, limit), render)
+
+@app.get("/contacts/facets", response_model=schemas.ContactFacets)
+@query_budget.declare(3)
+async def read_contact_facets(
+    request: Request,
+    db=Depends(get_session),
     user: schemas.User = Depends(get_current_user_from_token),
 ):
-    """Retrieves all contacts for the current user."""
-    return crud.get_contacts(db, user_id=user.id)
+    """Counts the current user's contacts per tag, birthday month and email domain, cached until their next write."""
+    async def render():
+        return serialization.dumps(await async_crud.get_contact_facets(db, user_id=user.id))
+
+    return await response_cache.cached_json(
+        request, db, user.id, "facets", (), render, cache=settings.FACETS_CACHE_ENABLED
+    )
 
 @app.get("/contacts/{contact_id}", response_model=schemas.ContactOut)
-def read_contact(
+@query_budget.declare(3)
+async def read_contact(
+    request: Request,
     contact_id: int,
-    db: Session = Depends(get_db),
+    db=Depends(get_session),
     user: schemas.User = Depends(get_current_user_from_token),
 ):
     """Retrieves a specific contact by ID."""
-    contact = crud.get_contact_by_id(db, contact_id)
-    if not contact or contact.user_id != user.id:
-        raise HTTPException(status_code=404, detail="Contact not found or access denied")
-    return contact
+    async def render():
+        contact = await async_crud.get_contact_by_id(db, user_id=user.id, contact_id=contact_id)
+        if not contact:
+            raise HTTPException(status_code=404, detail="Contact not found or access denied")
+        return serialization.dumps(serialization.contact_dicts([contact])[0])
+
+    return await response_cache.cached_json(request, db, user.id, "contact", (contact_id,), render)
 
 @app.put("/contacts/{contact_id}", response_model=schemas.ContactOut)
-def update_contact(
+@query_budget.declare(9)
+async def update_contact(
     contact_id: int,
     contact: schemas.ContactUpdate,
-    db: Session = Depends(get_db),
+    db=Depends(get_session),
     user: schemas.User = Depends(get_current_user_from_token),
 ):
     """Updates an existing contact."""
-    update_contact = crud.update_contact(db, contact_id, contact, user_id=user.id)
+    update_contact = await async_crud.update_contact(
+        db, user_id=user.id, contact_id=contact_id, update_data=contact.model_dump(exclude_unset=True)
+    )
     if not update_contact:
         raise HTTPException(status_code=404, detail="Contact not found or access denied")
     return update_contact
 
 @app.delete("/contacts/{contact_id}", response_model=schemas.ContactOut)
-def delete_contact(
+@query_budget.declare(5)
+async def delete_contact(
     contact_id: int,
-    db: Session = Depends(get_db),
+    db=Depends(get_session),
     user: schemas.User = Depends(get_current_user_from_token),
 ):
     """Deletes a contact by ID."""
-    delete_contact = crud.delete_contact(db, contact_id, user_id=user.id)
+    delete_contact = await async_crud.delete_contact(db, user_id=user.id, contact_id=contact_id)
     if not delete_contact:
         raise HTTPException(status_code=404, detail="Contact not found or access denied")
     return delete_contact
 
-@app.get("/contacts/search/")
-def search_contacts(
-    query: str,
-    db: Session = Depends(get_db),
+@app.get("/contacts/search/", response_model=list[schemas.ContactOut])
+@query_budget.declare(2)
+async def search_contacts(
+    request: Request,
+    query: str = Query(..., min_length=1, max_length=200),
+    limit: int = Query(search.DEFAULT_SEARCH_LIMIT, ge=1, le=search.MAX_SEARCH_LIMIT),
+    db=Depends(get_session),
     user: schemas.User = Depends(get_current_user_from_token),
 ):
-    """Searches for contacts based on a query string."""
-    return crud.search_contacts(db, query, user_id=user.id)
+    """Searches the current user's contacts by name and email, most relevant first, optionally filtered with ``extra.<key>=<value>``."""
+    try:
+        extra = extra_data.parse_filters(request.query_params.multi_items())
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    contacts = await async_crud.search_contacts(db, user_id=user.id, query=query, limit=limit, extra=extra)
+    return serialization.ORJSONResponse(serialization.contact_dicts(contacts))
 
 @app.get("/contacts/birthdays/", response_model=list[schemas.ContactOut])
-def upcoming_birthdays(
-    db: Session = Depends(get_db),
+@query_budget.declare(3)
+async def upcoming_birthdays(
+    request: Request,
+    days: int = Query(7, ge=1, le=365),
+    db=Depends(get_session),
     user: schemas.User = Depends(get_current_user_from_token),
 ):
-    """Retrieves contacts with upcoming birthdays."""
-    return crud.get_upcoming_birthdays(db, user_id=user.id)
+    """Retrieves contacts with birthdays within the next `days` days."""
+    async def render():
+        rows = await async_crud.get_upcoming_birthday_rows(
+            db, user_id=user.id, days=days, fields=serialization.CONTACT_OUT_FIELDS
+        )
+        return serialization.dumps(serialization.row_dicts(rows))
+
+    # The window moves with the date, so the date is part of the ETag
+    params = (days, date.today().isoformat())
+    return await response_cache.cached_json(request, db, user.id, "birthdays", params, render)
 
-@app.post("/request-password-reset")
-async def request_password_reset(email: str, db: Session = Depends(get_db)):
-    user = db.query(User).filter(User.email == email).first()
+@app.post("/request-password-reset", dependencies=[Depends(rate_limit.limit_email)])
+async def request_password_reset(email: str, db=Depends(get_session)):
+    user = await async_crud.get_user_by_email(db, email)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
 
     reset_token = generate_reset_token(email)
-    await send_reset_email(email, reset_token)
+    await send_reset_email(db, email, reset_token)
     return {"message": "Password reset email sent"}
 
 @app.post("/reset-password")
-async def reset_password(token: str, new_password: str, db: Session = Depends(get_db)):
+async def reset_password(token: str, new_password: str, db=Depends(get_session)):
     email = verify_reset_token(token)
-    user = db.query(User).filter(User.email == email).first()
+    user = await async_crud.get_user_by_email(db, email)
 
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
 
-    hashed_password = hash_password(new_password)
-    user.password = hashed_password
-    db.commit()
+    hashed_password = await passwords.hash_password(new_password)
+    await async_crud.update_user(db, user.id, {"hashed_password": hashed_password})
 
     return {"message": "Password reset successful"}
 
-@app.get("/users/me")
-async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
-    email = verify_email_token(token)
-
-    cached_user = redis_client.get(f"user:{email}")
-    if cached_user:
-        return json.loads(cached_user)
-
-    user = db.query(User).filter(User.email == email).first()
-
-    if not user:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Invalid credentials",
-            headers={"WWW-Authenticate": "Bearer"},
-        )
-
-    redis_client.setex(f"user:{email}", 3600, json.dumps(user.dict()))
+@app.get("/users/me", response_model=schemas.UserResponse)
+@query_budget.declare(1)
+async def get_current_user(user: schemas.UserCached = Depends(get_current_user_from_token)):
+    """Returns the authenticated user."""
     return user
@@ -0,0 +1,392 @@
+import contextvars
+import math
+import threading
+import time
+from abc import ABC, abstractmethod
+from bisect import bisect_left
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from contacts_api.config import settings
+
+# Content type of the Prometheus text exposition format
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Default latency buckets, in seconds
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Route label of requests that matched no route, so unknown paths cannot blow up the series count
+UNMATCHED_ROUTE = "<unmatched>"
+
+class _Metric(ABC):
+    """Base of the metric types: a named family of labelled series.
+
+    Every thread updates its own shard of the series and the shards are only
+    summed when the metrics are rendered, so the hot path takes no lock and
+    threads never contend on a shared counter. Each worker process keeps its
+    own registry, so every worker is scraped separately.
+
+    Attributes:
+        name (str): The metric name.
+        help (str): One line describing the metric.
+        labelnames (tuple): Names of the labels, in the order their values are passed.
+    """
+    type = None
+
+    def __init__(self, name: str, help: str, labelnames: tuple = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._local = threading.local()
+        self._shards = []
+        REGISTRY.register(self)
+
+    def _shard(self) -> dict:
+        shard = getattr(self._local, "series", None)
+        if shard is None:
+            shard = self._local.series = {}
+            # list.append is atomic, so registering a thread's shard needs no lock either
+            self._shards.append(shard)
+        return shard
+
+    def _labels(self, values: tuple) -> str:
+        pairs = ",".join(f'{name}="{_escape(value)}"' for name, value in zip(self.labelnames, values))
+        return "{" + pairs + "}" if pairs else ""
+
+    @abstractmethod
+    def collect(self) -> list[str]:
+        """Renders the metric's series in the text exposition format."""
+
+    def clear(self):
+        """Drops every series, in all shards."""
+        for shard in list(self._shards):
+            shard.clear()
+
+class Counter(_Metric):
+    """A monotonically increasing count."""
+    type = "counter"
+
+    def inc(self, labels: tuple = (), amount: float = 1):
+        """
+        Adds `amount` to the series with the given label values.
+
+        Args:
+            labels (tuple): Values of the metric's labels.
+            amount (float): How much to add.
+        """
+        shard = self._shard()
+        shard[labels] = shard.get(labels, 0) + amount
+
+    def values(self) -> dict:
+        """
+        Sums the shards of every series.
+
+        Returns:
+            dict: Totals keyed by label values.
+        """
+        totals = {}
+        for shard in list(self._shards):
+            for labels, value in list(shard.items()):
+                totals[labels] = totals.get(labels, 0) + value
+        return totals
+
+    def collect(self) -> list[str]:
+        return [f"{self.name}{self._labels(labels)} {_number(value)}" for labels, value in sorted(self.values().items())]
+
+class Gauge(Counter):
+    """A value that goes up and down, such as the number of requests in flight."""
+    type = "gauge"
+
+    def dec(self, labels: tuple = (), amount: float = 1):
+        """Subtracts `amount` from the series with the given label values."""
+        self.inc(labels, -amount)
+
+class Histogram(_Metric):
+    """A distribution of observed values, counted into cumulative buckets.
+
+    Attributes:
+        buckets (tuple): Upper bounds of the buckets, ascending; +Inf is implied.
+    """
+    type = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames: tuple = (), buckets: tuple = DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        super().__init__(name, help, labelnames)
+
+    def observe(self, labels: tuple, value: float):
+        """
+        Records one observation.
+
+        Args:
+            labels (tuple): Values of the metric's labels.
+            value (float): The observed value, e.g. a duration in seconds.
+        """
+        shard = self._shard()
+        series = shard.get(labels)
+        if series is None:
+            # Per-bucket counts (the last one is +Inf), then the sum
+            series = shard[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+        series[bisect_left(self.buckets, value)] += 1
+        series[-1] += value
+
+    def values(self) -> dict:
+        """
+        Sums the shards of every series.
+
+        Returns:
+            dict: ``(cumulative bucket counts, sum)`` keyed by label values.
+        """
+        totals = {}
+        for shard in list(self._shards):
+            for labels, series in list(shard.items()):
+                total = totals.setdefault(labels, [0] * len(series))
+                for index, value in enumerate(series):
+                    total[index] += value
+        result = {}
+        for labels, total in totals.items():
+            counts, running = [], 0
+            for count in total[:-1]:
+                running += count
+                counts.append(running)
+            result[labels] = (counts, total[-1])
+        return result
+
+    def collect(self) -> list[str]:
+        lines = []
+        for labels, (counts, total) in sorted(self.values().items()):
+            pairs = [f'{name}="{_escape(value)}"' for name, value in zip(self.labelnames, labels)]
+            for bound, count in zip(self.buckets + (math.inf,), counts):
+                le = ",".join(pairs + [f'le="{_number(bound)}"'])
+                lines.append(f"{self.name}_bucket{{{le}}} {count}")
+            lines.append(f"{self.name}_sum{self._labels(labels)} {_number(total)}")
+            lines.append(f"{self.name}_count{self._labels(labels)} {counts[-1]}")
+        return lines
+
+class Registry:
+    """The metrics of this process, plus collectors that report values kept elsewhere."""
+
+    def __init__(self):
+        self._metrics = []
+        self._collectors = []
+
+    def register(self, metric: _Metric):
+        """Adds a metric to the registry; done by the metric's constructor."""
+        self._metrics.append(metric)
+
+    def register_collector(self, collector):
+        """
+        Adds a callable run at every scrape.
+
+        Args:
+            collector (callable): Returns exposition lines, including their
+                ``# HELP`` and ``# TYPE`` headers, for values that are counted elsewhere.
+        """
+        self._collectors.append(collector)
+
+    def render(self) -> str:
+        """
+        Renders every metric in the text exposition format.
+
+        Returns:
+            str: The exposition text.
+        """
+        lines = []
+        for metric in self._metrics:
+            series = metric.collect()
+            if series:
+                lines += [f"# HELP {metric.name} {metric.help}", f"# TYPE {metric.name} {metric.type}", *series]
+        for collector in self._collectors:
+            lines += collector()
+        return "\n".join(lines) + "\n"
+
+REGISTRY = Registry()
+
+http_requests = Counter("http_requests_total", "HTTP requests by route, method and status.", ("method", "route", "status"))
+http_request_duration = Histogram(
+    "http_request_duration_seconds", "Latency of HTTP requests, until the response is sent.", ("method", "route")
+)
+http_requests_in_flight = Gauge("http_requests_in_flight", "HTTP requests being handled.", ("method",))
+http_request_db_duration = Histogram(
+    "http_request_db_duration_seconds", "Time spent executing database queries per HTTP request.", ("method", "route")
+)
+http_request_queries = Histogram(
+    "http_request_queries", "Database queries executed per HTTP request.", ("method", "route"),
+    buckets=(0, 1, 2, 3, 5, 10, 20, 50, 100),
+)
+db_queries = Counter("db_queries_total", "Database queries executed, including those outside requests.")
+db_query_duration = Histogram("db_query_duration_seconds", "Latency of single database queries.")
+password_hash_duration = Histogram(
+    "password_hash_duration_seconds", "Time of bcrypt jobs, including the wait for a free hashing thread.",
+    ("operation",), buckets=(0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0),
+)
+password_hash_rejected = Counter("password_hash_rejected_total", "Password jobs rejected because the bcrypt queue was full.")
+smtp_sends = Counter("smtp_sends_total", "Messages handed to the SMTP server, by outcome.", ("outcome",))
+smtp_send_duration = Histogram("smtp_send_duration_seconds", "Latency of SMTP sends, including reconnects.")
+smtp_connects = Counter("smtp_connects_total", "SMTP sessions opened.")
+rate_limited = Counter("rate_limited_total", "Requests rejected by a rate limit.", ("limit",))
+cloudinary_uploads = Counter("cloudinary_uploads_total", "Avatar variants uploaded to Cloudinary, by outcome.", ("outcome",))
+cloudinary_upload_duration = Histogram("cloudinary_upload_duration_seconds", "Latency of Cloudinary uploads.")
+
+class RequestStats:
+    """Time spent in the database and in bcrypt while handling one request.
+
+    Attributes:
+        queries (int): Number of queries executed.
+        db_seconds (float): Time spent executing them.
+        password_seconds (float): Time spent in password jobs.
+    """
+    __slots__ = ("queries", "db_seconds", "password_seconds")
+
+    def __init__(self):
+        self.queries = 0
+        self.db_seconds = 0.0
+        self.password_seconds = 0.0
+
+    def server_timing(self, total: float) -> str:
+        """
+        Formats the stats as a Server-Timing header value.
+
+        Args:
+            total (float): The request's duration so far, in seconds.
+
+        Returns:
+            str: Durations of the database, bcrypt and total time, in milliseconds.
+        """
+        return (
+            f'db;dur={self.db_seconds * 1000:.1f};desc="{self.queries} queries", '
+            f"bcrypt;dur={self.password_seconds * 1000:.1f}, total;dur={total * 1000:.1f}"
+        )
+
+# Stats of the request being handled. Threadpool calls copy the context, so
+# queries run there are counted towards the request that awaited them.
+current_request = contextvars.ContextVar("current_request", default=None)
+
+def request_stats():
+    """
+    Returns the stats of the request being handled.
+
+    Returns:
+        RequestStats or None: The stats, or None outside a request.
+    """
+    return current_request.get()
+
+class MetricsMiddleware:
+    """Pure ASGI middleware recording latency, status and database time of HTTP requests.
+
+    Requests are labelled with their route template, e.g. ``/contacts/{contact_id}``,
+    rather than the raw path. The response carries a Server-Timing header that
+    splits the time between the database, bcrypt and everything else.
+    Requests pass straight through while METRICS_ENABLED is off; unless
+    given, `server_timing` is read from METRICS_SERVER_TIMING when the
+    middleware is built.
+    """
+
+    def __init__(self, app, server_timing: bool = None):
+        self.app = app
+        self.server_timing = settings.METRICS_SERVER_TIMING if server_timing is None else server_timing
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not settings.METRICS_ENABLED:
+            await self.app(scope, receive, send)
+            return
+        method = scope["method"]
+        stats = RequestStats()
+        token = current_request.set(stats)
+        status = 500
+        start = time.perf_counter()
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                if self.server_timing:
+                    timing = stats.server_timing(time.perf_counter() - start)
+                    message["headers"] = [*message.get("headers", []), (b"server-timing", timing.encode())]
+            await send(message)
+
+        http_requests_in_flight.inc((method,))
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - start
+            http_requests_in_flight.dec((method,))
+            current_request.reset(token)
+            route = getattr(scope.get("route"), "path", UNMATCHED_ROUTE)
+            http_requests.inc((method, route, str(status)))
+            http_request_duration.observe((method, route), elapsed)
+            http_request_db_duration.observe((method, route), stats.db_seconds)
+            http_request_queries.observe((method, route), stats.queries)
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    context._metrics_start = time.perf_counter()
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - context._metrics_start
+    db_queries.inc()
+    db_query_duration.observe((), elapsed)
+    stats = current_request.get()
+    if stats is not None:
+        stats.queries += 1
+        stats.db_seconds += elapsed
+
+def instrument_engine(engine: Engine):
+    """
+    Counts the queries of an engine and the time spent on them, overall and per request.
+
+    Args:
+        engine (Engine): The sync engine, or the ``sync_engine`` of an async one.
+    """
+    if not event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+def cache_metrics(caches: dict) -> list[str]:
+    """
+    Renders cache statistics as hit, miss and size metrics.
+
+    Args:
+        caches (dict): Stats keyed by cache name, as returned by `TTLCache.stats`
+            or, with an ``l1``/``l2`` split, by `TwoTierCache.stats`.
+
+    Returns:
+        list: Exposition lines, with headers.
+    """
+    samples = {"hits": [], "misses": [], "size": []}
+    for name, stats in sorted(caches.items()):
+        tiers = stats if "l1" in stats else {"l1": stats}
+        for tier, values in tiers.items():
+            labels = f'{{cache="{_escape(name)}",tier="{tier}"}}'
+            for key, sample in samples.items():
+                if key in values:
+                    sample.append(f"cache_{key}{'_total' if key != 'size' else ''}{labels} {values[key]}")
+    return [
+        "# HELP cache_hits_total Cache lookups answered from the cache.", "# TYPE cache_hits_total counter",
+        *samples["hits"],
+        "# HELP cache_misses_total Cache lookups that found no live entry.", "# TYPE cache_misses_total counter",
+        *samples["misses"],
+        "# HELP cache_size Entries held by in-process caches.", "# TYPE cache_size gauge",
+        *samples["size"],
+    ]
+
+def gauge_lines(name: str, help: str, value: float) -> list[str]:
+    """
+    Renders a single unlabelled gauge whose value is read at scrape time.
+
+    Args:
+        name (str): The metric name.
+        help (str): One line describing the metric.
+        value (float): The current value.
+
+    Returns:
+        list: Exposition lines, with headers.
+    """
+    return [f"# HELP {name} {help}", f"# TYPE {name} gauge", f"{name} {_number(value)}"]
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _number(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value)
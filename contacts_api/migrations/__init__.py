@@ -0,0 +1 @@
+"""Alembic migrations of the contacts database; run them with ``alembic upgrade head`` from the repository root."""
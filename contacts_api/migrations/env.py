@@ -0,0 +1,77 @@
+"""Alembic environment: migrates DATABASE_URL, or the database given with ``alembic -x url=...``.
+
+Each revision runs in its own transaction, so the revisions that build
+indexes concurrently or run backfills outside their transaction only commit
+their own work early. On Postgres, DDL gives up after ``lock_timeout``
+(``-x lock_timeout=5s`` by default) rather than queue the application's
+queries behind it while waiting for a lock; the revisions can be run again.
+"""
+from logging.config import fileConfig
+from alembic import context
+from sqlalchemy import JSON, create_engine, pool
+from contacts_api import models
+from contacts_api.config import settings
+
+config = context.config
+if config.config_file_name is not None:
+    fileConfig(config.config_file_name, disable_existing_loggers=False)
+
+target_metadata = models.Base.metadata
+
+LOCK_TIMEOUT = "5s"
+
+# Tables and indexes the application creates outside the models (the search
+# index, the `extra_data` expression indexes, backfill checkpoints), which
+# autogenerate must not offer to drop
+UNMANAGED_PREFIXES = ("contacts_fts", "ix_contacts_search_", "ix_contacts_extra_", "backfill_checkpoints")
+
+def database_url() -> str:
+    return (
+        context.get_x_argument(as_dictionary=True).get("url")
+        or config.get_main_option("sqlalchemy.url")
+        or settings.DATABASE_URL
+    )
+
+def include_object(obj, name, type_, reflected, compare_to):
+    return not (reflected and compare_to is None and name and name.startswith(UNMANAGED_PREFIXES))
+
+def compare_type(migration, inspected_column, metadata_column, inspected_type, metadata_type):
+    # SQLite has no JSON type: JSON is stored as text whatever the column was declared as
+    if migration.dialect.name == "sqlite" and isinstance(metadata_type, (JSON, models.ExtraData)):
+        return False
+    return None
+
+def configure(**options):
+    url = database_url()
+    context.configure(
+        target_metadata=target_metadata,
+        include_object=include_object,
+        compare_type=compare_type,
+        render_as_batch=url.startswith("sqlite"),
+        transaction_per_migration=True,
+        **options,
+    )
+
+def run_migrations_offline():
+    configure(url=database_url(), literal_binds=True, dialect_opts={"paramstyle": "named"})
+    with context.begin_transaction():
+        context.run_migrations()
+
+def run_migrations_online():
+    engine = create_engine(database_url(), poolclass=pool.NullPool)
+    try:
+        with engine.connect() as connection:
+            if connection.dialect.name == "postgresql":
+                lock_timeout = context.get_x_argument(as_dictionary=True).get("lock_timeout", LOCK_TIMEOUT)
+                connection.exec_driver_sql(f"SET lock_timeout = '{lock_timeout}'")
+                connection.commit()
+            configure(connection=connection)
+            with context.begin_transaction():
+                context.run_migrations()
+    finally:
+        engine.dispose()
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
@@ -0,0 +1,158 @@
+"""Operations shared by the revisions: idempotent schema changes and online index builds and backfills.
+
+Databases created by ``Base.metadata.create_all`` before migrations existed
+may already hold any part of the schema, so every step checks for what it
+creates first; ``alembic upgrade head`` then brings any of them to the
+current schema without a manual ``alembic stamp``. In offline (``--sql``)
+mode there is no database to look at, and every step is written out.
+"""
+from alembic import context, op
+from sqlalchemy import inspect, text
+from contacts_api import backfill, search
+
+def _postgres() -> bool:
+    return op.get_context().dialect.name == "postgresql"
+
+def _offline() -> bool:
+    return op.get_context().as_sql
+
+def has_table(table: str) -> bool:
+    """Returns whether the database has the table."""
+    return not _offline() and inspect(op.get_bind()).has_table(table)
+
+def has_column(table: str, column: str) -> bool:
+    """Returns whether the table has the column."""
+    return not _offline() and any(info["name"] == column for info in inspect(op.get_bind()).get_columns(table))
+
+def has_index(table: str, name: str) -> bool:
+    """Returns whether the table has the index."""
+    return not _offline() and any(info["name"] == name for info in inspect(op.get_bind()).get_indexes(table))
+
+def columns(table: str) -> list[dict]:
+    """Returns the columns of a table as the database reports them."""
+    return inspect(op.get_bind()).get_columns(table)
+
+def column_type(table: str, column: str):
+    """Returns the type of a column as the database reports it."""
+    return next(info["type"] for info in columns(table) if info["name"] == column)
+
+def add_column(table: str, column):
+    """Adds a column unless the table has it."""
+    if not has_column(table, column.name):
+        op.add_column(table, column)
+
+def create_index(name: str, table: str, columns: list, unique: bool = False):
+    """
+    Creates an index unless it exists, without blocking writes to the table.
+
+    On Postgres the index is built with CREATE INDEX CONCURRENTLY, which cannot
+    run in a transaction: the migration's transaction is committed first. A
+    concurrent build that failed leaves an invalid index behind, which is
+    dropped and built again.
+
+    Args:
+        name (str): The index name.
+        table (str): The table name.
+        columns (list[str]): The indexed columns.
+        unique (bool): Whether the index is unique.
+    """
+    if not _postgres():
+        if not has_index(table, name):
+            op.create_index(name, table, columns, unique=unique)
+        return
+    with op.get_context().autocommit_block():
+        valid = None if _offline() else op.get_bind().execute(
+            text("SELECT i.indisvalid FROM pg_class c JOIN pg_index i ON i.indexrelid = c.oid WHERE c.relname = :name"),
+            {"name": name},
+        ).scalar()
+        if valid:
+            return
+        if valid is not None:
+            op.drop_index(name, table_name=table, postgresql_concurrently=True)
+        op.create_index(name, table, columns, unique=unique, postgresql_concurrently=True)
+
+def drop_index(name: str, table: str):
+    """Drops an index if it exists, concurrently on Postgres."""
+    if not _offline() and not has_index(table, name):
+        return
+    if _postgres():
+        with op.get_context().autocommit_block():
+            op.drop_index(name, table_name=table, postgresql_concurrently=True)
+    else:
+        op.drop_index(name, table_name=table)
+
+def set_not_null(table: str, *columns: str):
+    """
+    Makes filled columns NOT NULL.
+
+    On Postgres a plain SET NOT NULL scans the whole table under an exclusive
+    lock. A NOT VALID check constraint is added and committed instead, then
+    validated, which only blocks schema changes; SET NOT NULL then relies on
+    it (Postgres 12+) and the constraint is dropped. On SQLite the table is
+    rebuilt once, which drops its triggers: those of the search index are
+    created again.
+
+    Args:
+        table (str): The table name.
+        *columns (str): The column names.
+    """
+    if not _postgres():
+        with op.batch_alter_table(table) as batch:
+            for column in columns:
+                batch.alter_column(column, nullable=False)
+        if table == "contacts" and has_table("contacts_fts"):
+            create_search_index()
+        return
+    for column in columns:
+        constraint = f"ck_{table}_{column}_not_null"
+        with op.get_context().autocommit_block():
+            op.execute(f"ALTER TABLE {table} ADD CONSTRAINT {constraint} CHECK ({column} IS NOT NULL) NOT VALID")
+            op.execute(f"ALTER TABLE {table} VALIDATE CONSTRAINT {constraint}")
+        op.alter_column(table, column, nullable=False)
+        op.drop_constraint(constraint, table)
+
+def run_backfill(name: str):
+    """
+    Runs a registered backfill outside the migration's transaction.
+
+    The migration's transaction is committed first, then the backfill runs
+    batch by batch on its own connections, resuming from its checkpoint if an
+    earlier upgrade was interrupted. ``alembic -x batch_size=N -x sleep=S``
+    throttle it. In offline (``--sql``) mode a comment tells to run it by hand.
+
+    Args:
+        name (str): The name of the backfill in `backfill.BACKFILLS`.
+    """
+    migration = op.get_context()
+    if _offline():
+        migration.impl.static_output(f"-- Run the backfill before the next statements: python -m contacts_api.backfill run {name}")
+        return
+    options = context.get_x_argument(as_dictionary=True)
+    with migration.autocommit_block():
+        backfill.run(
+            op.get_bind().engine,
+            backfill.BACKFILLS[name],
+            batch_size=int(options.get("batch_size", backfill.BATCH_SIZE)),
+            sleep=float(options.get("sleep", backfill.BATCH_SLEEP)),
+        )
+
+def create_search_index():
+    """
+    Creates the full-text search structures of `search`, as `search.ensure_search_index` does at startup.
+
+    On Postgres the GIN indexes are built concurrently, so that the startup
+    check finds them instead of building them with writes blocked. On SQLite
+    the FTS5 table is filled from the existing rows when first created.
+    """
+    if _postgres():
+        with op.get_context().autocommit_block():
+            for statement in search.PG_SEARCH_DDL:
+                op.execute(statement.replace("CREATE INDEX ", "CREATE INDEX CONCURRENTLY ", 1))
+        return
+    if op.get_context().dialect.name != "sqlite":
+        return
+    exists = has_table("contacts_fts")
+    for statement in search.SQLITE_SEARCH_DDL:
+        op.execute(statement)
+    if not exists:
+        op.execute("INSERT INTO contacts_fts(contacts_fts) VALUES ('rebuild')")
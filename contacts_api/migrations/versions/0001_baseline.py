@@ -0,0 +1,50 @@
+"""Baseline: users and contacts as first released
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-18 12:00:00
+"""
+from alembic import op
+import sqlalchemy as sa
+from contacts_api.migrations import helpers
+
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    if not helpers.has_table("users"):
+        op.create_table(
+            "users",
+            sa.Column("id", sa.Integer(), nullable=False),
+            sa.Column("username", sa.String(), nullable=False),
+            sa.Column("email", sa.String(), nullable=False),
+            sa.Column("hashed_password", sa.String(), nullable=False),
+            sa.Column("is_verified", sa.Boolean(), nullable=True),
+            sa.Column("avatar_url", sa.String(), nullable=True),
+            sa.PrimaryKeyConstraint("id"),
+        )
+        op.create_index("ix_users_id", "users", ["id"])
+        op.create_index("ix_users_username", "users", ["username"], unique=True)
+        op.create_index("ix_users_email", "users", ["email"], unique=True)
+    if not helpers.has_table("contacts"):
+        op.create_table(
+            "contacts",
+            sa.Column("id", sa.Integer(), nullable=False),
+            sa.Column("first_name", sa.String(), nullable=True),
+            sa.Column("last_name", sa.String(), nullable=True),
+            sa.Column("phone_number", sa.String(), nullable=True),
+            sa.Column("birthday", sa.Date(), nullable=True),
+            sa.Column("extra_data", sa.String(), nullable=True),
+            sa.Column("user_id", sa.Integer(), nullable=True),
+            sa.ForeignKeyConstraint(["user_id"], ["users.id"]),
+            sa.PrimaryKeyConstraint("id"),
+        )
+        op.create_index("ix_contacts_id", "contacts", ["id"])
+        op.create_index("ix_contacts_first_name", "contacts", ["first_name"])
+        op.create_index("ix_contacts_last_name", "contacts", ["last_name"])
+
+def downgrade():
+    op.drop_table("contacts")
+    op.drop_table("users")
@@ -0,0 +1,26 @@
+"""Contact emails, and the index behind keyset pagination by name
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18 12:00:00
+"""
+from alembic import op
+import sqlalchemy as sa
+from contacts_api.migrations import helpers
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    # A nullable column without a default: a catalog-only change
+    helpers.add_column("contacts", sa.Column("email", sa.String(), nullable=True))
+    helpers.create_index("ix_contacts_email", "contacts", ["email"])
+    helpers.create_index("ix_contacts_user_name_id", "contacts", ["user_id", "last_name", "first_name", "id"])
+
+def downgrade():
+    helpers.drop_index("ix_contacts_user_name_id", "contacts")
+    helpers.drop_index("ix_contacts_email", "contacts")
+    with op.batch_alter_table("contacts") as batch:
+        batch.drop_column("email")
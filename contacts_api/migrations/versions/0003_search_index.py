@@ -0,0 +1,26 @@
+"""Full-text search index over contact names and emails
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18 12:00:00
+"""
+from alembic import op
+from contacts_api.migrations import helpers
+
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    helpers.create_search_index()
+
+def downgrade():
+    if op.get_context().dialect.name == "postgresql":
+        helpers.drop_index("ix_contacts_search_trgm", "contacts")
+        helpers.drop_index("ix_contacts_search_tsv", "contacts")
+    elif op.get_context().dialect.name == "sqlite":
+        for trigger in ("contacts_fts_ai", "contacts_fts_ad", "contacts_fts_au"):
+            op.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+        op.execute("DROP TABLE IF EXISTS contacts_fts_vocab")
+        op.execute("DROP TABLE IF EXISTS contacts_fts")
@@ -0,0 +1,25 @@
+"""Month/day birthday key backing the upcoming-birthdays range scan
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18 12:00:00
+"""
+from alembic import op
+import sqlalchemy as sa
+from contacts_api.migrations import helpers
+
+revision = "0004"
+down_revision = "0003"
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    helpers.add_column("contacts", sa.Column("birthday_md", sa.Integer(), nullable=True))
+    # The new version keeps birthday_md in sync on writes; the backfill fills the older rows
+    helpers.run_backfill("contacts_birthday_md")
+    helpers.create_index("ix_contacts_user_birthday_md", "contacts", ["user_id", "birthday_md"])
+
+def downgrade():
+    helpers.drop_index("ix_contacts_user_birthday_md", "contacts")
+    with op.batch_alter_table("contacts") as batch:
+        batch.drop_column("birthday_md")
@@ -0,0 +1,22 @@
+"""Per-user contacts version from which contact ETags derive
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-18 12:00:00
+"""
+from alembic import op
+import sqlalchemy as sa
+from contacts_api.migrations import helpers
+
+revision = "0006"
+down_revision = "0005"
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    # A constant server default: Postgres 11+ records it in the catalog instead of rewriting the table
+    helpers.add_column("users", sa.Column("contacts_version", sa.Integer(), nullable=False, server_default="0"))
+
+def downgrade():
+    with op.batch_alter_table("users") as batch:
+        batch.drop_column("contacts_version")
@@ -0,0 +1,29 @@
+"""Modification times and soft-delete tombstones behind the changes feed
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-18 12:00:00
+"""
+from alembic import op
+import sqlalchemy as sa
+from contacts_api.migrations import helpers
+
+revision = "0007"
+down_revision = "0006"
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    # updated_at has no server default, so it is added nullable, filled in batches, then made NOT NULL
+    if not helpers.has_column("contacts", "updated_at"):
+        op.add_column("contacts", sa.Column("updated_at", sa.DateTime(), nullable=True))
+        helpers.run_backfill("contacts_updated_at")
+        helpers.set_not_null("contacts", "updated_at")
+    helpers.add_column("contacts", sa.Column("deleted_at", sa.DateTime(), nullable=True))
+    helpers.create_index("ix_contacts_user_updated_id", "contacts", ["user_id", "updated_at", "id"])
+
+def downgrade():
+    helpers.drop_index("ix_contacts_user_updated_id", "contacts")
+    with op.batch_alter_table("contacts") as batch:
+        batch.drop_column("deleted_at")
+        batch.drop_column("updated_at")
@@ -0,0 +1,40 @@
+"""Contact tags
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-18 12:00:00
+"""
+from alembic import op
+import sqlalchemy as sa
+from contacts_api.migrations import helpers
+
+revision = "0008"
+down_revision = "0007"
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    if not helpers.has_table("tags"):
+        op.create_table(
+            "tags",
+            sa.Column("id", sa.Integer(), nullable=False),
+            sa.Column("user_id", sa.Integer(), nullable=False),
+            sa.Column("name", sa.String(), nullable=False),
+            sa.ForeignKeyConstraint(["user_id"], ["users.id"]),
+            sa.PrimaryKeyConstraint("id"),
+        )
+        op.create_index("ix_tags_user_name", "tags", ["user_id", "name"], unique=True)
+    if not helpers.has_table("contact_tags"):
+        op.create_table(
+            "contact_tags",
+            sa.Column("contact_id", sa.Integer(), nullable=False),
+            sa.Column("tag_id", sa.Integer(), nullable=False),
+            sa.ForeignKeyConstraint(["contact_id"], ["contacts.id"], ondelete="CASCADE"),
+            sa.ForeignKeyConstraint(["tag_id"], ["tags.id"], ondelete="CASCADE"),
+            sa.PrimaryKeyConstraint("contact_id", "tag_id"),
+        )
+        op.create_index("ix_contact_tags_tag_contact", "contact_tags", ["tag_id", "contact_id"])
+
+def downgrade():
+    op.drop_table("contact_tags")
+    op.drop_table("tags")
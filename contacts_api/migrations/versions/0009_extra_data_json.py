@@ -0,0 +1,29 @@
+"""Structured extra_data: legacy strings converted to JSON objects, JSONB on Postgres
+
+Revision ID: 0009
+Revises: 0008
+Create Date: 2026-10-18 12:00:00
+"""
+from alembic import op
+from sqlalchemy.dialects.postgresql import JSONB
+from contacts_api.migrations import helpers
+
+revision = "0009"
+down_revision = "0008"
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    # Converts the values in batches while the column still accepts both forms
+    helpers.run_backfill("contacts_extra_data_json")
+    if op.get_context().dialect.name != "postgresql":
+        # SQLite stores JSON as text whatever the column was declared as
+        return
+    if op.get_context().as_sql or not isinstance(helpers.column_type("contacts", "extra_data"), JSONB):
+        # A type change rewrites the table under an exclusive lock; the values are already converted,
+        # so it runs once, in one pass. Schedule it in a quiet period on large tables.
+        op.execute("ALTER TABLE contacts ALTER COLUMN extra_data TYPE JSONB USING extra_data::jsonb")
+
+def downgrade():
+    if op.get_context().dialect.name == "postgresql":
+        op.execute("ALTER TABLE contacts ALTER COLUMN extra_data TYPE VARCHAR USING extra_data::text")
@@ -0,0 +1,25 @@
+"""Contact names NOT NULL, so keyset pagination by name never meets a NULL
+
+Revision ID: 0010
+Revises: 0009
+Create Date: 2026-10-18 12:00:00
+"""
+from alembic import op
+from contacts_api.migrations import helpers
+
+revision = "0010"
+down_revision = "0009"
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    helpers.run_backfill("contacts_names")
+    if op.get_context().as_sql or any(
+        column["nullable"] for column in helpers.columns("contacts") if column["name"] in ("first_name", "last_name")
+    ):
+        helpers.set_not_null("contacts", "first_name", "last_name")
+
+def downgrade():
+    with op.batch_alter_table("contacts") as batch:
+        batch.alter_column("first_name", nullable=True)
+        batch.alter_column("last_name", nullable=True)
@@ -0,0 +1,21 @@
+"""Per-user watermark of purged tombstones, against which changes-feed cursors expire
+
+Revision ID: 0011
+Revises: 0010
+Create Date: 2026-10-18 12:00:00
+"""
+from alembic import op
+import sqlalchemy as sa
+from contacts_api.migrations import helpers
+
+revision = "0011"
+down_revision = "0010"
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    helpers.add_column("users", sa.Column("contacts_purged_until", sa.DateTime(), nullable=True))
+
+def downgrade():
+    with op.batch_alter_table("users") as batch:
+        batch.drop_column("contacts_purged_until")
@@ -1,7 +1,28 @@
-from sqlalchemy import Column, Integer, String, Boolean, Date, ForeignKey
-from sqlalchemy.orm import relationship
+import json
+from sqlalchemy import JSON, Column, Integer, String, Boolean, Date, DateTime, ForeignKey, Index, Table, Text, TypeDecorator, func, select, type_coerce
+from sqlalchemy.dialects.postgresql import JSONB
+from datetime import datetime, timezone
+from sqlalchemy.orm import column_property, relationship, validates
 from .database import Base
 
+# Joins a contact's tag names in `Contact.tags`; tag names may not contain it
+TAG_SEPARATOR = ","
+
+def utcnow() -> datetime:
+    """Returns the current UTC time as a naive datetime, as stored in DateTime columns."""
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+def birthday_key(birthday):
+    """Encodes a birthday as month * 100 + day, so it can be range-scanned regardless of the year.
+
+    Args:
+        birthday (date, optional): The date of birth.
+
+    Returns:
+        int or None: The encoded month and day, e.g. 1231 for December 31st.
+    """
+    return birthday.month * 100 + birthday.day if birthday else None
+
 class User(Base):
     """Represents a user in the system.
 
@@ -12,6 +33,11 @@ class User(Base):
         hashed_password (str): Hashed password for authentication.
         is_verified (bool): Indicates if the user's email is verified.
         avatar_url (str, optional): URL to the user's avatar image.
+        contacts_version (int): Counter bumped by every change to the user's contacts,
+            from which contact responses derive their ETags.
+        contacts_purged_until (datetime, optional): `updated_at` of the newest of the
+            user's tombstones purged so far; changes-feed cursors behind it expire.
+        contacts (list[Contact]): Contacts owned by the user (SQLAlchemy relationship).
     """
     __tablename__ = "users"
 
@@ -21,6 +47,76 @@ class User(Base):
     hashed_password = Column(String, nullable=False)
     is_verified = Column(Boolean, default=False)  
     avatar_url = Column(String, nullable=True)
+    contacts_version = Column(Integer, nullable=False, default=0, server_default="0")
+    contacts_purged_until = Column(DateTime, nullable=True)
+
+    contacts = relationship("Contact", back_populates="owner")
+
+class ExtraData(TypeDecorator):
+    """JSON custom fields (JSONB on Postgres) that also reads legacy free-form text.
+
+    Rows the ``contacts_extra_data_json`` backfill has not converted yet, or
+    that an older version of the application wrote since, are read as
+    `extra_data.parse_legacy` would convert them instead of failing to decode.
+    """
+    impl = JSON
+    cache_ok = True
+
+    def __init__(self):
+        super().__init__(none_as_null=True)
+
+    def load_dialect_impl(self, dialect):
+        if dialect.name == "postgresql":
+            return dialect.type_descriptor(JSONB(none_as_null=True))
+        return dialect.type_descriptor(JSON(none_as_null=True))
+
+    def result_processor(self, dialect, coltype):
+        from contacts_api.extra_data import parse_legacy  # imports this module
+
+        def process(value):
+            if not isinstance(value, str):
+                return value
+            try:
+                return json.loads(value)
+            except ValueError:
+                return parse_legacy(value)
+        return process
+
+class TagList(TypeDecorator):
+    """Reads the tag names joined by `Contact.tags` back as a sorted list."""
+    impl = String
+    cache_ok = True
+
+    def process_result_value(self, value, dialect):
+        return sorted(value.split(TAG_SEPARATOR)) if value else []
+
+class Tag(Base):
+    """Represents a tag (or group) a user attaches to contacts.
+
+    Attributes:
+        id (int): Unique identifier for the tag.
+        user_id (int): ID of the user who owns the tag.
+        name (str): The tag, unique per user.
+    """
+    __tablename__ = "tags"
+    __table_args__ = (
+        # Resolves a user's tag names, and backs the tag facet.
+        Index("ix_tags_user_name", "user_id", "name", unique=True),
+    )
+
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    name = Column(String, nullable=False)
+
+# Links contacts to their tags; the primary key answers "does contact X carry tag Y"
+contact_tags = Table(
+    "contact_tags",
+    Base.metadata,
+    Column("contact_id", Integer, ForeignKey("contacts.id", ondelete="CASCADE"), primary_key=True),
+    Column("tag_id", Integer, ForeignKey("tags.id", ondelete="CASCADE"), primary_key=True),
+    # Backs counting and listing the contacts of a tag.
+    Index("ix_contact_tags_tag_contact", "tag_id", "contact_id"),
+)
 
 class Contact(Base):
     """Represents a contact in the system.
@@ -29,21 +125,95 @@ class Contact(Base):
         id (int): Unique identifier for the contact.
         first_name (str): First name of the contact.
         last_name (str): Last name of the contact.
+        email (str, optional): Contact's email address.
         phone_number (str): Contact's phone number.
         birthday (date): Contact's date of birth.
-        extra_data (str, optional): Additional data about the contact.
+        birthday_md (int, optional): Month and day of the birthday as month * 100 + day,
+            kept in sync with `birthday` for the upcoming-birthdays index.
+        extra_data (dict, optional): Custom fields of the contact, a flat JSON object
+            (JSON text on SQLite, JSONB on Postgres); see `extra_data`.
+        tags (list[str]): Names of the contact's tags, sorted. Read-only, loaded
+            with the contact through a correlated subquery; see `crud.set_contact_tags`.
+        updated_at (datetime): When the contact was created, last modified or deleted (UTC).
+        deleted_at (datetime, optional): When the contact was deleted (UTC). Deleted
+            contacts are kept as tombstones for the changes feed.
         user_id (int): ID of the user who owns this contact.
         owner (User): The user that owns the contact (SQLAlchemy relationship).
     """
     __tablename__ = "contacts"
+    __table_args__ = (
+        # Backs keyset pagination of a user's contacts ordered by name.
+        Index("ix_contacts_user_name_id", "user_id", "last_name", "first_name", "id"),
+        # Backs the upcoming-birthdays range scan.
+        Index("ix_contacts_user_birthday_md", "user_id", "birthday_md"),
+        # Backs the changes feed, which pages through a user's contacts by modification time.
+        Index("ix_contacts_user_updated_id", "user_id", "updated_at", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
-    first_name = Column(String, index=True)
-    last_name = Column(String, index=True)
+    first_name = Column(String, index=True, nullable=False)
+    last_name = Column(String, index=True, nullable=False)
+    email = Column(String, index=True, nullable=True)
     phone_number = Column(String)
     birthday = Column(Date)
-    extra_data = Column(String, nullable=True)
+    birthday_md = Column(Integer, nullable=True)
+    extra_data = Column(ExtraData(), nullable=True)
+    updated_at = Column(DateTime, nullable=False, default=utcnow, onupdate=utcnow)
+    deleted_at = Column(DateTime, nullable=True)
 
     user_id = Column(Integer, ForeignKey("users.id"))
 
+    # Built from Core columns: ORM attributes would make the first compile of a query
+    # change its cache key, so the statement compiled by the warm-up would never be reused
+    tags = column_property(
+        type_coerce(
+            select(func.aggregate_strings(Tag.__table__.c.name, TAG_SEPARATOR))
+            .where(contact_tags.c.contact_id == id, contact_tags.c.tag_id == Tag.__table__.c.id)
+            .correlate_except(Tag.__table__, contact_tags)
+            .scalar_subquery(),
+            TagList(),
+        )
+    )
+
     owner = relationship("User", back_populates="contacts")
+
+    @validates("birthday")
+    def _sync_birthday_md(self, key, value):
+        """Keeps `birthday_md` in step whenever `birthday` is assigned."""
+        self.birthday_md = birthday_key(value)
+        return value
+
+class OutboxEmail(Base):
+    """Represents an email waiting in, or delivered from, the outbox.
+
+    Request handlers only insert rows; `outbox.OutboxWorker` delivers them.
+
+    Attributes:
+        id (int): Unique identifier for the message.
+        recipient (str): The recipient's email address.
+        subject (str): The message subject.
+        body (str): The plain text message body.
+        status (str): One of "pending", "sending", "sent" or "dead".
+        attempts (int): Number of delivery attempts so far, counted when the message is claimed.
+        next_attempt_at (datetime): When the message is next due (UTC). For a
+            message being sent, when its claim expires and another worker may retry it.
+        last_error (str, optional): The error of the last failed attempt.
+        created_at (datetime): When the message was enqueued (UTC).
+        sent_at (datetime, optional): When the message was delivered (UTC).
+    """
+    __tablename__ = "email_outbox"
+    __table_args__ = (
+        # Backs the worker's scan for due messages.
+        Index("ix_email_outbox_status_due", "status", "next_attempt_at"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    recipient = Column(String, nullable=False)
+    subject = Column(String, nullable=False)
+    body = Column(Text, nullable=False)
+    status = Column(String, nullable=False, default="pending")
+    attempts = Column(Integer, nullable=False, default=0)
+    next_attempt_at = Column(DateTime, nullable=False)
+    last_error = Column(String, nullable=True)
+    created_at = Column(DateTime, nullable=False)
+    sent_at = Column(DateTime, nullable=True)
@@ -0,0 +1,465 @@
+import asyncio
+import logging
+import time
+from datetime import timedelta
+from email.message import EmailMessage
+from sqlalchemy import func, select, update
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+from contacts_api import async_crud, metrics
+from contacts_api.cache import TTLCache
+from contacts_api.config import Lazy, settings
+from contacts_api.database import SessionLocal
+from contacts_api.models import OutboxEmail, utcnow
+
+logger = logging.getLogger(__name__)
+
+PENDING = "pending"
+SENDING = "sending"
+SENT = "sent"
+DEAD = "dead"
+
+# Counting by status scans the outbox, so the counts reported at /metrics are reused for a while
+_stats_cache = Lazy(lambda: TTLCache(maxsize=1, ttl=settings.EMAIL_STATS_TTL))
+
+def retry_delay(attempts: int) -> float:
+    """
+    Computes the exponential backoff before the next delivery attempt.
+
+    Args:
+        attempts (int): Number of failed attempts so far, at least 1.
+
+    Returns:
+        float: Seconds to wait, doubling per attempt up to EMAIL_RETRY_MAX_DELAY.
+    """
+    return min(settings.EMAIL_RETRY_MAX_DELAY, settings.EMAIL_RETRY_BASE_DELAY * 2 ** (attempts - 1))
+
+def enqueue_email(db: Session, recipient: str, subject: str, body: str) -> OutboxEmail:
+    """
+    Stores an email in the outbox, due immediately.
+
+    Args:
+        db (Session): The database session object.
+        recipient (str): The recipient's email address.
+        subject (str): The message subject.
+        body (str): The plain text message body.
+
+    Returns:
+        OutboxEmail: The queued message.
+    """
+    now = utcnow()
+    message = OutboxEmail(
+        recipient=recipient, subject=subject, body=body,
+        status=PENDING, attempts=0, next_attempt_at=now, created_at=now,
+    )
+    db.add(message)
+    db.commit()
+    return message
+
+def claim_batch(db: Session, limit: int) -> list:
+    """
+    Claims up to `limit` due messages for delivery.
+
+    Claimed messages are marked as sending until EMAIL_CLAIM_TIMEOUT from now,
+    after which another worker may claim them again, so messages of a crashed
+    worker are not lost. On Postgres, concurrent workers skip each other's rows.
+
+    A claim counts as an attempt, so a message that crashes the worker is
+    counted too. Once it has used EMAIL_MAX_ATTEMPTS, its expired claim
+    dead-letters it instead of claiming it again.
+
+    Args:
+        db (Session): The database session object.
+        limit (int): The maximum number of messages to claim.
+
+    Returns:
+        list: Rows with the id, recipient, subject, body and attempts (this one
+            included) of each claimed message.
+    """
+    now = utcnow()
+    due = db.execute(
+        select(OutboxEmail.id, OutboxEmail.status, OutboxEmail.attempts)
+        .where(OutboxEmail.status.in_((PENDING, SENDING)), OutboxEmail.next_attempt_at <= now)
+        .order_by(OutboxEmail.next_attempt_at, OutboxEmail.id)
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+    ).all()
+    abandoned = [row.id for row in due if row.status == SENDING and row.attempts >= settings.EMAIL_MAX_ATTEMPTS]
+    if abandoned:
+        logger.warning("Dead-lettering emails %s: their last attempt never finished", abandoned)
+        db.execute(
+            update(OutboxEmail)
+            .where(OutboxEmail.id.in_(abandoned))
+            .values(status=DEAD, last_error="Delivery attempt did not finish before its claim expired")
+        )
+    ids = [row.id for row in due if row.id not in abandoned]
+    if not ids:
+        db.commit()
+        return []
+    db.execute(
+        update(OutboxEmail)
+        .where(OutboxEmail.id.in_(ids))
+        .values(
+            status=SENDING,
+            attempts=OutboxEmail.attempts + 1,
+            next_attempt_at=now + timedelta(seconds=settings.EMAIL_CLAIM_TIMEOUT),
+        )
+    )
+    rows = db.execute(
+        select(OutboxEmail.id, OutboxEmail.recipient, OutboxEmail.subject, OutboxEmail.body, OutboxEmail.attempts)
+        .where(OutboxEmail.id.in_(ids))
+        .order_by(OutboxEmail.id)
+    ).all()
+    db.commit()
+    return rows
+
+def record_outcomes(db: Session, outcomes: list[dict]):
+    """
+    Stores the results of a delivery batch in one transaction.
+
+    Args:
+        db (Session): The database session object.
+        outcomes (list[dict]): Per message, its `id` and the columns to update.
+    """
+    if outcomes:
+        db.execute(update(OutboxEmail), outcomes)
+        db.commit()
+
+def requeue_dead(db: Session, ids: list[int] = None) -> int:
+    """
+    Moves dead-lettered messages back into the queue with a fresh attempt budget.
+
+    Args:
+        db (Session): The database session object.
+        ids (list[int], optional): The messages to requeue; all dead messages if omitted.
+
+    Returns:
+        int: The number of requeued messages.
+    """
+    stmt = update(OutboxEmail).where(OutboxEmail.status == DEAD)
+    if ids is not None:
+        stmt = stmt.where(OutboxEmail.id.in_(ids))
+    result = db.execute(stmt.values(status=PENDING, attempts=0, next_attempt_at=utcnow()))
+    db.commit()
+    return result.rowcount
+
+def outbox_stats(db: Session) -> dict:
+    """
+    Counts outbox messages by status.
+
+    Args:
+        db (Session): The database session object.
+
+    Returns:
+        dict: The number of pending, sending, sent and dead messages.
+    """
+    counts = dict(db.execute(select(OutboxEmail.status, func.count()).group_by(OutboxEmail.status)).all())
+    return {status: counts.get(status, 0) for status in (PENDING, SENDING, SENT, DEAD)}
+
+async def recent_outbox_stats(db) -> dict:
+    """
+    Counts outbox messages by status, at most once per EMAIL_STATS_TTL seconds.
+
+    Args:
+        db (Session | AsyncSession): The database session object.
+
+    Returns:
+        dict: The number of pending, sending, sent and dead messages.
+    """
+    stats = _stats_cache.get("stats")
+    if stats is None:
+        stats = await async_crud.run_sync(db, outbox_stats)
+        _stats_cache.set("stats", stats)
+    return stats
+
+def build_message(row) -> EmailMessage:
+    """
+    Builds the MIME message for an outbox row.
+
+    Args:
+        row: A claimed outbox row.
+
+    Returns:
+        EmailMessage: The message, sent from SMTP_USERNAME.
+    """
+    message = EmailMessage()
+    message["Subject"] = row.subject
+    message["From"] = settings.SMTP_USERNAME
+    message["To"] = row.recipient
+    message.set_content(row.body)
+    return message
+
+def is_permanent(error: Exception) -> bool:
+    """Tells whether an SMTP error is a permanent (5xx) rejection that retrying cannot fix."""
+    import aiosmtplib
+
+    if isinstance(error, aiosmtplib.SMTPRecipientsRefused):
+        return all(500 <= refusal.code < 600 for refusal in error.recipients)
+    return isinstance(error, aiosmtplib.SMTPResponseException) and 500 <= error.code < 600
+
+class DomainRateLimiter:
+    """Spaces out messages to each recipient domain to at most `per_minute` per minute.
+
+    Limits are kept per worker process.
+
+    Attributes:
+        interval (float): Minimum seconds between two messages to the same domain.
+    """
+
+    def __init__(self, per_minute: int):
+        self.interval = 60 / per_minute if per_minute else 0
+        self._next_slot = {}
+
+    def acquire(self, domain: str) -> float:
+        """
+        Takes the domain's next slot if it is free now.
+
+        Args:
+            domain (str): The recipient domain.
+
+        Returns:
+            float: 0 if a message may be sent now, otherwise the seconds until the next free slot.
+        """
+        now = time.monotonic()
+        slot = self._next_slot.get(domain, now)
+        if slot > now:
+            return slot - now
+        if self.interval:
+            self._next_slot[domain] = now + self.interval
+        return 0
+
+class SMTPConnection:
+    """A long-lived SMTP session reused across messages and batches.
+
+    The session is opened on first use, reopened when the server drops it and
+    closed after EMAIL_SMTP_IDLE_TIMEOUT seconds without traffic. Arguments
+    default to the SMTP_* settings.
+
+    Attributes:
+        connects (int): Number of sessions opened so far.
+    """
+
+    def __init__(self, hostname: str = None, port: int = None, username: str = None, password: str = None,
+                 use_tls: bool = None, start_tls: bool = None, timeout: float = None, login: bool = True):
+        self.hostname = hostname or settings.SMTP_SERVER
+        self.port = port or settings.SMTP_PORT
+        self.username = username if username is not None else settings.SMTP_USERNAME
+        self.password = password if password is not None else settings.SMTP_PASSWORD
+        self.use_tls = settings.SMTP_USE_TLS if use_tls is None else use_tls
+        self.start_tls = settings.SMTP_START_TLS if start_tls is None else start_tls
+        self.timeout = timeout or settings.SMTP_TIMEOUT
+        self.login = login
+        self.connects = 0
+        self._client = None
+        self._last_used = 0.0
+
+    async def _connect(self) -> "aiosmtplib.SMTP":
+        # aiosmtplib is imported on the first send, so processes that never send mail do not load it
+        import aiosmtplib
+
+        if self._client is not None and self._client.is_connected:
+            return self._client
+        client = aiosmtplib.SMTP(
+            hostname=self.hostname, port=self.port, use_tls=self.use_tls,
+            start_tls=self.start_tls, timeout=self.timeout,
+        )
+        await client.connect()
+        if self.login and self.username:
+            await client.login(self.username, self.password)
+        self._client = client
+        self.connects += 1
+        metrics.smtp_connects.inc()
+        return client
+
+    async def send(self, message: EmailMessage):
+        """
+        Sends a message over the session, reconnecting once if the server dropped it.
+
+        Args:
+            message (EmailMessage): The message to send.
+
+        Raises:
+            aiosmtplib.SMTPException: If the server rejects the message or cannot be reached.
+        """
+        import aiosmtplib
+
+        start = time.perf_counter()
+        try:
+            for attempt in range(2):
+                client = await self._connect()
+                try:
+                    await client.send_message(message)
+                except aiosmtplib.SMTPServerDisconnected:
+                    self._client = None
+                    if attempt:
+                        raise
+                else:
+                    self._last_used = time.monotonic()
+                    metrics.smtp_sends.inc(("sent",))
+                    return
+        except Exception:
+            metrics.smtp_sends.inc(("failed",))
+            raise
+        finally:
+            metrics.smtp_send_duration.observe((), time.perf_counter() - start)
+
+    async def close_if_idle(self):
+        """Closes the session once it has been idle for EMAIL_SMTP_IDLE_TIMEOUT seconds."""
+        if self._client is not None and time.monotonic() - self._last_used >= settings.EMAIL_SMTP_IDLE_TIMEOUT:
+            await self.close()
+
+    async def close(self):
+        """Ends the session politely, or drops it if the server is gone."""
+        client, self._client = self._client, None
+        if client is None or not client.is_connected:
+            return
+        import aiosmtplib
+
+        try:
+            await client.quit()
+        except (aiosmtplib.SMTPException, OSError):
+            client.close()
+
+class OutboxWorker:
+    """Delivers outbox messages in batches over one pooled SMTP session.
+
+    Failed messages are retried with exponential backoff and dead-lettered
+    after EMAIL_MAX_ATTEMPTS attempts, or at once on a permanent rejection.
+    Messages to a domain over its rate limit are put back until its next slot.
+
+    Attributes:
+        session_factory (callable): Creates the database sessions the worker uses.
+        smtp (SMTPConnection): The SMTP session.
+        batch_size (int): The most messages claimed at once.
+        poll_interval (float): Seconds to sleep when the queue is empty and nothing was enqueued.
+        rate_limiter (DomainRateLimiter): The per-domain limits.
+    """
+
+    def __init__(self, session_factory=SessionLocal, smtp: SMTPConnection = None, batch_size: int = None,
+                 poll_interval: float = None, rate_limiter: DomainRateLimiter = None):
+        self.session_factory = session_factory
+        self.smtp = smtp or SMTPConnection()
+        self.batch_size = batch_size or settings.EMAIL_BATCH_SIZE
+        self.poll_interval = poll_interval or settings.EMAIL_POLL_INTERVAL
+        self.rate_limiter = rate_limiter or DomainRateLimiter(settings.EMAIL_DOMAIN_RATE_LIMIT)
+        self._wakeup = asyncio.Event()
+        self._loop = None
+        self._task = None
+        self._stopping = False
+
+    def _call(self, func, *args):
+        db = self.session_factory()
+        try:
+            return func(db, *args)
+        finally:
+            db.close()
+
+    def _failure(self, row, error: Exception) -> dict:
+        attempts = row.attempts
+        outcome = {"id": row.id, "attempts": attempts, "last_error": f"{type(error).__name__}: {error}"[:500]}
+        if is_permanent(error) or attempts >= settings.EMAIL_MAX_ATTEMPTS:
+            logger.warning("Dead-lettering email %s to %s: %s", row.id, row.recipient, error)
+            return {**outcome, "status": DEAD}
+        return {**outcome, "status": PENDING, "next_attempt_at": utcnow() + timedelta(seconds=retry_delay(attempts))}
+
+    async def process_batch(self) -> int:
+        """
+        Claims and delivers one batch of due messages.
+
+        Any error delivering one message counts as a failed attempt of that
+        message only. The outcomes are recorded even if the batch is
+        interrupted; messages it did not reach are claimed again once their
+        claim expires.
+
+        Returns:
+            int: The number of messages claimed.
+        """
+        import aiosmtplib
+
+        rows = await run_in_threadpool(self._call, claim_batch, self.batch_size)
+        outcomes = []
+        try:
+            for row in rows:
+                wait = self.rate_limiter.acquire(row.recipient.rpartition("@")[2].lower())
+                if wait:
+                    # Not an attempt: give back the one counted by the claim
+                    outcomes.append({"id": row.id, "status": PENDING, "attempts": row.attempts - 1,
+                                     "next_attempt_at": utcnow() + timedelta(seconds=wait)})
+                    continue
+                try:
+                    await self.smtp.send(build_message(row))
+                except (aiosmtplib.SMTPException, OSError) as e:
+                    outcomes.append(self._failure(row, e))
+                except Exception as e:
+                    logger.exception("Unexpected error delivering email %s", row.id)
+                    outcomes.append(self._failure(row, e))
+                else:
+                    outcomes.append({"id": row.id, "status": SENT, "sent_at": utcnow(), "last_error": None})
+        finally:
+            await run_in_threadpool(self._call, record_outcomes, outcomes)
+        return len(rows)
+
+    async def run(self):
+        """Delivers messages until `stop` is called, sleeping while the queue is empty."""
+        self._loop = asyncio.get_running_loop()
+        while not self._stopping:
+            self._wakeup.clear()
+            try:
+                claimed = await self.process_batch()
+            except Exception:
+                logger.exception("Email outbox batch failed")
+                claimed = 0
+            if claimed >= self.batch_size:
+                continue
+            await self.smtp.close_if_idle()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+
+    def notify(self):
+        """Wakes the worker to deliver newly enqueued messages. Safe to call from any thread."""
+        if self._loop is not None and not self._loop.is_closed():
+            self._loop.call_soon_threadsafe(self._wakeup.set)
+
+    def start(self):
+        """Starts the worker as a task on the running event loop."""
+        self._stopping = False
+        self._task = asyncio.get_running_loop().create_task(self.run())
+
+    async def stop(self, timeout: float = 10):
+        """
+        Stops the worker after its current batch and closes the SMTP session.
+
+        Args:
+            timeout (float): Seconds to wait for the current batch before cancelling it.
+        """
+        self._stopping = True
+        self.notify()
+        if self._task is not None:
+            try:
+                await asyncio.wait_for(self._task, timeout)
+            except asyncio.TimeoutError:
+                pass
+            self._task = None
+        await self.smtp.close()
+
+# The application's worker, started with the app when EMAIL_WORKER_ENABLED is set
+worker = Lazy(OutboxWorker)
+
+async def enqueue(db, recipient: str, subject: str, body: str) -> OutboxEmail:
+    """
+    Queues an email for background delivery and wakes the worker.
+
+    Args:
+        db (AsyncSession or Session): The database session object.
+        recipient (str): The recipient's email address.
+        subject (str): The message subject.
+        body (str): The plain text message body.
+
+    Returns:
+        OutboxEmail: The queued message.
+    """
+    message = await async_crud.run_sync(db, enqueue_email, recipient, subject, body)
+    worker.notify()
+    return message
@@ -0,0 +1,44 @@
+import base64
+import json
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+class CursorExpiredError(ValueError):
+    """Raised for a cursor too old to resume from; the client has to start over."""
+
+def encode_cursor(values: list) -> str:
+    """
+    Encodes the sort key of the last row on a page into an opaque cursor.
+
+    Args:
+        values (list): The JSON-serializable sort key values of the last row.
+
+    Returns:
+        str: A URL-safe cursor string.
+    """
+    raw = json.dumps(values, separators=(",", ":"), default=str).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_cursor(cursor: str, size: int) -> list:
+    """
+    Decodes a cursor produced by `encode_cursor`.
+
+    Args:
+        cursor (str): The opaque cursor received from the client.
+        size (int): The expected number of sort key values.
+
+    Returns:
+        list: The decoded sort key values.
+
+    Raises:
+        ValueError: If the cursor is malformed.
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (ValueError, TypeError):
+        raise ValueError("Invalid cursor")
+    if not isinstance(values, list) or len(values) != size:
+        raise ValueError("Invalid cursor")
+    return values
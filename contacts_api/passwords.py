@@ -0,0 +1,114 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from fastapi import HTTPException
+from contacts_api import metrics
+from contacts_api.config import Lazy, settings
+
+@lru_cache(maxsize=None)
+def crypt_context():
+    """
+    Returns the password hashing context, importing passlib on first use.
+
+    Hashes made with fewer rounds than BCRYPT_ROUNDS are reported by
+    `needs_update` and upgraded on the next successful login.
+
+    Returns:
+        CryptContext: The bcrypt context.
+    """
+    from passlib.context import CryptContext
+
+    return CryptContext(
+        schemes=["bcrypt"],
+        deprecated="auto",
+        bcrypt__default_rounds=settings.BCRYPT_ROUNDS,
+        bcrypt__min_rounds=settings.BCRYPT_ROUNDS,
+    )
+
+# bcrypt releases the GIL, so a small thread pool hashes in parallel without
+# competing with the request threadpool or blocking the event loop.
+_executor = Lazy(lambda: ThreadPoolExecutor(max_workers=settings.PASSWORD_HASH_WORKERS, thread_name_prefix="bcrypt"))
+_pending = 0
+
+async def _run(func, *args):
+    """
+    Runs a hashing function on the bcrypt pool.
+
+    Requests beyond PASSWORD_HASH_QUEUE_LIMIT queued or running jobs are
+    rejected instead of queued, so a login storm degrades into fast 503s rather
+    than ever-growing latency for everyone.
+
+    Raises:
+        HTTPException: 503 if the pool's queue is full.
+    """
+    global _pending
+    if _pending >= settings.PASSWORD_HASH_QUEUE_LIMIT:
+        metrics.password_hash_rejected.inc()
+        raise HTTPException(
+            status_code=503,
+            detail="Too many concurrent password operations, try again shortly",
+            headers={"Retry-After": "1"},
+        )
+    _pending += 1
+    start = time.perf_counter()
+    try:
+        return await asyncio.get_running_loop().run_in_executor(_executor, func, *args)
+    finally:
+        _pending -= 1
+        elapsed = time.perf_counter() - start
+        metrics.password_hash_duration.observe((func.__name__,), elapsed)
+        stats = metrics.request_stats()
+        if stats is not None:
+            stats.password_seconds += elapsed
+
+def queue_depth() -> int:
+    """
+    Returns the number of password jobs currently queued or running.
+
+    Returns:
+        int: Jobs submitted to the bcrypt pool that have not finished yet.
+    """
+    return _pending
+
+async def warm_up():
+    """Loads the bcrypt backend on the hashing pool, so its self-test does not delay the first login."""
+    await asyncio.get_running_loop().run_in_executor(_executor, lambda: crypt_context().handler().get_backend())
+
+async def hash_password(password: str) -> str:
+    """
+    Hashes a password on the bcrypt pool.
+
+    Args:
+        password (str): The plain text password to be hashed.
+
+    Returns:
+        str: The hashed password.
+    """
+    return await _run(crypt_context().hash, password)
+
+async def verify_password(plain_password: str, hashed_password: str) -> bool:
+    """
+    Verifies a password against its hash on the bcrypt pool.
+
+    Args:
+        plain_password (str): The plain text password to verify.
+        hashed_password (str): The hashed password to compare against.
+
+    Returns:
+        bool: True if the passwords match, False otherwise.
+    """
+    return await _run(crypt_context().verify, plain_password, hashed_password)
+
+async def verify_and_update(plain_password: str, hashed_password: str) -> tuple[bool, str | None]:
+    """
+    Verifies a password and, if its hash is outdated, computes the replacement in the same job.
+
+    Args:
+        plain_password (str): The plain text password to verify.
+        hashed_password (str): The stored hash.
+
+    Returns:
+        tuple: Whether the password matched, and the new hash to store or None.
+    """
+    return await _run(crypt_context().verify_and_update, plain_password, hashed_password)
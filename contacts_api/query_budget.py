@@ -0,0 +1,179 @@
+import contextvars
+import logging
+from collections import Counter
+from contextlib import contextmanager
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from contacts_api.config import settings
+
+logger = logging.getLogger(__name__)
+
+class QueryBudgetExceeded(RuntimeError):
+    """Raised in "raise" mode when a request runs more queries than its budget,
+    or repeats one statement often enough to look like an N+1 pattern."""
+
+class QueryTracker:
+    """Counts the queries of one request or block, and how often each statement repeats.
+
+    Statements are compared by their SQL text, which carries placeholders
+    rather than values, so loading one row per parent shows up as the same
+    statement executed over and over.
+
+    Attributes:
+        budget (int or None): The most queries allowed, or None for no limit.
+        repeat_limit (int): How many times one statement may run before it is flagged.
+        raise_errors (bool): Raise `QueryBudgetExceeded` at the offending query instead of only recording it.
+        statements (Counter): Executions per SQL statement.
+        count (int): Total number of queries.
+    """
+
+    def __init__(self, budget: int = None, repeat_limit: int = None, raise_errors: bool = False, scope: dict = None):
+        self.budget = budget
+        self.repeat_limit = repeat_limit if repeat_limit is not None else settings.QUERY_REPEAT_LIMIT
+        self.raise_errors = raise_errors
+        self.statements = Counter()
+        self.count = 0
+        self._scope = scope
+
+    def resolve_budget(self):
+        """
+        Returns the budget, reading it from the matched route's endpoint if set by `declare`.
+
+        Returns:
+            int or None: The most queries allowed.
+        """
+        if self.budget is None and self._scope is not None and "endpoint" in self._scope:
+            self.budget = getattr(self._scope["endpoint"], "query_budget", settings.QUERY_BUDGET_DEFAULT or None)
+            self._scope = None
+        return self.budget
+
+    def record(self, statement: str):
+        """
+        Records one executed statement.
+
+        Args:
+            statement (str): The SQL text.
+
+        Raises:
+            QueryBudgetExceeded: In raise mode, on the query that goes over the budget
+                or repeats a statement more than `repeat_limit` times.
+        """
+        self.count += 1
+        self.statements[statement] += 1
+        if not self.raise_errors:
+            return
+        budget = self.resolve_budget()
+        if budget is not None and self.count > budget:
+            raise QueryBudgetExceeded(f"{self.count} queries exceed the budget of {budget}; last: {statement}")
+        if self.statements[statement] > self.repeat_limit:
+            raise QueryBudgetExceeded(f"Statement repeated {self.statements[statement]} times (N+1?): {statement}")
+
+    def repeated(self) -> dict:
+        """
+        Returns the statements executed more than `repeat_limit` times.
+
+        Returns:
+            dict: Execution counts keyed by SQL text.
+        """
+        return {statement: count for statement, count in self.statements.items() if count > self.repeat_limit}
+
+    def problems(self) -> list[str]:
+        """
+        Describes the budget overrun and N+1 patterns found so far.
+
+        Returns:
+            list: One message per problem, empty if the queries look fine.
+        """
+        problems = []
+        budget = self.resolve_budget()
+        if budget is not None and self.count > budget:
+            problems.append(f"{self.count} queries exceed the budget of {budget}")
+        problems += [f"statement repeated {count} times (N+1?): {statement}" for statement, count in self.repeated().items()]
+        return problems
+
+# The tracker of the request or block being run. Threadpool calls copy the
+# context, so queries run there are counted towards the request that awaited them.
+current_tracker = contextvars.ContextVar("current_tracker", default=None)
+
+def declare(budget: int):
+    """
+    Declares the most queries a route handler may run, auth lookups included.
+
+    Place it below the route decorator::
+
+        @app.get("/contacts/")
+        @query_budget.declare(3)
+        async def read_contacts(...): ...
+
+    Args:
+        budget (int): The most queries allowed per request.
+
+    Returns:
+        callable: A decorator that returns the handler unchanged apart from its budget.
+    """
+    def decorator(endpoint):
+        endpoint.query_budget = budget
+        return endpoint
+    return decorator
+
+@contextmanager
+def track_queries(budget: int = None, repeat_limit: int = None, raise_errors: bool = False):
+    """
+    Counts the queries run inside the block, on instrumented engines.
+
+    Args:
+        budget (int, optional): The most queries allowed.
+        repeat_limit (int, optional): How often one statement may repeat; QUERY_REPEAT_LIMIT by default.
+        raise_errors (bool): Raise `QueryBudgetExceeded` as soon as a limit is broken.
+
+    Yields:
+        QueryTracker: The tracker, to inspect once the block is done.
+    """
+    tracker = QueryTracker(budget, repeat_limit, raise_errors)
+    token = current_tracker.set(tracker)
+    try:
+        yield tracker
+    finally:
+        current_tracker.reset(token)
+
+class QueryBudgetMiddleware:
+    """Pure ASGI middleware checking every HTTP request against its route's query budget.
+
+    In "log" mode, overruns and N+1 patterns are logged as warnings once the
+    request is done. In "raise" mode the query that breaks a limit raises
+    `QueryBudgetExceeded`, so the request fails with a traceback pointing at it.
+    Meant for development and CI; with QUERY_BUDGET_MODE=off, the default
+    `mode` read when the middleware is built, requests pass straight through.
+    """
+
+    def __init__(self, app, mode: str = None):
+        self.app = app
+        self.mode = mode or settings.QUERY_BUDGET_MODE
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or self.mode == "off":
+            await self.app(scope, receive, send)
+            return
+        tracker = QueryTracker(raise_errors=self.mode == "raise", scope=scope)
+        token = current_tracker.set(tracker)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            current_tracker.reset(token)
+        for problem in tracker.problems():
+            logger.warning("%s %s: %s", scope["method"], getattr(scope.get("route"), "path", scope["path"]), problem)
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    tracker = current_tracker.get()
+    if tracker is not None:
+        tracker.record(statement)
+
+def instrument_engine(engine: Engine):
+    """
+    Reports the queries of an engine to the active `QueryTracker`.
+
+    Args:
+        engine (Engine): The sync engine, or the ``sync_engine`` of an async one.
+    """
+    if not event.contains(engine, "after_cursor_execute", _after_cursor_execute):
+        event.listen(engine, "after_cursor_execute", _after_cursor_execute)
@@ -0,0 +1,286 @@
+import logging
+import math
+import re
+import threading
+import time
+from collections import OrderedDict
+from functools import lru_cache
+from typing import NamedTuple
+from fastapi import Depends, HTTPException, Request
+from fastapi.security import OAuth2PasswordRequestForm
+from contacts_api import metrics
+from contacts_api.cache import get_redis, redis_errors
+from contacts_api.config import Lazy, settings
+
+logger = logging.getLogger(__name__)
+
+PERIODS = {"second": 1, "minute": 60, "hour": 3600, "day": 86400}
+
+# Keys longer than this are cut, so user input cannot grow the store's keys without bound
+MAX_KEY_LENGTH = 256
+
+class Rate(NamedTuple):
+    """A limit of `limit` hits per `window` seconds."""
+    limit: int
+    window: float
+
+@lru_cache(maxsize=64)
+def parse_rate(text: str):
+    """
+    Parses a rate such as ``5/minute``, ``100/hour`` or ``10/30second``.
+
+    Args:
+        text (str): The rate; empty or ``0/...`` disables the limit.
+
+    Returns:
+        Rate or None: The rate, or None when disabled.
+
+    Raises:
+        ValueError: If the text is not a rate.
+    """
+    if not text:
+        return None
+    match = re.fullmatch(r"\s*(\d+)\s*/\s*(\d*)\s*(second|minute|hour|day)s?\s*", text)
+    if not match:
+        raise ValueError(f"Invalid rate {text!r}, expected e.g. '5/minute'")
+    limit, multiple, period = int(match[1]), int(match[2] or 1), match[3]
+    return Rate(limit, multiple * PERIODS[period]) if limit else None
+
+def sliding_window(previous: float, current: float, elapsed: float, rate: Rate, cost: int = 1) -> float:
+    """
+    Applies the sliding window counter to the hits of the current and previous fixed windows.
+
+    The previous window's hits are weighted by how much of it still overlaps
+    the sliding window, which approximates a true sliding log with two counters.
+
+    Args:
+        previous (float): Hits in the previous fixed window.
+        current (float): Hits so far in the current fixed window.
+        elapsed (float): Seconds since the current fixed window started.
+        rate (Rate): The limit.
+        cost (int): Hits the new request counts for.
+
+    Returns:
+        float: 0 if the request is allowed, otherwise the seconds until it would be.
+    """
+    weight = 1 - elapsed / rate.window
+    allowed = rate.limit - cost
+    if previous * weight + current <= allowed:
+        return 0.0
+    if previous and current <= allowed:
+        # The previous window's share decays in this window
+        return (previous * weight + current - allowed) * rate.window / previous
+    # Only once the current window has become the previous one and decayed enough
+    return rate.window - elapsed + rate.window * (1 - allowed / current) if current else rate.window - elapsed
+
+class MemoryBackend:
+    """Per-worker sliding window counters, bounded to the most recently used keys.
+
+    Attributes:
+        maxsize (int): The most keys kept; the least recently used are dropped beyond it.
+    """
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._windows = OrderedDict()
+        self._lock = threading.Lock()
+
+    def hit(self, key: str, rate: Rate, cost: int = 1, now: float = None) -> float:
+        """
+        Counts a hit on `key` if the rate allows it.
+
+        Args:
+            key (str): The limited key.
+            rate (Rate): The limit.
+            cost (int): Hits the request counts for.
+            now (float, optional): The current time; `time.time()` by default.
+
+        Returns:
+            float: 0 if allowed, otherwise the seconds until it would be.
+        """
+        now = time.time() if now is None else now
+        index = int(now // rate.window)
+        with self._lock:
+            window, previous, current = self._windows.get(key, (index, 0, 0))
+            if window != index:
+                previous, current = (current if window == index - 1 else 0), 0
+            retry_after = sliding_window(previous, current, now - index * rate.window, rate, cost)
+            if not retry_after:
+                current += cost
+            self._windows[key] = (index, previous, current)
+            self._windows.move_to_end(key)
+            while len(self._windows) > self.maxsize:
+                self._windows.popitem(last=False)
+        return retry_after
+
+    def clear(self):
+        """Forgets every counter."""
+        with self._lock:
+            self._windows.clear()
+
+# Reads both windows and increments the current one only if the request is
+# allowed, atomically. Returns the previous and current counts before the hit.
+REDIS_HIT_SCRIPT = """
+local previous = tonumber(redis.call('GET', KEYS[1]) or '0')
+local current = tonumber(redis.call('GET', KEYS[2]) or '0')
+if previous * tonumber(ARGV[1]) + current + tonumber(ARGV[2]) <= tonumber(ARGV[3]) then
+    redis.call('INCRBY', KEYS[2], ARGV[2])
+    redis.call('PEXPIRE', KEYS[2], ARGV[4])
+end
+return {previous, current}
+"""
+
+class RateLimiter:
+    """Sliding window rate limits, shared through Redis when RATE_LIMIT_BACKEND is "redis".
+
+    When Redis is not configured or fails, the limiter falls back to its
+    per-worker counters and retries Redis after REDIS_RETRY_INTERVAL, so an
+    outage weakens the limits instead of rejecting or stalling requests.
+
+    Attributes:
+        memory (MemoryBackend): The per-worker counters.
+        use_redis (bool): Whether to keep the counters in Redis.
+    """
+
+    def __init__(self, use_redis: bool = False, maxsize: int = 100_000, redis_factory=get_redis):
+        self.memory = MemoryBackend(maxsize)
+        self.use_redis = use_redis
+        self._redis_factory = redis_factory
+        self._script = None
+        self._retry_at = 0.0
+
+    async def _redis_hit(self, client, key: str, rate: Rate, cost: int) -> float:
+        if self._script is None or self._script.registered_client is not client:
+            self._script = client.register_script(REDIS_HIT_SCRIPT)
+        now = time.time()
+        index = int(now // rate.window)
+        elapsed = now - index * rate.window
+        previous, current = await self._script(
+            keys=[f"ratelimit:{key}:{index - 1}", f"ratelimit:{key}:{index}"],
+            args=[1 - elapsed / rate.window, cost, rate.limit, int(rate.window * 2000)],
+        )
+        return sliding_window(int(previous), int(current), elapsed, rate, cost)
+
+    async def hit(self, key: str, rate: Rate, cost: int = 1) -> float:
+        """
+        Counts a hit on `key` if the rate allows it.
+
+        Args:
+            key (str): The limited key, e.g. ``login:ip:203.0.113.7``.
+            rate (Rate): The limit.
+            cost (int): Hits the request counts for.
+
+        Returns:
+            float: 0 if allowed, otherwise the seconds until it would be.
+        """
+        key = key[:MAX_KEY_LENGTH]
+        client = self._redis_factory() if self.use_redis and time.monotonic() >= self._retry_at else None
+        if client is not None:
+            try:
+                return await self._redis_hit(client, key, rate, cost)
+            except redis_errors() as e:
+                self._retry_at = time.monotonic() + settings.REDIS_RETRY_INTERVAL
+                logger.warning("Redis unavailable for rate limits, using per-worker counters: %s", e)
+        return self.memory.hit(key, rate, cost)
+
+    async def enforce(self, name: str, key: str, rate: Rate):
+        """
+        Rejects the request if `key` is over its rate.
+
+        Args:
+            name (str): The limit's name, reported in metrics, e.g. "login_ip".
+            key (str): What is limited, e.g. a client IP or a username.
+            rate (Rate or None): The limit; None disables it.
+
+        Raises:
+            HTTPException: 429 with a Retry-After header if the limit is exceeded.
+        """
+        if rate is None:
+            return
+        retry_after = await self.hit(f"{name}:{key}", rate)
+        if retry_after:
+            metrics.rate_limited.inc((name,))
+            raise HTTPException(
+                status_code=429,
+                detail="Too many requests, try again later",
+                headers={"Retry-After": str(max(1, math.ceil(retry_after)))},
+            )
+
+limiter = Lazy(lambda: RateLimiter(use_redis=settings.RATE_LIMIT_BACKEND == "redis", maxsize=settings.RATE_LIMIT_MAX_KEYS))
+
+def client_ip(request: Request) -> str:
+    """
+    Returns the address of the client, from X-Forwarded-For when RATE_LIMIT_TRUST_FORWARDED is set.
+
+    Each proxy appends the address it received the request from, and the
+    client may send any entries of its own to the left of them. The address
+    is therefore read RATE_LIMIT_TRUSTED_PROXIES entries from the right: the
+    one appended by the outermost trusted proxy. A header with fewer entries
+    did not come through all the proxies and is ignored.
+
+    Args:
+        request (Request): The request.
+
+    Returns:
+        str: The client's IP address, or "unknown".
+    """
+    if settings.RATE_LIMIT_TRUST_FORWARDED:
+        forwarded = [entry.strip() for entry in request.headers.get("x-forwarded-for", "").split(",")]
+        proxies = max(1, settings.RATE_LIMIT_TRUSTED_PROXIES)
+        if len(forwarded) >= proxies and forwarded[-proxies]:
+            return forwarded[-proxies]
+    return request.client.host if request.client else "unknown"
+
+def configured_rate(setting: str):
+    """
+    Returns the rate configured in a RATE_LIMIT_* setting.
+
+    Args:
+        setting (str): The setting's name.
+
+    Returns:
+        Rate or None: The rate, or None when it or RATE_LIMIT_ENABLED is off.
+    """
+    return parse_rate(getattr(settings, setting)) if settings.RATE_LIMIT_ENABLED else None
+
+async def limit_route(request: Request):
+    """
+    Applies RATE_LIMIT_DEFAULT per client IP and route. Use as an app-wide dependency.
+
+    Raises:
+        HTTPException: 429 if the client is over the limit.
+    """
+    rate = configured_rate("RATE_LIMIT_DEFAULT")
+    if rate is None:
+        return
+    route = getattr(request.scope.get("route"), "path", request.url.path)
+    await limiter.enforce("route", f"{client_ip(request)}:{route}", rate)
+
+async def limit_login(request: Request, form_data: OAuth2PasswordRequestForm = Depends()):
+    """
+    Limits login attempts per client IP and per username, before the user lookup and bcrypt.
+
+    Raises:
+        HTTPException: 429 if the client or the username is over its limit.
+    """
+    await limiter.enforce("login_ip", client_ip(request), configured_rate("RATE_LIMIT_LOGIN_PER_IP"))
+    await limiter.enforce("login_username", form_data.username.lower(), configured_rate("RATE_LIMIT_LOGIN_PER_USERNAME"))
+
+async def limit_register(request: Request):
+    """
+    Limits sign-ups per client IP, before the lookups and bcrypt.
+
+    Raises:
+        HTTPException: 429 if the client is over the limit.
+    """
+    await limiter.enforce("register_ip", client_ip(request), configured_rate("RATE_LIMIT_REGISTER_PER_IP"))
+
+async def limit_email(request: Request, email: str):
+    """
+    Limits requests that send email per client IP and per recipient, before the lookup and the send.
+
+    Raises:
+        HTTPException: 429 if the client or the address is over its limit.
+    """
+    await limiter.enforce("email_ip", client_ip(request), configured_rate("RATE_LIMIT_EMAIL_PER_IP"))
+    await limiter.enforce("email_address", email.lower(), configured_rate("RATE_LIMIT_EMAIL_PER_ADDRESS"))
@@ -0,0 +1,130 @@
+import hashlib
+from fastapi import Request, Response
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from contacts_api import async_crud, schemas
+from contacts_api.cache import TTLCache, TwoTierCache
+from contacts_api.config import Lazy, settings
+
+# Version counters of users' contacts, keyed by user ID. Writes drop the entry
+# once they commit; other workers may keep their L1 copy for up to
+# CONTACTS_VERSION_CACHE_TTL seconds, which bounds how long they answer 304 to stale copies.
+contacts_versions = Lazy(lambda: TwoTierCache(
+    "contacts_version",
+    schemas.ContactsVersion,
+    TTLCache(maxsize=settings.USER_CACHE_SIZE, ttl=settings.CONTACTS_VERSION_CACHE_TTL),
+    ttl=settings.CONTACTS_VERSION_REDIS_TTL,
+))
+
+# Serialized response bodies, keyed by user, route, parameters and version, so
+# entries never need invalidating: a write moves readers on to a new key.
+response_cache = Lazy(lambda: TTLCache(maxsize=settings.RESPONSE_CACHE_SIZE, ttl=settings.RESPONSE_CACHE_TTL))
+
+async def get_contacts_version(db, user_id: int) -> int:
+    """
+    Returns the version counter of a user's contacts, from the cache if possible.
+
+    Args:
+        db (AsyncSession or Session): The database session object, used on a cache miss.
+        user_id (int): The ID of the user.
+
+    Returns:
+        int: The current version.
+    """
+    cached = await contacts_versions.get(user_id)
+    if cached is not None:
+        return cached.version
+    version = await async_crud.get_contacts_version(db, user_id)
+    await contacts_versions.set(user_id, schemas.ContactsVersion(version=version))
+    return version
+
+def make_etag(user_id: int, version: int, route: str, params: tuple = ()) -> str:
+    """
+    Derives the strong ETag of a contact response.
+
+    Args:
+        user_id (int): The ID of the user.
+        version (int): The user's contacts version.
+        route (str): The route the response belongs to.
+        params (tuple): Everything else the response depends on, such as query parameters.
+
+    Returns:
+        str: The quoted ETag.
+    """
+    digest = hashlib.sha1(repr((route, params)).encode()).hexdigest()[:12]
+    return f'"{user_id}-{version}-{digest}"'
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """
+    Tells whether the request's If-None-Match header matches `etag`.
+
+    Args:
+        request (Request): The request.
+        etag (str): The current ETag.
+
+    Returns:
+        bool: True if the client's copy is current.
+    """
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    return etag in (tag.strip().removeprefix("W/") for tag in header.split(","))
+
+async def cached_json(request: Request, db, user_id: int, route: str, params: tuple, render, cache: bool = None) -> Response:
+    """
+    Answers a read of a user's contacts from the version counter when possible.
+
+    A matching If-None-Match is answered with 304 after reading only the
+    (usually cached) version. Otherwise the body comes from the response
+    cache when enabled, or from `render`.
+
+    Args:
+        request (Request): The request.
+        db (AsyncSession or Session): The database session object.
+        user_id (int): The ID of the user.
+        route (str): The route, part of the ETag and cache key.
+        params (tuple): Everything else the response depends on.
+        render (callable): Coroutine function returning the JSON body as bytes.
+            It may raise HTTPException, which is not cached.
+        cache (bool, optional): Whether to use the response cache; RESPONSE_CACHE_ENABLED by default.
+
+    Returns:
+        Response: The 304 or JSON response, with the ETag.
+    """
+    version = await get_contacts_version(db, user_id)
+    etag = make_etag(user_id, version, route, params)
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if etag_matches(request, etag):
+        return Response(status_code=304, headers=headers)
+
+    if cache is None:
+        cache = settings.RESPONSE_CACHE_ENABLED
+    key = (user_id, route, params, version)
+    body = response_cache.get(key) if cache else None
+    if body is None:
+        body = await render()
+        if cache:
+            response_cache.set(key, body)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+def cache_stats() -> dict:
+    """
+    Reports hit/miss counters of the version and response caches.
+
+    Returns:
+        dict: Stats of both caches.
+    """
+    return {"contacts_versions": contacts_versions.stats(), "responses": response_cache.stats()}
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_changed_versions(session):
+    """Drops the cached versions of users whose contacts changed in the committed transaction."""
+    for user_id in session.info.pop("changed_contacts_user_ids", ()):
+        contacts_versions.invalidate_nowait(user_id)
+
+@event.listens_for(Session, "after_rollback")
+def _forget_changed_versions(session):
+    """Discards pending invalidations of a rolled back transaction."""
+    session.info.pop("changed_contacts_user_ids", None)
@@ -1,30 +1,35 @@
 from fastapi import APIRouter, HTTPException, Depends, Security, status
 from fastapi.security import OAuth2PasswordRequestForm, OAuth2PasswordBearer
-from sqlalchemy.orm import Session
-from contacts_api.database import get_db
-from contacts_api.models import User
+from contacts_api import async_crud, passwords, rate_limit
+from contacts_api.database import get_session
 from contacts_api.schemas import UserCreate, UserResponse
-from contacts_api.auth import hash_password, verify_password, create_access_token, decode_access_token
+from contacts_api.auth import create_access_token, decode_access_token
 
 router = APIRouter()
 
-@router.post("/register", response_model=UserResponse)
-def register_user(user: UserCreate, db: Session = Depends(get_db)):
-    if db.query(User).filter(User.username == user.username).first():
+@router.post("/register", response_model=UserResponse, dependencies=[Depends(rate_limit.limit_register)])
+async def register_user(user: UserCreate, db=Depends(get_session)):
+    if await async_crud.get_user_by_username(db, user.username):
         raise HTTPException(status_code=400, detail="Username already registered")
-    hashed_pw = hash_password(user.password)
-    db_user = User(username=user.username, hashed_password=hashed_pw)
-    db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
-    return db_user
+    if await async_crud.get_user_by_email(db, user.email):
+        raise HTTPException(status_code=400, detail="Email already registered")
+    hashed_pw = await passwords.hash_password(user.password)
+    return await async_crud.create_user(
+        db, {"username": user.username, "email": user.email, "hashed_password": hashed_pw}
+    )
 
-@router.post("/login")
-def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
-    user = db.query(User).filter(User.username == form_data.username).first()
-    if not user or not verify_password(form_data.password, user.hashed_password):
+@router.post("/login", dependencies=[Depends(rate_limit.limit_login)])
+async def login(form_data: OAuth2PasswordRequestForm = Depends(), db=Depends(get_session)):
+    user = await async_crud.get_user_by_username(db, form_data.username)
+    if not user:
         raise HTTPException(status_code=400, detail="Invalid credentials")
-    token = create_access_token({"sub": user.username})
+    valid, new_hash = await passwords.verify_and_update(form_data.password, user.hashed_password)
+    if not valid:
+        raise HTTPException(status_code=400, detail="Invalid credentials")
+    if new_hash:
+        # The stored hash uses an outdated cost factor; replace it while we have the password
+        await async_crud.update_user(db, user.id, {"hashed_password": new_hash})
+    token = create_access_token({"sub": str(user.id)})
     return {"access_token": token, "token_type": "bearer"}
 
 
@@ -1,49 +1,226 @@
-from sqlalchemy import Column, Integer, String, Boolean, Date, ForeignKey
-from sqlalchemy.orm import relationship
-from .database import Base
+from datetime import date, datetime
+from typing import Annotated, Any, Literal, Optional, Union
+from pydantic import BaseModel, BeforeValidator, ConfigDict, EmailStr, Field, StrictBool, StrictFloat, StrictInt, StringConstraints, field_validator
+from contacts_api import extra_data
 
-class User(Base):
-    """Represents a user in the system.
+# The most operations accepted by POST /contacts/batch
+MAX_BATCH_OPERATIONS = 1000
 
-    Attributes:
-        id (int): Unique identifier for the user.
-        username (str): Unique username of the user.
-        email (str): Unique email address of the user.
-        hashed_password (str): Hashed password for authentication.
-        is_verified (bool): Indicates if the user's email is verified.
-        avatar_url (str, optional): URL to the user's avatar image.
-    """
-    __tablename__ = "users"
+# The most tags a contact may carry, and the longest tag name
+MAX_TAGS_PER_CONTACT = 20
+MAX_TAG_LENGTH = 50
+
+# A tag name: trimmed, non-empty, without commas (they join names in queries) or control characters
+TagName = Annotated[
+    str, StringConstraints(strip_whitespace=True, min_length=1, max_length=MAX_TAG_LENGTH, pattern=r"^[^,\x00-\x1f]+$")
+]
 
-    id = Column(Integer, primary_key=True, index=True)
-    username = Column(String, unique=True, index=True, nullable=False)
-    email = Column(String, unique=True, index=True, nullable=False)
-    hashed_password = Column(String, nullable=False)
-    is_verified = Column(Boolean, default=False)  # Додано
-    avatar_url = Column(String, nullable=True)
+# Custom fields: a flat object of scalars. Legacy strings are converted as the migration does.
+ExtraData = Annotated[
+    dict[
+        Annotated[str, StringConstraints(pattern=extra_data.KEY_PATTERN)],
+        Union[StrictBool, StrictInt, StrictFloat, Annotated[str, StringConstraints(max_length=extra_data.MAX_EXTRA_VALUE_LENGTH)], None],
+    ],
+    Field(max_length=extra_data.MAX_EXTRA_KEYS),
+    BeforeValidator(extra_data.parse_legacy),
+]
 
-class Contact(Base):
-    """Represents a contact in the system.
+def _unique_tags(tags):
+    """Drops repeated tag names, keeping the first occurrence."""
+    return list(dict.fromkeys(tags)) if tags is not None else None
+
+class ContactBase(BaseModel):
+    """Shared fields of a contact.
 
     Attributes:
-        id (int): Unique identifier for the contact.
         first_name (str): First name of the contact.
         last_name (str): Last name of the contact.
-        phone_number (str): Contact's phone number.
-        birthday (date): Contact's date of birth.
-        extra_data (str, optional): Additional data about the contact.
-        user_id (int): ID of the user who owns this contact.
-        owner (User): The user that owns the contact (SQLAlchemy relationship).
+        email (str, optional): Contact's email address.
+        phone_number (str, optional): Contact's phone number.
+        birthday (date, optional): Contact's date of birth.
+        extra_data (dict, optional): Custom fields: names matching `extra_data.KEY_PATTERN`,
+            values strings, numbers, booleans or null. A plain string is still accepted
+            and converted (see `extra_data.parse_legacy`).
+        tags (list[str]): Tags (or groups) of the contact.
+    """
+    first_name: str
+    last_name: str
+    email: Optional[EmailStr] = None
+    phone_number: Optional[str] = None
+    birthday: Optional[date] = None
+    extra_data: Optional[ExtraData] = None
+    tags: list[TagName] = Field(default_factory=list, max_length=MAX_TAGS_PER_CONTACT)
+
+    _unique_tags = field_validator("tags")(_unique_tags)
+
+class ContactCreate(ContactBase):
+    """Payload for creating a contact."""
+
+class ContactUpdate(BaseModel):
+    """Payload for updating a contact. Only the provided fields are changed; `tags` replaces all tags.
+
+    Names may be left out but not set to null: they are the keyset pagination
+    sort key, which cannot compare past a NULL.
+    """
+    first_name: Optional[str] = None
+    last_name: Optional[str] = None
+    email: Optional[EmailStr] = None
+    phone_number: Optional[str] = None
+    birthday: Optional[date] = None
+    extra_data: Optional[ExtraData] = None
+    tags: Optional[list[TagName]] = Field(None, max_length=MAX_TAGS_PER_CONTACT)
+
+    _unique_tags = field_validator("tags")(_unique_tags)
+
+    @field_validator("first_name", "last_name")
+    @classmethod
+    def _names_not_null(cls, value):
+        """Rejects an explicit null name; runs only for provided fields."""
+        if value is None:
+            raise ValueError("may be omitted but not null")
+        return value
+
+class ContactOut(ContactBase):
+    """A contact as returned by the API."""
+    extra_data: Optional[dict[str, Any]] = None
+    id: int
+
+    model_config = ConfigDict(from_attributes=True)
+
+class ContactProjection(BaseModel):
+    """A contact restricted to the fields requested with ``fields=``.
+
+    Every attribute is optional; fields that were not selected are left unset
+    and dropped from the response.
+    """
+    id: Optional[int] = None
+    first_name: Optional[str] = None
+    last_name: Optional[str] = None
+    email: Optional[str] = None
+    phone_number: Optional[str] = None
+    birthday: Optional[date] = None
+    extra_data: Optional[dict[str, Any]] = None
+    tags: Optional[list[str]] = None
+
+class ContactPage(BaseModel):
+    """One page of a keyset-paginated contact listing.
+
+    Attributes:
+        items (list): Contacts on this page.
+        next_cursor (str, optional): Opaque cursor of the next page, or None on the last page.
+    """
+    items: list[ContactProjection]
+    next_cursor: Optional[str] = None
+
+class ContactChange(ContactProjection):
+    """A contact in the changes feed; deleted contacts carry only `id` and the timestamps."""
+    updated_at: datetime
+    deleted_at: Optional[datetime] = None
+
+class ContactChanges(BaseModel):
+    """A page of the changes feed.
+
+    `next_cursor` is passed as `since` on the next call, also once `has_more` is false.
+    """
+    items: list[ContactChange]
+    next_cursor: Optional[str] = None
+    has_more: bool = False
+
+class FacetCount(BaseModel):
+    """The number of contacts sharing one value of a facet."""
+    value: Union[int, str]
+    count: int
+
+class ContactFacets(BaseModel):
+    """Counts of a user's contacts by tag, birthday month (1-12) and email domain.
+
+    Tags and domains are ordered by count, most frequent first; months by month.
     """
-    __tablename__ = "contacts"
+    tags: list[FacetCount]
+    birthday_months: list[FacetCount]
+    email_domains: list[FacetCount]
+
+class ContactBatchOperation(BaseModel):
+    """One operation of a batch: read, patch or delete the contact with `id`."""
+    op: Literal["get", "patch", "delete"]
+    id: int
+    data: Optional[ContactUpdate] = None
 
-    id = Column(Integer, primary_key=True, index=True)
-    first_name = Column(String, index=True)
-    last_name = Column(String, index=True)
-    phone_number = Column(String)
-    birthday = Column(Date)
-    extra_data = Column(String, nullable=True)
+class ContactBatchRequest(BaseModel):
+    """Operations run together in one transaction; each contact ID may appear once."""
+    operations: list[ContactBatchOperation] = Field(min_length=1, max_length=MAX_BATCH_OPERATIONS)
+
+class ContactBatchResult(BaseModel):
+    """The outcome of one batch operation, with an HTTP-style status code."""
+    op: str
+    id: int
+    status: int
+    contact: Optional[ContactOut] = None
+    detail: Optional[str] = None
+
+class ContactBatchResponse(BaseModel):
+    """Per-operation results, in request order."""
+    results: list[ContactBatchResult]
+
+class BulkRowError(BaseModel):
+    """A row of a bulk import that was not inserted.
+
+    Attributes:
+        row (int): 1-based position of the row in the submitted data.
+        detail (str): Why the row was rejected or skipped.
+    """
+    row: int
+    detail: str
+
+class BulkImportReport(BaseModel):
+    """Outcome of a bulk contact import.
+
+    Attributes:
+        total (int): Number of rows submitted.
+        created (int): Number of contacts inserted.
+        skipped (int): Number of rows skipped as duplicates.
+        failed (int): Number of rows that failed validation or insertion.
+        errors (list): Per-row details of every skipped or failed row.
+    """
+    total: int
+    created: int
+    skipped: int
+    failed: int
+    errors: list[BulkRowError]
+
+class UserCreate(BaseModel):
+    """Payload for registering a user."""
+    username: str
+    email: EmailStr
+    password: str
+
+class UserResponse(BaseModel):
+    """A user as returned by the API."""
+    id: int
+    username: str
+    email: EmailStr
+    is_verified: bool = False
+    avatar_url: Optional[str] = None
+
+    model_config = ConfigDict(from_attributes=True)
+
+class User(UserResponse):
+    """The authenticated user attached to a request."""
+
+class UserCached(BaseModel):
+    """The slim snapshot of a user row kept in the user cache.
+
+    Fields are plain types, so reading a cached entry back does not re-run
+    email validation.
+    """
+    id: int
+    username: str
+    email: str
+    is_verified: bool = False
+    avatar_url: Optional[str] = None
 
-    user_id = Column(Integer, ForeignKey("users.id"))
+    model_config = ConfigDict(from_attributes=True)
 
-    owner = relationship("User", back_populates="contacts")
+class ContactsVersion(BaseModel):
+    """The cached version counter of a user's contacts."""
+    version: int
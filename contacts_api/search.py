@@ -0,0 +1,199 @@
+import difflib
+import re
+from sqlalchemy import bindparam, column, literal_column, select, table, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+from contacts_api.models import Contact
+
+DEFAULT_SEARCH_LIMIT = 20
+MAX_SEARCH_LIMIT = 100
+
+# Number of close vocabulary terms tried per query word when nothing matched.
+TYPO_CANDIDATES = 3
+
+SQLITE_SEARCH_DDL = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS contacts_fts USING fts5(
+        first_name, last_name, email,
+        content='contacts', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+    )
+    """,
+    "CREATE VIRTUAL TABLE IF NOT EXISTS contacts_fts_vocab USING fts5vocab(contacts_fts, 'row')",
+    """
+    CREATE TRIGGER IF NOT EXISTS contacts_fts_ai AFTER INSERT ON contacts BEGIN
+        INSERT INTO contacts_fts(rowid, first_name, last_name, email)
+        VALUES (new.id, new.first_name, new.last_name, new.email);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS contacts_fts_ad AFTER DELETE ON contacts BEGIN
+        INSERT INTO contacts_fts(contacts_fts, rowid, first_name, last_name, email)
+        VALUES ('delete', old.id, old.first_name, old.last_name, old.email);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS contacts_fts_au AFTER UPDATE OF first_name, last_name, email ON contacts BEGIN
+        INSERT INTO contacts_fts(contacts_fts, rowid, first_name, last_name, email)
+        VALUES ('delete', old.id, old.first_name, old.last_name, old.email);
+        INSERT INTO contacts_fts(rowid, first_name, last_name, email)
+        VALUES (new.id, new.first_name, new.last_name, new.email);
+    END
+    """,
+]
+
+# The external-content FTS5 table, joined on its rowid (the contact ID)
+contacts_fts = table("contacts_fts", column("rowid"))
+
+# The expression indexed on Postgres; queries must repeat it verbatim to hit the indexes.
+PG_SEARCH_DOCUMENT = "(coalesce(first_name, '') || ' ' || coalesce(last_name, '') || ' ' || coalesce(email, ''))"
+
+PG_SEARCH_DDL = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    f"CREATE INDEX IF NOT EXISTS ix_contacts_search_tsv ON contacts USING GIN (to_tsvector('simple', {PG_SEARCH_DOCUMENT}))",
+    f"CREATE INDEX IF NOT EXISTS ix_contacts_search_trgm ON contacts USING GIN ({PG_SEARCH_DOCUMENT} gin_trgm_ops)",
+]
+
+def ensure_search_index(engine: Engine):
+    """
+    Creates the full-text search structures for the engine's dialect.
+
+    On SQLite this is an external-content FTS5 table kept in sync with
+    `contacts` by triggers (rebuilt from existing rows when first created); on
+    Postgres a tsvector GIN index for word/prefix matches and a pg_trgm GIN
+    index for typo-tolerant similarity. Safe to call on every startup.
+
+    Args:
+        engine (Engine): The SQLAlchemy engine to install the index on.
+    """
+    with engine.begin() as conn:
+        if engine.dialect.name == "sqlite":
+            exists = conn.execute(
+                text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'contacts_fts'")
+            ).first()
+            for statement in SQLITE_SEARCH_DDL:
+                conn.execute(text(statement))
+            if not exists:
+                conn.execute(text("INSERT INTO contacts_fts(contacts_fts) VALUES ('rebuild')"))
+        elif engine.dialect.name == "postgresql":
+            for statement in PG_SEARCH_DDL:
+                conn.execute(text(statement))
+
+def _tokenize(query: str) -> list[str]:
+    """Splits a search query into lower-cased word tokens."""
+    return re.findall(r"\w+", query.lower())
+
+def _fts5_query(terms: list[list[str]]) -> str:
+    """
+    Builds an FTS5 MATCH expression: every word must match, each word as a prefix
+    or as one of its alternative spellings.
+    """
+    groups = []
+    for alternatives in terms:
+        options = [f'"{alternatives[0]}"*'] + [f'"{term}"' for term in alternatives[1:]]
+        groups.append(options[0] if len(options) == 1 else f"({' OR '.join(options)})")
+    return " AND ".join(groups)
+
+def _close_terms(db: Session, token: str) -> list[str]:
+    """Finds indexed terms within a small edit distance of a token, sharing its first letter."""
+    rows = db.execute(
+        text("SELECT term FROM contacts_fts_vocab WHERE term >= :low AND term < :high LIMIT 5000"),
+        {"low": token[0], "high": token[0] + "\U0010ffff"},
+    ).scalars().all()
+    return difflib.get_close_matches(token, rows, n=TYPO_CANDIDATES, cutoff=0.75)
+
+def _search_sqlite(db: Session, user_id: int, tokens: list[str], limit: int, filters: list) -> list:
+    """Runs a ranked FTS5 search, retrying with close spellings when nothing matches."""
+    statement = (
+        select(Contact)
+        .join(contacts_fts, contacts_fts.c.rowid == Contact.id)
+        .where(
+            literal_column("contacts_fts").op("MATCH")(bindparam("match")),
+            Contact.user_id == user_id,
+            Contact.deleted_at.is_(None),
+            *filters,
+        )
+        .order_by(text("bm25(contacts_fts, 10.0, 10.0, 5.0)"), Contact.id)
+        .limit(limit)
+    )
+    contacts = db.scalars(statement, {"match": _fts5_query([[t] for t in tokens])}).all()
+    if contacts:
+        return contacts
+
+    terms = [[token, *_close_terms(db, token)] for token in tokens]
+    if all(len(alternatives) == 1 for alternatives in terms):
+        return contacts
+    return db.scalars(statement, {"match": _fts5_query(terms)}).all()
+
+def _search_postgres(db: Session, user_id: int, tokens: list[str], query: str, limit: int, filters: list) -> list:
+    """Runs a ranked search combining tsvector prefix matches and trigram similarity."""
+    vector = f"to_tsvector('simple', {PG_SEARCH_DOCUMENT})"
+    tsquery = "to_tsquery('simple', :tsquery)"
+    statement = (
+        select(Contact)
+        .where(
+            Contact.user_id == user_id,
+            Contact.deleted_at.is_(None),
+            text(f"({vector} @@ {tsquery} OR {PG_SEARCH_DOCUMENT} % :query)"),
+            *filters,
+        )
+        .order_by(text(f"greatest(ts_rank({vector}, {tsquery}), similarity({PG_SEARCH_DOCUMENT}, :query)) DESC"), Contact.id)
+        .limit(limit)
+    )
+    return db.scalars(
+        statement, {"tsquery": " & ".join(f"{token}:*" for token in tokens), "query": query}
+    ).all()
+
+def search_like(db: Session, user_id: int, query: str, limit: int = DEFAULT_SEARCH_LIMIT, filters: list = ()) -> list:
+    """
+    Unindexed substring search, used on dialects without a full-text index.
+
+    Args:
+        db (Session): The database session object.
+        user_id (int): The ID of the user whose contacts to search.
+        query (str): The search query string.
+        limit (int): The maximum number of contacts to return.
+        filters (list): Further SQL conditions the contacts must meet.
+
+    Returns:
+        list: Matching Contact objects ordered by ID.
+    """
+    pattern = f"%{query}%"
+    return db.query(Contact).filter(
+        Contact.user_id == user_id,
+        Contact.deleted_at.is_(None),
+        (
+            (Contact.first_name.ilike(pattern)) |
+            (Contact.last_name.ilike(pattern)) |
+            (Contact.email.ilike(pattern))
+        ),
+        *filters,
+    ).order_by(Contact.id).limit(limit).all()
+
+def search_contacts(db: Session, user_id: int, query: str, limit: int = DEFAULT_SEARCH_LIMIT, filters: list = ()) -> list:
+    """
+    Searches a user's contacts by name and email through the full-text index.
+
+    Every word of the query has to match the start of a word in the first
+    name, last name or email. If nothing matches, close spellings of the words
+    are tried as well. Results are ordered by relevance.
+
+    Args:
+        db (Session): The database session object.
+        user_id (int): The ID of the user whose contacts to search.
+        query (str): The search query string.
+        limit (int): The maximum number of contacts to return.
+        filters (list): Further SQL conditions the contacts must meet, such as `extra_data` filters.
+
+    Returns:
+        list: Matching Contact objects, most relevant first.
+    """
+    tokens = _tokenize(query)
+    if not tokens:
+        return []
+    dialect = db.get_bind().dialect.name
+    if dialect == "sqlite":
+        return _search_sqlite(db, user_id, tokens, limit, filters)
+    if dialect == "postgresql":
+        return _search_postgres(db, user_id, tokens, query, limit, filters)
+    return search_like(db, user_id, query, limit, filters)
@@ -0,0 +1,60 @@
+from operator import attrgetter
+import orjson
+from fastapi.responses import JSONResponse
+from contacts_api import schemas
+
+# Keys of a contact in responses, in the order `schemas.ContactOut` dumps them
+CONTACT_OUT_FIELDS = tuple(schemas.ContactOut.model_fields)
+
+# UTC datetimes end in "Z", as Pydantic writes them
+ORJSON_OPTIONS = orjson.OPT_UTC_Z
+
+def dumps(content) -> bytes:
+    """
+    Encodes plain data as JSON with orjson.
+
+    Dates and datetimes are written as ISO 8601 strings, as Pydantic writes them.
+
+    Args:
+        content (Any): Dicts, lists, strings, numbers, None, dates and datetimes.
+
+    Returns:
+        bytes: The compact UTF-8 JSON.
+    """
+    return orjson.dumps(content, option=ORJSON_OPTIONS)
+
+class ORJSONResponse(JSONResponse):
+    """A JSON response encoded with orjson, several times faster than the stdlib encoder on large lists."""
+
+    def render(self, content) -> bytes:
+        return dumps(content)
+
+def contact_dicts(contacts, fields: tuple = CONTACT_OUT_FIELDS) -> list[dict]:
+    """
+    Maps ORM contacts to response dicts without Pydantic validation.
+
+    The rows come from the database, which only holds validated contacts, so
+    re-validating them on the way out (email syntax above all) is skipped.
+
+    Args:
+        contacts (Iterable[Contact]): The contacts.
+        fields (tuple): The keys to output, at least two.
+
+    Returns:
+        list[dict]: One dict per contact, keyed in `fields` order.
+    """
+    values = attrgetter(*fields)
+    return [dict(zip(fields, values(contact))) for contact in contacts]
+
+def row_dicts(rows, fields: tuple = CONTACT_OUT_FIELDS) -> list[dict]:
+    """
+    Maps Core row tuples to response dicts without Pydantic validation.
+
+    Args:
+        rows (Iterable[tuple]): Rows selected in `fields` order.
+        fields (tuple): The keys to output.
+
+    Returns:
+        list[dict]: One dict per row.
+    """
+    return [dict(zip(fields, row)) for row in rows]
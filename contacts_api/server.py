@@ -0,0 +1,105 @@
+"""Production entry point: runs the API under uvicorn with several workers and a graceful drain.
+
+Settings come from `config.Settings` (SERVER_*, SHUTDOWN_*), and the command
+line overrides the most common ones. Usage::
+
+    python -m contacts_api.server --workers 4
+"""
+import argparse
+import os
+import signal
+import time
+import uvicorn
+from uvicorn.supervisors import Multiprocess
+from contacts_api import lifecycle
+from contacts_api.config import settings
+from contacts_api.database import get_engine
+
+APP = "contacts_api.main:app"
+
+class DrainingServer(uvicorn.Server):
+    """A uvicorn server that keeps serving for SHUTDOWN_DRAIN_DELAY seconds after SIGTERM.
+
+    During the delay readiness fails, so load balancers take the worker out of
+    rotation before it stops accepting connections; requests still in flight
+    afterwards get SHUTDOWN_TIMEOUT seconds to finish. A second signal, or
+    SIGINT, stops at once as usual.
+
+    Attributes:
+        drain_delay (float): Seconds between the signal and closing the listening socket.
+    """
+
+    def __init__(self, config: uvicorn.Config, drain_delay: float = None):
+        super().__init__(config)
+        self.drain_delay = settings.SHUTDOWN_DRAIN_DELAY if drain_delay is None else drain_delay
+        self._drain_deadline = None
+
+    def handle_exit(self, sig, frame):
+        if sig == signal.SIGTERM and self.drain_delay > 0 and self._drain_deadline is None and self.started:
+            lifecycle.state.drain()
+            self._drain_deadline = time.monotonic() + self.drain_delay
+            return
+        super().handle_exit(sig, frame)
+
+    async def on_tick(self, counter: int) -> bool:
+        if self._drain_deadline is not None and time.monotonic() >= self._drain_deadline:
+            self.should_exit = True
+        return await super().on_tick(counter)
+
+def build_config(host: str, port: int, workers: int) -> uvicorn.Config:
+    """
+    Builds the uvicorn configuration of the production server.
+
+    Args:
+        host (str): The interface to bind.
+        port (int): The port to bind.
+        workers (int): The number of worker processes.
+
+    Returns:
+        uvicorn.Config: The configuration.
+    """
+    return uvicorn.Config(
+        APP,
+        host=host,
+        port=port,
+        workers=workers,
+        loop=settings.SERVER_LOOP,
+        http=settings.SERVER_HTTP,
+        lifespan="on",
+        proxy_headers=settings.RATE_LIMIT_TRUST_FORWARDED,
+        timeout_keep_alive=settings.SERVER_KEEPALIVE_TIMEOUT,
+        timeout_graceful_shutdown=settings.SHUTDOWN_TIMEOUT,
+    )
+
+def prepare_database():
+    """
+    Creates missing tables once, before the workers start, so they do not race to create them.
+
+    As at startup, tables are not created in a database migrated by Alembic.
+
+    The workers are spawned with DB_CREATE_ALL turned off, which they read
+    from the environment they inherit.
+    """
+    if settings.DB_CREATE_ALL:
+        engine = get_engine()
+        lifecycle.setup_database(engine)
+        engine.dispose()
+        os.environ["DB_CREATE_ALL"] = "false"
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default=settings.SERVER_HOST)
+    parser.add_argument("--port", type=int, default=settings.SERVER_PORT)
+    parser.add_argument("--workers", type=int, default=settings.SERVER_WORKERS)
+    args = parser.parse_args()
+
+    config = build_config(args.host, args.port, args.workers)
+    server = DrainingServer(config)
+    if config.workers > 1:
+        prepare_database()
+        Multiprocess(config, target=server.run, sockets=[config.bind_socket()]).run()
+    else:
+        server.run()
+
+if __name__ == "__main__":
+    main()
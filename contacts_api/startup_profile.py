@@ -0,0 +1,182 @@
+"""Reports where a cold start spends its time: imports, application startup and the first request.
+
+Imports the app in a fresh interpreter with ``-X importtime`` and lists the
+slowest modules and the import time of each top-level package. Then, in
+another fresh interpreter, it times interpreter start-up, the import, the
+lifespan startup (table creation and warm-up) and the first and second
+requests served through the ASGI app, as a scaled-to-zero deployment would
+see them. Only the standard library is imported here, so the measurements
+start from a clean interpreter. Usage::
+
+    python -m contacts_api.startup_profile
+    python -m contacts_api.startup_profile --path /contacts/?limit=50 --token <access token> --json
+"""
+import argparse
+import json
+import subprocess
+import sys
+import time
+
+APP_MODULE = "contacts_api.main"
+
+def parse_importtime(output: str) -> list[dict]:
+    """
+    Parses the report ``python -X importtime`` writes to stderr.
+
+    Args:
+        output (str): The interpreter's stderr.
+
+    Returns:
+        list[dict]: Per imported module, in import order: its name, nesting depth,
+        and self and cumulative import time in milliseconds.
+    """
+    modules = []
+    for line in output.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        modules.append({
+            "module": name.strip(),
+            "depth": (len(name) - len(name.lstrip()) - 1) // 2,
+            "self_ms": int(self_us) / 1000,
+            "cumulative_ms": int(cumulative_us) / 1000,
+        })
+    return modules
+
+def by_package(modules: list[dict]) -> dict:
+    """
+    Adds up the self time of the modules of each top-level package.
+
+    Args:
+        modules (list[dict]): As returned by `parse_importtime`.
+
+    Returns:
+        dict: Milliseconds by package, slowest first.
+    """
+    totals = {}
+    for module in modules:
+        package = module["module"].split(".")[0]
+        totals[package] = totals.get(package, 0) + module["self_ms"]
+    return dict(sorted(totals.items(), key=lambda item: item[1], reverse=True))
+
+def profile_imports(module: str = APP_MODULE) -> list[dict]:
+    """
+    Imports `module` in a fresh interpreter with ``-X importtime``.
+
+    Args:
+        module (str): The module to import.
+
+    Returns:
+        list[dict]: As returned by `parse_importtime`.
+
+    Raises:
+        RuntimeError: If the import fails.
+    """
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                            capture_output=True, text=True)
+    if result.returncode:
+        raise RuntimeError(f"Importing {module} failed:\n{result.stderr[-2000:]}")
+    return parse_importtime(result.stderr)
+
+def _serve_first_requests(path: str, token: str = None) -> dict:
+    """
+    Runs in the child interpreter: imports the app, runs its lifespan startup and serves two requests.
+
+    Returns:
+        dict: Wall clock timestamps at the end of each phase and the first response's status.
+    """
+    import asyncio
+
+    marks = {"started": time.time()}
+    from contacts_api import main
+    marks["imported"] = time.time()
+
+    async def serve():
+        import httpx
+
+        headers = {"Authorization": f"Bearer {token}"} if token else {}
+        async with main.app.router.lifespan_context(main.app):
+            marks["ready"] = time.time()
+            transport = httpx.ASGITransport(app=main.app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://profile") as client:
+                response = await client.get(path, headers=headers)
+                marks["first_response"] = time.time()
+                await client.get(path, headers=headers)
+                marks["second_response"] = time.time()
+        marks["status"] = response.status_code
+
+    asyncio.run(serve())
+    return marks
+
+def profile_first_request(path: str, token: str = None) -> dict:
+    """
+    Times a cold start in a fresh interpreter, up to the first and second responses.
+
+    Args:
+        path (str): The path requested.
+        token (str, optional): An access token, for routes that need one.
+
+    Returns:
+        dict: Milliseconds spent starting the interpreter, importing the app,
+        running its startup, serving the first request and serving the second
+        one, the total to the first response, and the first response's status.
+
+    Raises:
+        RuntimeError: If the child process fails.
+    """
+    command = [sys.executable, "-m", __spec__.name if __spec__ else "contacts_api.startup_profile", "--child", "--path", path]
+    if token:
+        command += ["--token", token]
+    spawned = time.time()
+    result = subprocess.run(command, capture_output=True, text=True)
+    if result.returncode:
+        raise RuntimeError(f"Cold start failed:\n{result.stderr[-2000:]}")
+    marks = json.loads(result.stdout.strip().splitlines()[-1])
+    ms = lambda start, end: round((end - start) * 1000, 1)
+    return {
+        "interpreter": ms(spawned, marks["started"]),
+        "import": ms(marks["started"], marks["imported"]),
+        "startup": ms(marks["imported"], marks["ready"]),
+        "first_request": ms(marks["ready"], marks["first_response"]),
+        "second_request": ms(marks["first_response"], marks["second_response"]),
+        "time_to_first_response": ms(spawned, marks["first_response"]),
+        "status": marks["status"],
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--path", default="/health/ready", help="path of the first request")
+    parser.add_argument("--token", help="access token sent with the requests")
+    parser.add_argument("--top", type=int, default=15, help="slowest modules and packages to list")
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(_serve_first_requests(args.path, args.token)))
+        return
+
+    modules = profile_imports()
+    report = {
+        "import_ms": sum(module["self_ms"] for module in modules),
+        "packages": dict(list(by_package(modules).items())[:args.top]),
+        "modules": sorted(modules, key=lambda module: module["self_ms"], reverse=True)[:args.top],
+        "cold_start": profile_first_request(args.path, args.token),
+    }
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+
+    print(f"Import of {APP_MODULE}: {report['import_ms']:.0f} ms\n")
+    print(f"{'package':>32} {'self ms':>9}")
+    for package, elapsed in report["packages"].items():
+        print(f"{package:>32} {elapsed:>9.1f}")
+    print(f"\n{'module':>48} {'self ms':>9} {'cumul. ms':>10}")
+    for module in report["modules"]:
+        print(f"{module['module'][-48:]:>48} {module['self_ms']:>9.1f} {module['cumulative_ms']:>10.1f}")
+    print(f"\nCold start to GET {args.path} ({report['cold_start']['status']}):")
+    for phase in ("interpreter", "import", "startup", "first_request", "second_request", "time_to_first_response"):
+        print(f"{phase:>32} {report['cold_start'][phase]:>9.1f} ms")
+
+if __name__ == "__main__":
+    main()
@@ -1,13 +1,53 @@
 import pytest
 from fastapi.testclient import TestClient
-from contacts_api.main import app 
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
 from unittest.mock import patch
+from contacts_api import schemas
+from contacts_api.database import Base, get_session
+from contacts_api.models import User
 
 @pytest.fixture
 def client():
+    from contacts_api.main import app
+
     with TestClient(app) as client:
         yield client
 
+@pytest.fixture
+def db_session():
+    engine = create_engine(
+        "sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool
+    )
+    Base.metadata.create_all(bind=engine)
+    session = sessionmaker(autocommit=False, autoflush=False, bind=engine)()
+    try:
+        yield session
+    finally:
+        session.close()
+        engine.dispose()
+
+@pytest.fixture
+def user(db_session):
+    """A user with no contacts, in `db_session`."""
+    user = User(username="owner", email="owner@example.com", hashed_password="x")
+    db_session.add(user)
+    db_session.commit()
+    return user
+
+@pytest.fixture
+def api(db_session, user):
+    """A client of the real app on `db_session`, authenticated as `user` without a token."""
+    from contacts_api import main
+
+    main.app.dependency_overrides[get_session] = lambda: db_session
+    main.app.dependency_overrides[main.get_current_user_from_token] = lambda: schemas.UserCached.model_validate(user)
+    try:
+        yield TestClient(main.app)
+    finally:
+        main.app.dependency_overrides.clear()
+
 @pytest.fixture
 def mock_cloudinary():
     with patch("cloudinary.uploader.upload") as mock_upload:
@@ -15,5 +55,5 @@ def mock_cloudinary():
 
 @pytest.fixture
 def mock_send_email():
-    with patch("contacts_api.user.aiosmtplib.send") as mock_send:
+    with patch("contacts_api.outbox.SMTPConnection.send") as mock_send:
         yield mock_send
@@ -0,0 +1,55 @@
+from contextlib import contextmanager
+import pytest
+from fastapi.testclient import TestClient
+from contacts_api import auth_cache, query_budget, response_cache, search
+from contacts_api.auth import create_access_token
+from contacts_api.database import get_session
+from contacts_api.models import Contact
+
+@pytest.fixture
+def token_api(db_session, user):
+    """A client of the real app on the test database, authenticated as `user` with an access token.
+
+    Unlike `api`, requests go through token decoding and the user lookup.
+    The user has three contacts, and the auth and contacts version caches
+    start empty, so query counts are the cold-cache worst case.
+    """
+    from contacts_api import main
+
+    search.ensure_search_index(db_session.get_bind())
+    db_session.add_all(
+        Contact(user_id=user.id, first_name=f"First{i}", last_name=f"Last{i}", email=f"c{i}@example.com",
+                phone_number=str(i))
+        for i in range(3)
+    )
+    db_session.commit()
+    for cache in (auth_cache.token_cache, auth_cache.user_cache.l1, response_cache.contacts_versions.l1):
+        cache.clear()
+    main.app.dependency_overrides[get_session] = lambda: db_session
+    client = TestClient(main.app)
+    client.headers["Authorization"] = f"Bearer {create_access_token({'sub': str(user.id)})}"
+    try:
+        yield client
+    finally:
+        main.app.dependency_overrides.clear()
+
+@pytest.fixture
+def assert_queries(db_session):
+    """Asserts the number of queries run inside a block, and that no statement repeats (N+1).
+
+    Usage::
+
+        with assert_queries(2):
+            token_api.get("/contacts/")
+    """
+    query_budget.instrument_engine(db_session.get_bind())
+
+    @contextmanager
+    def check(expected: int):
+        with query_budget.track_queries() as tracker:
+            yield tracker
+        statements = "\n".join(f"{count}x {statement}" for statement, count in tracker.statements.items())
+        assert tracker.count == expected, f"expected {expected} queries, ran {tracker.count}:\n{statements}"
+        assert not tracker.repeated(), f"repeated statements (N+1?):\n{statements}"
+
+    return check
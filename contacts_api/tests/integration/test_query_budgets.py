@@ -0,0 +1,52 @@
+import pytest
+from contacts_api import main
+from contacts_api.models import Contact
+
+CONTACT = {"first_name": "Ada", "last_name": "Lovelace", "email": "ada@example.com", "phone_number": "1"}
+
+# Queries per route with cold auth and version caches; keep in step with the budgets declared in main
+ROUTE_QUERIES = [
+    ("GET", "/contacts/", "/contacts/", None, 3),
+    ("GET", "/contacts/", "/contacts/?ids=1,2,3", None, 3),
+    ("GET", "/contacts/{contact_id}", "/contacts/1", None, 3),
+    ("GET", "/contacts/changes", "/contacts/changes", None, 3),
+    ("GET", "/contacts/facets", "/contacts/facets", None, 3),
+    ("GET", "/contacts/", "/contacts/?tag=work", None, 3),
+    ("GET", "/contacts/", "/contacts/?extra.company=Acme", None, 3),
+    ("GET", "/contacts/birthdays/", "/contacts/birthdays/", None, 3),
+    ("GET", "/contacts/search/", "/contacts/search/?query=First", None, 2),
+    ("POST", "/contacts/", "/contacts/", CONTACT, 4),
+    ("PUT", "/contacts/{contact_id}", "/contacts/1", {"first_name": "Augusta"}, 5),
+    ("POST", "/contacts/", "/contacts/", {**CONTACT, "tags": ["work", "friends"]}, 7),
+    ("PUT", "/contacts/{contact_id}", "/contacts/1", {"tags": ["work"]}, 9),
+    ("DELETE", "/contacts/{contact_id}", "/contacts/1", None, 5),
+    ("GET", "/users/me", "/users/me", None, 1),
+]
+
+# Queries of a batch mixing gets, patches and deletes, with cold caches
+BATCH_QUERIES = 5
+
+def declared_budget(method: str, template: str):
+    [route] = [route for route in main.app.routes if getattr(route, "path", None) == template and method in route.methods]
+    return getattr(route.endpoint, "query_budget", None)
+
+@pytest.mark.parametrize("method,template,url,body,expected", ROUTE_QUERIES)
+def test_route_query_count(token_api, assert_queries, method, template, url, body, expected):
+    with assert_queries(expected):
+        response = token_api.request(method, url, json=body)
+
+    assert response.status_code == 200
+    assert declared_budget(method, template) >= expected
+
+@pytest.mark.parametrize("size", [3, 30])
+def test_batch_queries_do_not_grow_with_its_size(token_api, assert_queries, db_session, user, size):
+    db_session.add_all(Contact(user_id=user.id, first_name=f"Extra{i}", last_name="Batch") for i in range(27))
+    db_session.commit()
+    ops = [{"op": "get"}, {"op": "patch", "data": {"first_name": "Augusta"}}, {"op": "delete"}]
+    operations = [{**ops[i % len(ops)], "id": i + 1} for i in range(size)]
+
+    # The same count for any size: one statement per kind of operation
+    with assert_queries(BATCH_QUERIES):
+        response = token_api.post("/contacts/batch", json={"operations": operations})
+
+    assert [item["status"] for item in response.json()["results"]] == [200] * size
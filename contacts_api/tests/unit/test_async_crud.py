@@ -0,0 +1,45 @@
+import asyncio
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import StaticPool
+from contacts_api import async_crud
+from contacts_api.database import Base
+from contacts_api.models import User
+
+def new_user():
+    return User(username="owner", email="owner@example.com", hashed_password="x")
+
+async def exercise(db, user_id):
+    created = await async_crud.create_contact(db, user_id, {"first_name": "Ann", "last_name": "Smith"})
+    await async_crud.update_contact(db, user_id, created.id, {"email": "ann@example.com"})
+    page, _ = await async_crud.get_contacts_page(db, user_id, fields=["email"])
+    batches = [rows async for rows in async_crud.stream_contacts(db, user_id, ["first_name"])]
+    found = await async_crud.get_user_by_id(db, user_id)
+    deleted = await async_crud.delete_contact(db, user_id, created.id)
+    remaining = await async_crud.get_contacts(db, user_id)
+
+    assert page == [{"email": "ann@example.com"}]
+    assert [tuple(row) for rows in batches for row in rows] == [("Ann",)]
+    assert found.username == "owner"
+    assert deleted.first_name == "Ann"
+    assert remaining == []
+
+def test_async_crud_on_async_session():
+    async def scenario():
+        engine = create_async_engine("sqlite+aiosqlite://", poolclass=StaticPool)
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        async with async_sessionmaker(engine, expire_on_commit=False)() as db:
+            user = new_user()
+            db.add(user)
+            await db.commit()
+            await exercise(db, user.id)
+        await engine.dispose()
+
+    asyncio.run(scenario())
+
+def test_async_crud_on_sync_session(db_session):
+    user = new_user()
+    db_session.add(user)
+    db_session.commit()
+
+    asyncio.run(exercise(db_session, user.id))
@@ -0,0 +1,59 @@
+import asyncio
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import event
+from contacts_api import auth_cache
+from contacts_api.auth import create_access_token
+
+@pytest.fixture(autouse=True)
+def clear_caches():
+    auth_cache.token_cache.clear()
+    auth_cache.user_cache.l1.clear()
+
+def count_queries(db):
+    statements = []
+    event.listen(db.get_bind(), "before_cursor_execute", lambda *args: statements.append(args[2]))
+    return statements
+
+def test_decode_token_caches_until_exp():
+    token = create_access_token({"sub": "1"})
+
+    first = auth_cache.decode_token(token)
+    second = auth_cache.decode_token(token)
+
+    assert first == second and first["sub"] == "1"
+    assert auth_cache.token_cache.stats()["hits"] == 1
+
+def test_decode_token_rejects_known_signature_with_other_payload():
+    token = create_access_token({"sub": "1"})
+    auth_cache.decode_token(token)
+    header, _, signature = token.split(".")
+    forged = f"{header}.{create_access_token({'sub': '2'}).split('.')[1]}.{signature}"
+
+    assert auth_cache.decode_token(forged) is None
+
+def test_load_current_user_hits_database_once(db_session, user):
+    token = create_access_token({"sub": str(user.id)})
+    statements = count_queries(db_session)
+
+    first = asyncio.run(auth_cache.load_current_user(db_session, token))
+    second = asyncio.run(auth_cache.load_current_user(db_session, token))
+
+    assert first.id == second.id == user.id
+    assert len(statements) == 1
+
+def test_user_update_invalidates_cached_row_after_commit(db_session, user):
+    token = create_access_token({"sub": str(user.id)})
+    asyncio.run(auth_cache.load_current_user(db_session, token))
+
+    user.is_verified = True
+    db_session.flush()
+    assert auth_cache.user_cache.l1.get(user.id) is not None
+    db_session.commit()
+
+    assert asyncio.run(auth_cache.load_current_user(db_session, token)).is_verified is True
+
+def test_load_current_user_rejects_invalid_token(db_session):
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(auth_cache.load_current_user(db_session, "not.a.token"))
+    assert error.value.status_code == 401
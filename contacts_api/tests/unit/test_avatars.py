@@ -0,0 +1,145 @@
+import asyncio
+from io import BytesIO
+import pytest
+from fastapi import FastAPI, HTTPException
+from fastapi.testclient import TestClient
+from PIL import Image
+from contacts_api import avatars, schemas, uploading
+from contacts_api.database import get_session
+from contacts_api.user import get_current_user
+
+def make_image(fmt: str = "PNG", size=(800, 600)) -> bytes:
+    buffer = BytesIO()
+    Image.new("RGB", size, (200, 50, 50)).save(buffer, fmt)
+    return buffer.getvalue()
+
+@pytest.fixture
+def storage(tmp_path, monkeypatch):
+    storage = avatars.LocalAvatarStorage(tmp_path)
+    monkeypatch.setattr(avatars, "_storage", storage)
+    return storage
+
+@pytest.fixture
+def avatar_client(db_session, user, storage):
+    app = FastAPI()
+    app.include_router(uploading.router)
+    app.dependency_overrides[get_current_user] = lambda: schemas.UserCached.model_validate(user)
+    app.dependency_overrides[get_session] = lambda: db_session
+    return TestClient(app), user
+
+def test_sniff_image_type():
+    assert avatars.sniff_image_type(make_image("PNG")[:12]) == "image/png"
+    assert avatars.sniff_image_type(make_image("JPEG")[:12]) == "image/jpeg"
+    assert avatars.sniff_image_type(make_image("WEBP")[:12]) == "image/webp"
+    assert avatars.sniff_image_type(b"RIFF\x00\x00\x00\x00WAVE") is None
+    assert avatars.sniff_image_type(b"<svg xmlns=") is None
+
+def test_render_variants_are_square_webp():
+    variants = avatars.render_variants(make_image("JPEG", (1200, 900)))
+
+    assert sorted(variants) == list(avatars.AVATAR_SIZES)
+    for size, data in variants.items():
+        with Image.open(BytesIO(data)) as image:
+            assert (image.format, image.size) == ("WEBP", (size, size))
+
+def test_upload_stores_variants_and_updates_user(avatar_client, db_session, storage):
+    client, user = avatar_client
+
+    response = client.put("/me/avatar/", files={"file": ("a.jpg", make_image("PNG"), "image/jpeg")})
+
+    assert response.status_code == 200
+    body = response.json()
+    assert set(body["variants"]) == {str(size) for size in avatars.AVATAR_SIZES}
+    assert body["avatar_url"] == body["variants"]["256"]
+    db_session.refresh(user)
+    assert user.avatar_url == body["avatar_url"]
+    assert len(list((storage.root / str(user.id)).iterdir())) == len(avatars.AVATAR_SIZES)
+
+def test_raw_body_upload(avatar_client):
+    client, _ = avatar_client
+
+    response = client.put("/me/avatar/", content=make_image("WEBP"), headers={"Content-Type": "image/webp"})
+
+    assert response.status_code == 200
+
+def test_content_type_is_not_trusted(avatar_client):
+    client, _ = avatar_client
+
+    response = client.put("/me/avatar/", files={"file": ("a.png", b"<html>not an image</html>", "image/png")})
+
+    assert response.status_code == 415
+
+def test_oversized_upload_is_rejected(avatar_client, monkeypatch):
+    client, _ = avatar_client
+    monkeypatch.setattr(avatars.settings, "AVATAR_MAX_FILE_SIZE", 1024)
+
+    response = client.put("/me/avatar/", content=make_image("PNG") + b"\x00" * 4096, headers={"Content-Type": "image/png"})
+
+    assert response.status_code == 413
+
+def test_size_limit_stops_reading_the_stream():
+    consumed = []
+
+    async def stream():
+        for i in range(100):
+            consumed.append(i)
+            yield b"\x89PNG\r\n\x1a\n" + b"\x00" * 1016
+
+    async def read():
+        return [chunk async for chunk in avatars._limit(stream(), 4096, sniff=True)]
+
+    with pytest.raises(HTTPException) as exc:
+        asyncio.run(read())
+    assert exc.value.status_code == 413
+    assert len(consumed) == 5
+
+def test_sniffing_stops_reading_the_stream():
+    consumed = []
+
+    async def stream():
+        for i in range(100):
+            consumed.append(i)
+            yield b"%PDF-1.7 not an image"
+
+    async def read():
+        return [chunk async for chunk in avatars._limit(stream(), 1 << 20, sniff=True)]
+
+    with pytest.raises(HTTPException) as exc:
+        asyncio.run(read())
+    assert exc.value.status_code == 415
+    assert len(consumed) == 1
+
+def test_variant_is_served_with_strong_etag(avatar_client):
+    client, _ = avatar_client
+    url = client.put("/me/avatar/", files={"file": ("a.png", make_image("PNG"), "image/png")}).json()["variants"]["64"]
+
+    response = client.get(url)
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "image/webp"
+    etag = response.headers["etag"]
+    assert etag.startswith('"') and not etag.startswith("W/")
+
+    cached = client.get(url, headers={"If-None-Match": f'"0123456789abcdef-64", W/{etag}'})
+    assert cached.status_code == 304
+    assert cached.content == b""
+    assert client.get(url, headers={"If-None-Match": etag[:-2] + '"'}).status_code == 200
+
+def test_variant_keys_hash_the_rendered_bytes(avatar_client, monkeypatch):
+    client, _ = avatar_client
+    image = make_image("PNG")
+    first = client.put("/me/avatar/", files={"file": ("a.png", image, "image/png")}).json()["variants"]
+    assert client.put("/me/avatar/", files={"file": ("a.png", image, "image/png")}).json()["variants"] == first
+
+    monkeypatch.setattr(avatars.settings, "AVATAR_WEBP_QUALITY", 20)
+    second = client.put("/me/avatar/", files={"file": ("a.png", image, "image/png")}).json()["variants"]
+
+    assert second["64"] != first["64"]
+    assert client.get(second["64"]).headers["etag"] != client.get(first["64"]).headers["etag"]
+
+def test_unknown_variant_is_not_found(avatar_client):
+    client, user = avatar_client
+
+    assert client.get(f"/avatars/{user.id}/0123456789abcdef_64.webp").status_code == 404
+    missing = client.get(f"/avatars/{user.id}/0123456789abcdef_64.webp", headers={"If-None-Match": '"0123456789abcdef-64"'})
+    assert missing.status_code == 404
+    assert client.get(f"/avatars/{user.id}/..%2F..%2Fetc%2Fpasswd").status_code == 404
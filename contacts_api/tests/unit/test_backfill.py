@@ -0,0 +1,89 @@
+import sqlite3
+import pytest
+from sqlalchemy import Integer, String, column, create_engine, table, text
+from contacts_api import backfill, models
+
+@pytest.fixture
+def engine(tmp_path):
+    path = tmp_path / "contacts.db"
+    engine = create_engine(f"sqlite:///{path}")
+    models.Base.metadata.create_all(engine)
+    with sqlite3.connect(path) as conn:
+        conn.executemany(
+            "INSERT INTO contacts (first_name, last_name, user_id, birthday, updated_at) VALUES ('A', 'B', 1, ?, '2024-01-01 00:00:00')",
+            [(f"1990-{month:02d}-{day:02d}" if day % 5 else None,) for month in (1, 12) for day in range(1, 26)],
+        )
+    try:
+        yield engine
+    finally:
+        engine.dispose()
+
+def birthday_keys(engine) -> list:
+    with engine.connect() as conn:
+        return conn.execute(text("SELECT birthday_md FROM contacts ORDER BY id")).scalars().all()
+
+def test_run_fills_rows_in_batches_without_touching_updated_at(engine):
+    reports = []
+
+    report = backfill.run(engine, backfill.BACKFILLS["contacts_birthday_md"], batch_size=8, sleep=0,
+                          progress=lambda report: reports.append(dict(report)))
+
+    keys = birthday_keys(engine)
+    assert keys[:5] == [101, 102, 103, 104, None] and keys[-2:] == [1224, None]
+    assert report["scanned"] == report["updated"] == 40
+    assert report["batches"] == len(reports) == 6
+    assert [r["percent"] for r in reports][-1] == 100.0 and reports[0]["percent"] < 25
+    with engine.connect() as conn:
+        assert set(conn.execute(text("SELECT updated_at FROM contacts")).scalars()) == {"2024-01-01 00:00:00"}
+
+def test_interrupted_run_resumes_from_its_checkpoint(engine):
+    def stop(report):
+        raise KeyboardInterrupt
+
+    with pytest.raises(KeyboardInterrupt):
+        backfill.run(engine, backfill.BACKFILLS["contacts_birthday_md"], batch_size=10, sleep=0, progress=stop)
+    assert sum(key is not None for key in birthday_keys(engine)) == 10
+
+    resumed = backfill.run(engine, backfill.BACKFILLS["contacts_birthday_md"], batch_size=10, sleep=0)
+
+    assert resumed["scanned"] == resumed["updated"] == 30
+    checkpoint, = backfill.status(engine)
+    assert checkpoint["rows_updated"] == 40 and checkpoint["finished_at"] is not None
+    assert backfill.run(engine, backfill.BACKFILLS["contacts_birthday_md"])["scanned"] == 0
+
+def test_reset_starts_over_but_skips_filled_rows(engine):
+    backfill.run(engine, backfill.BACKFILLS["contacts_birthday_md"], sleep=0)
+    with engine.begin() as conn:
+        conn.execute(text("UPDATE contacts SET birthday_md = NULL WHERE id = 1"))
+
+    report = backfill.run(engine, backfill.BACKFILLS["contacts_birthday_md"], sleep=0, reset=True)
+
+    assert report["updated"] == 1 and birthday_keys(engine)[0] == 101
+
+def test_slow_batches_shrink_the_batch_size(engine, monkeypatch):
+    clock = iter(range(0, 10_000, 1))
+    monkeypatch.setattr(backfill.time, "perf_counter", lambda: next(clock))
+    monkeypatch.setattr(backfill, "MIN_BATCH_SIZE", 2)
+    sizes = []
+
+    backfill.run(engine, backfill.BACKFILLS["contacts_birthday_md"], batch_size=16, sleep=0, max_batch_seconds=0.5,
+                 progress=lambda report: sizes.append(report["batch_size"]))
+
+    assert sizes[:3] == [8, 4, 2]
+
+def test_assign_callables_are_evaluated_per_batch(engine):
+    contacts = table("contacts", column("id", Integer), column("phone_number", String))
+    calls = []
+    numbered = backfill.Backfill(
+        "numbered", contacts, contacts.c.id, where=contacts.c.phone_number.is_(None),
+        assign={"phone_number": lambda: calls.append(1) or f"batch-{len(calls)}"},
+    )
+
+    report = backfill.run(engine, numbered, batch_size=20, sleep=0)
+
+    assert report["updated"] == 50 and len(calls) == 3
+    with engine.connect() as conn:
+        phones = conn.execute(text("SELECT phone_number FROM contacts ORDER BY id")).scalars().all()
+    assert phones[0] == "batch-1" and phones[-1] == "batch-3"
+    with pytest.raises(ValueError):
+        backfill.Backfill("invalid", contacts, contacts.c.id, where=contacts.c.phone_number.is_(None))
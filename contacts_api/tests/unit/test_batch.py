@@ -0,0 +1,45 @@
+import pytest
+from sqlalchemy import event
+from contacts_api import crud, response_cache
+
+@pytest.fixture(autouse=True)
+def clear_caches():
+    response_cache.contacts_versions.l1.clear()
+    response_cache.response_cache.clear()
+
+def count_queries(db):
+    statements = []
+    event.listen(db.get_bind(), "before_cursor_execute", lambda *args: statements.append(args[2]))
+    return statements
+
+def contact_data(**overrides):
+    return {"first_name": "Ada", "last_name": "Lovelace", "email": "ada@example.com",
+            "phone_number": "123", "birthday": None, "extra_data": None, **overrides}
+
+def test_batch_runs_set_based_statements(api, db_session, user):
+    ids = [crud.create_contact(db_session, user.id, contact_data(email=f"c{i}@example.com")).id for i in range(4)]
+    etag = api.get("/contacts/").headers["etag"]
+
+    queries = count_queries(db_session)
+    response = api.post("/contacts/batch", json={"operations": [
+        {"op": "patch", "id": ids[0], "data": {"first_name": "Augusta"}},
+        {"op": "patch", "id": ids[1], "data": {"first_name": "Augusta"}},
+        {"op": "delete", "id": ids[2]},
+        {"op": "get", "id": ids[3]},
+        {"op": "get", "id": 999},
+        {"op": "delete", "id": ids[3]},
+    ]})
+    writes = [sql for sql in queries if sql.startswith("UPDATE contacts")]
+
+    assert response.status_code == 200
+    results = response.json()["results"]
+    assert [item["status"] for item in results] == [200, 200, 200, 200, 404, 400]
+    assert results[1]["contact"]["first_name"] == "Augusta"
+    assert results[2]["contact"]["id"] == ids[2]
+    assert len(writes) == 2 and all("RETURNING" in sql for sql in writes)
+    assert api.get("/contacts/", headers={"If-None-Match": etag}).status_code == 200
+    assert sorted(item["id"] for item in api.get("/contacts/").json()["items"]) == [ids[0], ids[1], ids[3]]
+
+def test_batch_rejects_unknown_operations(api):
+    assert api.post("/contacts/batch", json={"operations": [{"op": "put", "id": 1}]}).status_code == 422
+    assert api.post("/contacts/batch", json={"operations": []}).status_code == 422
@@ -0,0 +1,123 @@
+import json
+import pytest
+from sqlalchemy.exc import OperationalError
+from contacts_api import bulk, crud
+from contacts_api.models import Contact
+
+def test_import_contacts_inserts_valid_rows_and_reports_invalid_ones(db_session, user):
+    records = [
+        {"first_name": "Ann", "last_name": "Smith", "email": "ann@example.com"},
+        {"first_name": "Bob"},
+        {"first_name": "Cid", "last_name": "Jones", "email": "not-an-email"},
+        {"first_name": "Dan", "last_name": "Brown"},
+    ]
+
+    report = bulk.import_contacts(db_session, user.id, records, chunk_size=2)
+
+    assert report["created"] == 2 and report["failed"] == 2
+    assert [error["row"] for error in report["errors"]] == [2, 3]
+    assert db_session.query(Contact).filter(Contact.user_id == user.id).count() == 2
+
+def test_import_contacts_dedupes_against_existing_and_same_import(db_session, user):
+    db_session.add(Contact(first_name="Ann", last_name="Smith", email="ann@example.com", user_id=user.id))
+    db_session.commit()
+    records = [
+        {"first_name": "Ann", "last_name": "Smith", "email": "ann@example.com"},
+        {"first_name": "Bob", "last_name": "Adams", "phone_number": "555"},
+        {"first_name": "Rob", "last_name": "Adams", "phone_number": "555"},
+    ]
+
+    report = bulk.import_contacts(db_session, user.id, records, dedupe=True)
+
+    assert report["created"] == 1 and report["skipped"] == 2
+    assert [error["row"] for error in report["errors"]] == [1, 3]
+
+def test_import_contacts_forgets_the_keys_of_failed_chunks(db_session, user, monkeypatch):
+    bump = crud.bump_contacts_version
+    calls = []
+
+    def fail_first(db, user_id):
+        calls.append(user_id)
+        if len(calls) == 1:
+            raise OperationalError("INSERT", {}, Exception("database is locked"))
+        bump(db, user_id)
+
+    monkeypatch.setattr(crud, "bump_contacts_version", fail_first)
+    records = [
+        {"first_name": "Ann", "last_name": "Smith", "email": "ann@example.com", "phone_number": "555"},
+        {"first_name": "Ann", "last_name": "Smith", "email": "ann@example.com"},
+        {"first_name": "Bob", "last_name": "Adams", "phone_number": "555"},
+        {"first_name": "Cid", "last_name": "Jones"},
+        {"first_name": "Dan", "last_name": "Brown"},
+    ]
+
+    report = bulk.import_contacts(db_session, user.id, records, dedupe=True, chunk_size=1)
+
+    assert report["failed"] == 1 and report["created"] == 4 and report["skipped"] == 0
+    assert db_session.query(Contact).count() == 4
+
+def test_import_contacts_attaches_tags(db_session, user):
+    records = [
+        {"first_name": "Ann", "last_name": "Smith", "tags": ["work", "friends"]},
+        {"first_name": "Bob", "last_name": "Adams"},
+        {"first_name": "Cid", "last_name": "Jones", "tags": ["work"]},
+    ]
+
+    report = bulk.import_contacts(db_session, user.id, records)
+
+    assert report["created"] == 3
+    contacts = db_session.query(Contact).order_by(Contact.id).all()
+    assert [contact.tags for contact in contacts] == [["friends", "work"], [], ["work"]]
+
+def test_parse_file_reads_csv_and_ndjson():
+    csv_records = bulk.parse_file("contacts.csv", b"first_name,last_name,email\nAnn,Smith,\n")
+    ndjson_records = bulk.parse_file("contacts.ndjson", b'{"first_name": "Ann"}\nnot json\n')
+
+    assert csv_records == [{"first_name": "Ann", "last_name": "Smith", "email": None}]
+    assert bulk.parse_csv('first_name,tags\nAnn,"work,friends"\nBob,\n') == [
+        {"first_name": "Ann", "tags": ["work", "friends"]},
+        {"first_name": "Bob", "tags": []},
+    ]
+    assert ndjson_records == [{"first_name": "Ann"}, "not json"]
+
+def test_parse_file_rejects_unknown_extension():
+    with pytest.raises(ValueError):
+        bulk.parse_file("contacts.xlsx", b"")
+
+def test_bulk_route_imports_a_json_array(api, db_session):
+    records = [{"first_name": "Ann", "last_name": "Smith", "email": "ann@example.com"}, {"first_name": "Bob"}]
+
+    response = api.post("/contacts/bulk", json=records)
+
+    assert response.status_code == 200
+    assert response.json()["created"] == 1 and response.json()["failed"] == 1
+    assert db_session.query(Contact).count() == 1
+
+@pytest.mark.parametrize("filename, content", [
+    ("contacts.csv", b"first_name,last_name,phone_number\nAnn,Smith,555\nRob,Adams,555\n"),
+    ("contacts.ndjson", b'{"first_name": "Ann", "last_name": "Smith", "phone_number": "555"}\n'
+                        b'{"first_name": "Rob", "last_name": "Adams", "phone_number": "555"}\n'),
+])
+def test_bulk_route_imports_an_uploaded_file(api, db_session, filename, content):
+    response = api.post("/contacts/bulk?dedupe=true", files={"file": (filename, content)})
+
+    assert response.status_code == 200
+    assert response.json()["created"] == 1 and response.json()["skipped"] == 1
+    assert db_session.query(Contact).count() == 1
+
+def test_bulk_route_rejects_invalid_bodies(api):
+    assert api.post("/contacts/bulk", content=b"{not json").status_code == 400
+    assert api.post("/contacts/bulk", files={"other": ("a.csv", b"first_name\n")}).status_code == 400
+    assert api.post("/contacts/bulk", files={"file": ("a.xlsx", b"")}).status_code == 400
+
+def test_bulk_route_caps_the_body_size(api, db_session, monkeypatch):
+    monkeypatch.setattr(bulk, "MAX_BULK_BYTES", 1024)
+    records = [{"first_name": f"Ann{i}", "last_name": "Smith"} for i in range(100)]
+    body = json.dumps(records).encode()
+
+    assert api.post("/contacts/bulk", content=body).status_code == 413
+    # Without Content-Length the body is cut off while it streams in
+    assert api.post("/contacts/bulk", content=iter([body[:512], body[512:]])).status_code == 413
+    assert api.post("/contacts/bulk", files={"file": ("contacts.ndjson", body)}).status_code == 413
+    assert db_session.query(Contact).count() == 0
+
@@ -0,0 +1,83 @@
+import asyncio
+import fakeredis
+from redis.exceptions import ConnectionError
+from contacts_api.cache import TTLCache, TwoTierCache
+from contacts_api.schemas import UserCached
+
+USER = UserCached(id=1, username="owner", email="owner@example.com", is_verified=True)
+
+def make_cache(redis):
+    return TwoTierCache("user", UserCached, TTLCache(maxsize=10, ttl=60), ttl=3600, redis_factory=lambda: redis)
+
+def test_ttl_cache_evicts_least_recently_used_and_expired_entries():
+    cache = TTLCache(maxsize=2, ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+    cache.set("d", 4, ttl=0)
+
+    assert cache.get("b") is None
+    assert (cache.get("a"), cache.get("c"), cache.get("d")) == (1, 3, None)
+
+def test_two_tier_cache_shares_typed_values_through_redis():
+    async def scenario():
+        redis = fakeredis.FakeAsyncRedis()
+        writer, reader = make_cache(redis), make_cache(redis)
+
+        await writer.set(1, USER)
+        stored = await redis.get("user:1")
+        found = await reader.get(1)
+        await writer.invalidate(1)
+        reader.l1.clear()
+        return stored, found, await reader.get(1), reader.stats()
+
+    stored, found, after_invalidate, stats = asyncio.run(scenario())
+
+    assert UserCached.model_validate_json(stored) == USER
+    assert isinstance(found, UserCached) and found == USER
+    assert after_invalidate is None
+    assert stats["l2"]["hits"] == 1
+
+def test_two_tier_cache_fill_read_before_an_invalidation_is_not_stored():
+    stale = USER.model_copy(update={"is_verified": False})
+
+    async def scenario():
+        redis = fakeredis.FakeAsyncRedis()
+        writer, reader = make_cache(redis), make_cache(redis)
+        await reader.set(1, USER)
+        await writer.invalidate(1)
+        # A request that loaded the row before the change fills after its invalidation
+        await reader.set(1, stale)
+        other = make_cache(redis)
+        return await other.get(1), await redis.ttl("user:1")
+
+    found, ttl = asyncio.run(scenario())
+
+    assert found is None and 0 < ttl <= 10
+
+def test_two_tier_cache_degrades_to_l1_when_redis_fails():
+    class BrokenRedis:
+        async def get(self, key):
+            raise ConnectionError("down")
+
+        async def set(self, key, value, ex=None, nx=False):
+            raise ConnectionError("down")
+
+    async def scenario():
+        cache = make_cache(BrokenRedis())
+        await cache.set(1, USER)
+        return await cache.get(1), await cache.get(2), cache.stats()
+
+    found, missing, stats = asyncio.run(scenario())
+
+    assert found == USER and missing is None
+    assert stats["l2"]["errors"] == 1
+
+def test_two_tier_cache_without_redis_uses_l1_only():
+    async def scenario():
+        cache = make_cache(None)
+        await cache.set(1, USER)
+        return await cache.get(1)
+
+    assert asyncio.run(scenario()) == USER
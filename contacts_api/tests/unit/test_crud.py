@@ -0,0 +1,318 @@
+import re
+import pytest
+from pydantic import ValidationError
+from datetime import date, timedelta
+from sqlalchemy import event
+from contacts_api import crud
+from contacts_api.models import Contact, User, utcnow
+from contacts_api.pagination import CursorExpiredError, encode_cursor
+from contacts_api.schemas import ContactUpdate
+
+def add_contacts(db, user_id, names):
+    db.add_all(
+        Contact(first_name=first, last_name=last, email=f"{first}.{last}@example.com", user_id=user_id)
+        for first, last in names
+    )
+    db.commit()
+
+def test_get_contacts_page_walks_all_pages_in_name_order(db_session, user):
+    names = [("Ann", "Smith"), ("Bob", "Adams"), ("Cid", "Smith"), ("Dan", "Brown"), ("Eve", "Adams")]
+    add_contacts(db_session, user.id, names)
+
+    seen, cursor = [], None
+    while True:
+        items, cursor = crud.get_contacts_page(db_session, user.id, limit=2, cursor=cursor)
+        assert len(items) <= 2
+        seen.extend((item["first_name"], item["last_name"]) for item in items)
+        if cursor is None:
+            break
+
+    assert seen == sorted(names, key=lambda name: (name[1], name[0]))
+
+def test_get_contacts_page_walks_past_empty_names(db_session, user):
+    add_contacts(db_session, user.id, [("Ann", "Smith"), ("Bob", "Smith"), ("Cid", "Smith"), ("Dan", "Smith")])
+    crud.update_contact(db_session, user.id, 2, {"last_name": ""})
+
+    seen, cursor = [], None
+    while True:
+        items, cursor = crud.get_contacts_page(db_session, user.id, limit=1, cursor=cursor)
+        seen.extend(item["id"] for item in items)
+        if cursor is None:
+            break
+
+    assert seen == [2, 1, 3, 4]
+    with pytest.raises(ValidationError):
+        ContactUpdate(last_name=None)
+    assert ContactUpdate(email=None).model_fields_set == {"email"}
+
+def test_get_contacts_page_projects_requested_fields(db_session, user):
+    add_contacts(db_session, user.id, [("Ann", "Smith")])
+
+    items, cursor = crud.get_contacts_page(db_session, user.id, fields=["id", "email"])
+
+    assert cursor is None
+    assert set(items[0]) == {"id", "email"}
+    assert items[0]["email"] == "Ann.Smith@example.com"
+
+def test_get_contacts_page_is_scoped_to_user(db_session, user):
+    other = User(username="other", email="other@example.com", hashed_password="x")
+    db_session.add(other)
+    db_session.commit()
+    add_contacts(db_session, other.id, [("Ann", "Smith")])
+
+    items, cursor = crud.get_contacts_page(db_session, user.id)
+
+    assert items == [] and cursor is None
+
+@pytest.mark.parametrize("kwargs", [{"cursor": "not-a-cursor"}, {"fields": ["password"]}])
+def test_get_contacts_page_rejects_bad_input(db_session, user, kwargs):
+    with pytest.raises(ValueError):
+        crud.get_contacts_page(db_session, user.id, **kwargs)
+
+def test_stream_contacts_yields_row_batches_in_id_order(db_session, user):
+    add_contacts(db_session, user.id, [("Ann", "Smith"), ("Bob", "Adams"), ("Cid", "Jones")])
+
+    batches = list(crud.stream_contacts(db_session, user.id, ["id", "first_name"], batch_size=2))
+
+    assert [len(batch) for batch in batches] == [2, 1]
+    assert [row[1] for batch in batches for row in batch] == ["Ann", "Bob", "Cid"]
+    assert not any(isinstance(obj, Contact) for obj in db_session.identity_map.values())
+
+@pytest.fixture
+def today(monkeypatch):
+    class FrozenDate(date):
+        @classmethod
+        def today(cls):
+            return cls(2026, 12, 28)
+
+    monkeypatch.setattr(crud, "date", FrozenDate)
+    return FrozenDate.today()
+
+def add_birthdays(db, user_id, birthdays):
+    db.add_all(
+        Contact(first_name=name, last_name="Doe", birthday=birthday, user_id=user_id)
+        for name, birthday in birthdays
+    )
+    db.commit()
+
+def test_get_upcoming_birthdays_ignores_year_and_wraps_around_new_year(db_session, user, today):
+    add_birthdays(db_session, user.id, [
+        ("Jan", date(1990, 1, 2)),
+        ("Dec", date(1985, 12, 30)),
+        ("Feb", date(2000, 2, 29)),
+        ("Nov", date(1970, 11, 30)),
+    ])
+
+    upcoming = crud.get_upcoming_birthdays(db_session, user.id)
+
+    assert [contact.first_name for contact in upcoming] == ["Dec", "Jan"]
+
+def test_get_upcoming_birthdays_window_is_configurable(db_session, user, today):
+    add_birthdays(db_session, user.id, [("Feb", date(2000, 2, 29)), ("Nov", date(1970, 11, 30))])
+
+    assert [c.first_name for c in crud.get_upcoming_birthdays(db_session, user.id, days=70)] == ["Feb"]
+    assert len(crud.get_upcoming_birthdays(db_session, user.id, days=365)) == 2
+
+def test_upcoming_birthday_rows_match_the_orm_query(db_session, user, today):
+    add_birthdays(db_session, user.id, [("Jan", date(1990, 1, 2)), ("Dec", date(1985, 12, 30)), ("Nov", date(1970, 11, 30))])
+
+    rows = crud.get_upcoming_birthday_rows(db_session, user.id, days=60, fields=["first_name", "birthday"])
+
+    assert rows == [(c.first_name, c.birthday) for c in crud.get_upcoming_birthdays(db_session, user.id, days=60)]
+    assert [row[0] for row in rows] == ["Dec", "Jan"]
+
+def test_birthday_md_follows_birthday_updates(db_session, user):
+    add_birthdays(db_session, user.id, [("Ann", date(1990, 1, 2))])
+    contact = db_session.query(Contact).one()
+
+    contact.birthday = date(1990, 7, 15)
+    db_session.commit()
+
+    assert contact.birthday_md == 715
+
+def contact_data(first, last):
+    return {"first_name": first, "last_name": last, "email": None, "phone_number": None,
+            "birthday": None, "extra_data": None}
+
+def test_delete_contact_leaves_a_tombstone(db_session, user):
+    contact = crud.create_contact(db_session, user.id, contact_data("Ann", "Smith"))
+
+    assert crud.delete_contact(db_session, user.id, contact.id) is not None
+
+    assert crud.get_contact_by_id(db_session, user.id, contact.id) is None
+    assert crud.get_contacts_page(db_session, user.id)[0] == []
+    assert crud.delete_contact(db_session, user.id, contact.id) is None
+    assert db_session.get(Contact, contact.id).deleted_at is not None
+
+def test_get_contact_changes_returns_only_changes_since_cursor(db_session, user):
+    ann = crud.create_contact(db_session, user.id, contact_data("Ann", "Smith"))
+    bob = crud.create_contact(db_session, user.id, contact_data("Bob", "Adams"))
+    crud.delete_contact(db_session, user.id, crud.create_contact(db_session, user.id, contact_data("Cid", "Jones")).id)
+
+    items, cursor, has_more = crud.get_contact_changes(db_session, user.id)
+    assert [item["first_name"] for item in items] == ["Ann", "Bob"]
+    assert not has_more
+
+    assert crud.get_contact_changes(db_session, user.id, since=cursor)[0] == []
+
+    crud.update_contact(db_session, user.id, ann.id, {"first_name": "Anna"})
+    crud.delete_contact(db_session, user.id, bob.id)
+    items, next_cursor, _ = crud.get_contact_changes(db_session, user.id, since=cursor)
+
+    assert [(item["id"], item["deleted_at"] is not None) for item in items] == [(ann.id, False), (bob.id, True)]
+    assert items[0]["first_name"] == "Anna"
+    assert set(items[1]) == {"id", "updated_at", "deleted_at"}
+    assert crud.get_contact_changes(db_session, user.id, since=next_cursor) == ([], next_cursor, False)
+
+def test_get_contact_changes_pages(db_session, user):
+    for i in range(5):
+        crud.create_contact(db_session, user.id, contact_data(f"C{i}", "X"))
+
+    seen, cursor, has_more = [], None, True
+    while has_more:
+        items, cursor, has_more = crud.get_contact_changes(db_session, user.id, since=cursor, limit=2)
+        seen.extend(item["first_name"] for item in items)
+
+    assert seen == [f"C{i}" for i in range(5)]
+
+def age_contacts(db, days, **filters):
+    """Moves the matching contacts' timestamps `days` into the past."""
+    for contact in db.query(Contact).filter_by(**filters):
+        contact.updated_at -= timedelta(days=days)
+        if contact.deleted_at is not None:
+            contact.deleted_at = contact.updated_at
+    db.commit()
+
+def test_get_contact_changes_expires_cursors_behind_a_purge(db_session, user):
+    ann = crud.create_contact(db_session, user.id, contact_data("Ann", "Smith"))
+    age_contacts(db_session, 50)
+    _, cursor, _ = crud.get_contact_changes(db_session, user.id)
+    crud.delete_contact(db_session, user.id, crud.create_contact(db_session, user.id, contact_data("Bob", "Adams")).id)
+    age_contacts(db_session, 40, first_name="Bob")
+
+    assert crud.purge_deleted_contacts(db_session, utcnow() - timedelta(days=30)) == 1
+
+    with pytest.raises(CursorExpiredError):
+        crud.get_contact_changes(db_session, user.id, since=cursor)
+    crud.update_contact(db_session, user.id, ann.id, {"first_name": "Anna"})
+    with pytest.raises(CursorExpiredError):
+        crud.get_contact_changes(db_session, user.id, since=cursor)
+    with pytest.raises(CursorExpiredError):
+        crud.get_contact_changes(db_session, user.id, since=encode_cursor([(utcnow() - timedelta(days=365)).isoformat(), 1]))
+    with pytest.raises(ValueError):
+        crud.get_contact_changes(db_session, user.id, since=encode_cursor(["yesterday", 1, None]))
+
+def test_get_contact_changes_cursors_outlive_purges_they_are_not_behind(db_session, user):
+    for name in ("Ann", "Bob", "Cid"):
+        crud.create_contact(db_session, user.id, contact_data(name, "Smith"))
+    age_contacts(db_session, 365)
+    crud.delete_contact(db_session, user.id, crud.create_contact(db_session, user.id, contact_data("Dan", "Smith")).id)
+    age_contacts(db_session, 40, first_name="Dan")
+    crud.purge_deleted_contacts(db_session, utcnow() - timedelta(days=30))
+
+    seen, cursor, has_more = [], None, True
+    while has_more:
+        items, cursor, has_more = crud.get_contact_changes(db_session, user.id, since=cursor, limit=1)
+        seen.extend(item["first_name"] for item in items)
+    crud.purge_deleted_contacts(db_session, utcnow())
+
+    assert seen == ["Ann", "Bob", "Cid"]
+    assert crud.get_contact_changes(db_session, user.id, since=cursor) == ([], cursor, False)
+
+def test_purge_deleted_contacts(db_session, user):
+    contact = crud.create_contact(db_session, user.id, contact_data("Ann", "Smith"))
+    crud.delete_contact(db_session, user.id, contact.id)
+    deleted = db_session.get(Contact, contact.id).updated_at
+    version = crud.get_contacts_version(db_session, user.id)
+
+    assert crud.purge_deleted_contacts(db_session, utcnow() + timedelta(seconds=1)) == 1
+    assert db_session.query(Contact).count() == 0
+    db_session.refresh(user)
+    assert user.contacts_purged_until == deleted
+    assert crud.get_contacts_version(db_session, user.id) == version + 1
+    assert crud.purge_deleted_contacts(db_session, utcnow()) == 0
+    assert crud.get_contacts_version(db_session, user.id) == version + 1
+
+@pytest.mark.parametrize("write", [
+    lambda db, user_id, contact_id: crud.create_contact(db, user_id, contact_data("Bob", "Adams")),
+    lambda db, user_id, contact_id: crud.update_contact(db, user_id, contact_id, {"first_name": "Augusta"}),
+    lambda db, user_id, contact_id: crud.delete_contact(db, user_id, contact_id),
+])
+def test_contact_writes_bump_the_version_before_writing_the_contact(db_session, user, write):
+    contact = crud.create_contact(db_session, user.id, contact_data("Ann", "Smith"))
+    statements = []
+    listener = lambda *args: statements.append(args[2])
+    event.listen(db_session.get_bind(), "before_cursor_execute", listener)
+    try:
+        write(db_session, user.id, contact.id)
+    finally:
+        event.remove(db_session.get_bind(), "before_cursor_execute", listener)
+
+    tables = [re.match(r"(?:INSERT INTO|UPDATE) (\w+)", statement).group(1)
+              for statement in statements if not statement.startswith("SELECT")]
+    assert tables == ["users", "contacts"]
+
+def test_contact_tags_are_set_replaced_and_filtered_on(db_session, user):
+    ann = crud.create_contact(db_session, user.id, {**contact_data("Ann", "Smith"), "tags": ["work", "friends"]})
+    bob = crud.create_contact(db_session, user.id, {**contact_data("Bob", "Adams"), "tags": ["work"]})
+    crud.create_contact(db_session, user.id, contact_data("Cid", "Jones"))
+
+    assert ann.tags == ["friends", "work"]
+    assert [item["first_name"] for item in crud.get_contacts_page(db_session, user.id, tags=["work"])[0]] == ["Bob", "Ann"]
+    assert [item["first_name"] for item in crud.get_contacts_page(db_session, user.id, tags=["work", "friends"])[0]] == ["Ann"]
+
+    crud.update_contact(db_session, user.id, bob.id, {"tags": ["family"]})
+    assert crud.get_contact_by_id(db_session, user.id, bob.id).tags == ["family"]
+    assert crud.get_contacts_page(db_session, user.id, tags=["family"], fields=["id", "tags"])[0] == [
+        {"id": bob.id, "tags": ["family"]}
+    ]
+
+def test_tags_are_scoped_to_their_user(db_session, user):
+    other = User(username="other", email="other@example.com", hashed_password="x")
+    db_session.add(other)
+    db_session.commit()
+    crud.create_contact(db_session, other.id, {**contact_data("Ann", "Smith"), "tags": ["work"]})
+    crud.create_contact(db_session, user.id, {**contact_data("Bob", "Adams"), "tags": ["work"]})
+
+    assert [item["first_name"] for item in crud.get_contacts_page(db_session, user.id, tags=["work"])[0]] == ["Bob"]
+    assert crud.get_contact_facets(db_session, user.id)["tags"] == [{"value": "work", "count": 1}]
+
+def test_get_contact_facets_counts_live_contacts(db_session, user):
+    rows = [
+        ("Ann", "Ann@Example.com", date(1990, 3, 1), ["work", "friends"]),
+        ("Bob", "bob@example.com", date(1985, 3, 20), ["work"]),
+        ("Cid", "cid@other.org", date(2000, 12, 5), []),
+        ("Dan", None, None, ["work"]),
+    ]
+    for first, email, birthday, tags in rows:
+        crud.create_contact(db_session, user.id, {**contact_data(first, "X"), "email": email, "birthday": birthday, "tags": tags})
+    crud.delete_contact(db_session, user.id, crud.get_contacts_page(db_session, user.id, tags=["work"])[0][-1]["id"])
+
+    facets = crud.get_contact_facets(db_session, user.id)
+
+    assert facets == {
+        "tags": [{"value": "work", "count": 2}, {"value": "friends", "count": 1}],
+        "birthday_months": [{"value": 3, "count": 2}, {"value": 12, "count": 1}],
+        "email_domains": [{"value": "example.com", "count": 2}, {"value": "other.org", "count": 1}],
+    }
+
+def test_batch_patch_replaces_tags(db_session, user):
+    ann = crud.create_contact(db_session, user.id, {**contact_data("Ann", "Smith"), "tags": ["old"]})
+    bob = crud.create_contact(db_session, user.id, contact_data("Bob", "Adams"))
+
+    results = crud.batch_contacts(db_session, user.id, [
+        {"op": "patch", "id": ann.id, "data": {"tags": ["a", "b"]}},
+        {"op": "patch", "id": bob.id, "data": {"first_name": "Robert", "tags": None}},
+    ])
+
+    assert [result["contact"]["tags"] for result in results] == [["a", "b"], []]
+    assert results[1]["contact"]["first_name"] == "Robert"
+    assert crud.get_contact_facets(db_session, user.id)["tags"] == [{"value": "a", "count": 1}, {"value": "b", "count": 1}]
+
+def test_purge_deleted_contacts_drops_their_tags(db_session, user):
+    contact_id = crud.create_contact(db_session, user.id, {**contact_data("Ann", "Smith"), "tags": ["work"]}).id
+    crud.delete_contact(db_session, user.id, contact_id)
+
+    crud.purge_deleted_contacts(db_session, utcnow() + timedelta(seconds=1))
+
+    assert crud.get_contact_tags(db_session, [contact_id]) == {}
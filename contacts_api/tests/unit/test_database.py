@@ -0,0 +1,44 @@
+import asyncio
+from sqlalchemy import text
+from contacts_api import database
+
+def test_create_db_engine_applies_sqlite_production_profile(tmp_path):
+    engine = database.create_db_engine(f"sqlite:///{tmp_path / 'app.db'}")
+
+    with engine.connect() as conn:
+        journal_mode = conn.execute(text("PRAGMA journal_mode")).scalar()
+        synchronous = conn.execute(text("PRAGMA synchronous")).scalar()
+        busy_timeout = conn.execute(text("PRAGMA busy_timeout")).scalar()
+        status = database.pool_status(engine)
+
+    assert journal_mode == "wal"
+    assert synchronous == 1  # NORMAL
+    assert busy_timeout == database.settings.SQLITE_BUSY_TIMEOUT_MS
+    assert status["checkedout"] == 1 and status["in_use"] == 1
+    assert database.pool_status(engine)["peak_in_use"] == 1
+    engine.dispose()
+
+def test_engine_options_sets_postgres_pool_and_statement_timeout(monkeypatch):
+    monkeypatch.setattr(database.settings, "DB_STATEMENT_TIMEOUT_MS", 5000)
+
+    sync = database.engine_options("postgresql://user:pass@db/contacts_api")
+    asyncpg = database.engine_options("postgresql+asyncpg://user:pass@db/contacts_api")
+
+    assert sync["pool_size"] == database.settings.DB_POOL_SIZE
+    assert sync["pool_pre_ping"] is database.settings.DB_POOL_PRE_PING
+    assert sync["connect_args"] == {"options": "-c statement_timeout=5000"}
+    assert asyncpg["connect_args"] == {"server_settings": {"statement_timeout": "5000"}}
+
+def test_create_async_db_engine_pools_file_sqlite(tmp_path):
+    async_engine = database.create_async_db_engine(f"sqlite+aiosqlite:///{tmp_path / 'app.db'}")
+
+    async def ping():
+        async with async_engine.connect() as conn:
+            return (await conn.execute(text("PRAGMA journal_mode"))).scalar()
+
+    try:
+        assert asyncio.run(ping()) == "wal"
+        status = database.pool_status(async_engine.sync_engine)
+        assert status["pool"] == "AsyncAdaptedQueuePool" and status["size"] == database.settings.DB_POOL_SIZE
+    finally:
+        asyncio.run(async_engine.dispose())
@@ -0,0 +1,29 @@
+import csv
+import io
+import json
+import pytest
+from contacts_api import export
+from contacts_api.models import Contact
+
+@pytest.fixture
+def owner_id(db_session, user, monkeypatch):
+    monkeypatch.setattr(export, "SessionLocal", lambda: db_session)
+    db_session.add_all(
+        Contact(first_name=f"Name{i}", last_name="Smith", user_id=user.id) for i in range(5)
+    )
+    db_session.commit()
+    return user.id
+
+def test_export_ndjson_emits_one_object_per_line(owner_id):
+    chunks = list(export.export_contacts(owner_id, "ndjson", batch_size=2))
+
+    lines = "".join(chunks).splitlines()
+    assert len(chunks) == 3
+    assert [json.loads(line)["first_name"] for line in lines] == [f"Name{i}" for i in range(5)]
+
+def test_export_csv_starts_with_header(owner_id):
+    body = "".join(export.export_contacts(owner_id, "csv", batch_size=2))
+
+    rows = list(csv.reader(io.StringIO(body)))
+    assert rows[0] == export.EXPORT_FIELDS
+    assert len(rows) == 6
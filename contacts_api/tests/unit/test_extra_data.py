@@ -0,0 +1,125 @@
+import sqlite3
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import Session
+from contacts_api import crud, extra_data, models, search
+from contacts_api.models import Contact
+
+@pytest.mark.parametrize("value,expected", [
+    ('{"company": "Acme"}', {"company": "Acme"}),
+    ("company=Initech; title: CTO", {"company": "Initech", "title": "CTO"}),
+    ("likes cats, dogs", {"note": "likes cats, dogs"}),
+    ("[1, 2]", {"note": "[1, 2]"}),
+    ("   ", None),
+    ({"age": 30}, {"age": 30}),
+    (None, None),
+])
+def test_parse_legacy(value, expected):
+    assert extra_data.parse_legacy(value) == expected
+
+def test_parse_filters_reads_json_literals():
+    params = [("limit", "10"), ("extra.company", "Acme"), ("extra.age", "30"), ("extra.vip", "true"),
+              ("extra.code", '"007"'), ("extra.fax", "null")]
+
+    assert extra_data.parse_filters(params) == [
+        ("company", "Acme"), ("age", 30), ("vip", True), ("code", "007"), ("fax", None)
+    ]
+    with pytest.raises(ValueError):
+        extra_data.parse_filters([("extra.a'b", "1")])
+
+def test_get_contacts_page_filters_on_extra_data(db_session, user):
+    rows = [("Ann", {"company": "Acme", "age": 30}), ("Bob", {"company": "Acme", "age": 41}),
+            ("Cid", {"company": "Initech", "vip": True}), ("Dan", None)]
+    for first, extra in rows:
+        crud.create_contact(db_session, user.id, {"first_name": first, "last_name": "X", "extra_data": extra})
+
+    def names(filters):
+        return [item["first_name"] for item in crud.get_contacts_page(db_session, user.id, extra=filters)[0]]
+
+    assert names([("company", "Acme")]) == ["Ann", "Bob"]
+    assert names([("company", "Acme"), ("age", 41)]) == ["Bob"]
+    assert names([("vip", True)]) == ["Cid"]
+    assert names([("company", None)]) == ["Dan"]
+
+def test_search_filters_on_extra_data(db_session, user):
+    search.ensure_search_index(db_session.get_bind())
+    for company in ("Acme", "Initech"):
+        crud.create_contact(db_session, user.id, {"first_name": "Ann", "last_name": company, "extra_data": {"company": company}})
+
+    contacts = crud.search_contacts(db_session, user.id, "ann", extra=[("company", "Initech")])
+
+    assert [contact.last_name for contact in contacts] == ["Initech"]
+
+def test_declared_keys_get_an_expression_index_used_by_filters(db_session, user):
+    engine = db_session.get_bind()
+    extra_data.ensure_extra_data_indexes(engine, ["company"])
+    query = db_session.query(Contact.id).filter(
+        Contact.user_id == user.id, *extra_data.filter_conditions("sqlite", [("company", "Acme")])
+    )
+
+    sql = f"EXPLAIN QUERY PLAN {query.statement.compile(engine)}"
+    plan = db_session.connection().exec_driver_sql(sql, (user.id, "Acme")).all()
+
+    assert "ix_contacts_extra_company" in str(plan)
+    assert extra_data.index_ddl("postgresql", ["company", "title"]) == [
+        "CREATE INDEX IF NOT EXISTS ix_contacts_extra_data ON contacts USING GIN (extra_data jsonb_path_ops)"
+    ]
+
+def test_migrate_extra_data_converts_legacy_strings_once(tmp_path):
+    path = tmp_path / "contacts.db"
+    engine = create_engine(f"sqlite:///{path}")
+    models.Base.metadata.create_all(engine)
+    with sqlite3.connect(path) as conn:
+        conn.executemany(
+            "INSERT INTO contacts (first_name, last_name, user_id, updated_at, extra_data) VALUES ('A', 'B', 1, '2024-01-01', ?)",
+            [('{"company": "Acme"}',), ("company=Initech",), ("call after 6pm",), ("",)],
+        )
+
+    assert extra_data.migrate_extra_data(engine, batch_size=2)["converted"] == 3
+    assert extra_data.migrate_extra_data(engine)["converted"] == 0
+    with engine.connect() as conn:
+        stored = conn.execute(text("SELECT extra_data FROM contacts ORDER BY id")).scalars().all()
+    engine.dispose()
+
+    assert stored == ['{"company": "Acme"}', '{"company": "Initech"}', '{"note": "call after 6pm"}', None]
+
+def test_unconverted_legacy_strings_are_read_converted(tmp_path):
+    path = tmp_path / "contacts.db"
+    engine = create_engine(f"sqlite:///{path}")
+    models.Base.metadata.create_all(engine)
+    with sqlite3.connect(path) as conn:
+        conn.execute("INSERT INTO users (id, username, email, hashed_password) VALUES (1, 'owner', 'o@example.com', 'x')")
+        conn.executemany(
+            "INSERT INTO contacts (first_name, last_name, user_id, updated_at, extra_data) VALUES ('A', 'B', 1, '2024-01-01', ?)",
+            [("company=Initech",), ("{call after 6pm}",), ('{"vip": true}',)],
+        )
+
+    with Session(engine) as db:
+        items, _ = crud.get_contacts_page(db, 1)
+        contact = db.get(Contact, 1)
+    engine.dispose()
+
+    assert [item["extra_data"] for item in items] == [{"company": "Initech"}, {"note": "{call after 6pm}"}, {"vip": True}]
+    assert contact.extra_data == {"company": "Initech"}
+
+def test_migrate_extra_data_reset_only_visits_unconverted_rows(tmp_path):
+    path = tmp_path / "contacts.db"
+    engine = create_engine(f"sqlite:///{path}")
+    models.Base.metadata.create_all(engine)
+    with sqlite3.connect(path) as conn:
+        conn.executemany(
+            "INSERT INTO contacts (first_name, last_name, user_id, updated_at, extra_data) VALUES ('A', 'B', 1, '2024-01-01', ?)",
+            [('{"company": "Acme"}',), ("company=Initech",), ('["not", "an", "object"]',)],
+        )
+    extra_data.migrate_extra_data(engine)
+    with sqlite3.connect(path) as conn:
+        # Written by an older version behind the checkpoint
+        conn.execute("UPDATE contacts SET extra_data = '{company: Globex}' WHERE id = 1")
+
+    report = extra_data.migrate_extra_data(engine, reset=True)
+    with engine.connect() as conn:
+        stored = conn.execute(text("SELECT extra_data FROM contacts ORDER BY id")).scalars().all()
+    engine.dispose()
+
+    assert (report["scanned"], report["converted"]) == (1, 1)
+    assert stored == ['{"note": "{company: Globex}"}', '{"company": "Initech"}', '{"note": "[\\"not\\", \\"an\\", \\"object\\"]"}']
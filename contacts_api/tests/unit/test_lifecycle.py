@@ -0,0 +1,131 @@
+import asyncio
+import signal
+import time
+from datetime import timedelta
+import pytest
+import uvicorn
+from fastapi.testclient import TestClient
+from sqlalchemy import event, inspect, text
+from sqlalchemy.engine import default
+from sqlalchemy.orm import Session
+from contacts_api import auth_cache, crud, lifecycle
+from contacts_api.database import create_db_engine, pool_status
+from contacts_api.models import Contact, User, utcnow
+from contacts_api.server import DrainingServer
+
+@pytest.fixture
+def file_engine(tmp_path):
+    engine = create_db_engine(f"sqlite:///{tmp_path / 'contacts.db'}")
+    lifecycle.setup_database(engine)
+    try:
+        yield engine
+    finally:
+        engine.dispose()
+
+def test_warm_pool_opens_connections_up_to_pool_size(file_engine):
+    assert lifecycle.warm_pool(file_engine, 3) == 3
+    assert pool_status(file_engine)["checkedin"] == 3
+    assert lifecycle.warm_pool(file_engine, 50) == pool_status(file_engine)["size"]
+
+def test_precompiled_statements_are_cache_hits(file_engine):
+    cache_hits = []
+    with Session(file_engine) as db:
+        asyncio.run(lifecycle.precompile_statements(db))
+        event.listen(file_engine, "before_cursor_execute",
+                     lambda conn, cursor, statement, params, context, many: cache_hits.append(context.cache_hit))
+        crud.get_contacts_page(db, 42, limit=50)
+        crud.get_user_by_id(db, 42)
+
+    assert cache_hits == [default.CACHE_HIT, default.CACHE_HIT]
+
+def test_prime_caches_loads_the_most_active_users(db_session):
+    auth_cache.user_cache.l1.clear()
+    db_session.add_all([
+        User(username=f"user{n}", email=f"user{n}@example.com", hashed_password="x", contacts_version=n)
+        for n in range(5)
+    ])
+    db_session.commit()
+
+    assert asyncio.run(lifecycle.prime_caches(db_session, 2)) == 2
+    cached = [user.username for user in (auth_cache.user_cache.l1.get(n) for n in range(1, 6)) if user]
+    assert sorted(cached) == ["user3", "user4"]
+    auth_cache.user_cache.l1.clear()
+
+def test_warm_up_reports_failed_steps_and_continues(file_engine, monkeypatch):
+    async def broken(db, users):
+        raise RuntimeError("redis down")
+
+    monkeypatch.setattr(lifecycle, "prime_caches", broken)
+    report = asyncio.run(lifecycle.warm_up(file_engine))
+
+    assert report["caches"]["error"] == "redis down"
+    assert report["statements"]["result"] == len(lifecycle.WARMUP_QUERIES)
+    assert "ms" in report["passwords"]
+
+def test_setup_database_leaves_alembic_managed_schemas_alone(tmp_path):
+    engine = create_db_engine(f"sqlite:///{tmp_path / 'contacts.db'}")
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE alembic_version (version_num VARCHAR(32) NOT NULL)"))
+    Contact.__table__.create(engine)
+
+    lifecycle.setup_database(engine)
+
+    tables = inspect(engine).get_table_names()
+    engine.dispose()
+    assert "users" not in tables and "contacts_fts" in tables
+
+def test_purge_tombstones_keeps_recent_ones(file_engine):
+    now = utcnow()
+    with Session(file_engine) as db:
+        db.add(User(id=1, username="owner", email="owner@example.com", hashed_password="x"))
+        db.add_all([
+            Contact(first_name="Old", last_name="X", user_id=1, updated_at=now - timedelta(days=40), deleted_at=now - timedelta(days=40)),
+            Contact(first_name="New", last_name="X", user_id=1, updated_at=now, deleted_at=now),
+        ])
+        db.commit()
+
+    assert lifecycle.purge_tombstones(file_engine) == 1
+
+    with Session(file_engine) as db:
+        assert db.query(Contact.first_name).scalar() == "New"
+        assert db.get(User, 1).contacts_purged_until == now - timedelta(days=40)
+
+@pytest.fixture
+def health_client(monkeypatch):
+    from contacts_api import main
+
+    monkeypatch.setattr(lifecycle, "state", lifecycle.ServerState())
+    return TestClient(main.app)
+
+def test_readiness_follows_the_lifecycle(health_client):
+    assert health_client.get("/health/ready").status_code == 503
+
+    lifecycle.state.phase = "ready"
+    ready = health_client.get("/health/ready")
+    assert ready.status_code == 200
+    assert ready.json()["database"]["ok"] is True
+    assert "pool" in ready.json()["database"] and "stats" in ready.json()["caches"]
+
+    lifecycle.state.drain()
+    assert health_client.get("/health/ready").json()["phase"] == "draining"
+    assert health_client.get("/health/ready").status_code == 503
+    assert health_client.get("/health/live").status_code == 200
+
+def test_sigterm_drains_before_exiting(monkeypatch):
+    monkeypatch.setattr(lifecycle, "state", lifecycle.ServerState())
+    lifecycle.state.phase = "ready"
+    server = DrainingServer(uvicorn.Config("contacts_api.main:app"), drain_delay=0.05)
+    server.started = True
+
+    server.handle_exit(signal.SIGTERM, None)
+    assert lifecycle.state.phase == "draining" and not server.should_exit
+    time.sleep(0.06)
+    assert asyncio.run(server.on_tick(1)) is True
+
+def test_second_signal_exits_at_once():
+    server = DrainingServer(uvicorn.Config("contacts_api.main:app"), drain_delay=30)
+    server.started = True
+
+    server.handle_exit(signal.SIGTERM, None)
+    server.handle_exit(signal.SIGTERM, None)
+    assert server.should_exit
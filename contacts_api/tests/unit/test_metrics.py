@@ -0,0 +1,111 @@
+import threading
+import pytest
+from contacts_api import metrics
+from contacts_api.config import Settings
+
+@pytest.fixture
+def api(api, db_session, monkeypatch):
+    monkeypatch.setattr(metrics.settings, "METRICS_ENABLED", True)
+    metrics.instrument_engine(db_session.get_bind())
+    return api
+
+def test_counter_sums_thread_shards():
+    counter = metrics.Counter("test_shards_total", "Test counter.", ("kind",))
+    threads = [threading.Thread(target=lambda: [counter.inc(("a",)) for _ in range(1000)]) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert counter.values() == {("a",): 4000}
+    assert len(counter._shards) == 4
+    assert counter.collect() == ['test_shards_total{kind="a"} 4000']
+
+def test_histogram_buckets_are_cumulative():
+    histogram = metrics.Histogram("test_latency_seconds", "Test histogram.", ("route",), buckets=(0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 3.0):
+        histogram.observe(("/x",), value)
+
+    assert histogram.collect() == [
+        'test_latency_seconds_bucket{route="/x",le="0.1"} 2',
+        'test_latency_seconds_bucket{route="/x",le="1"} 3',
+        'test_latency_seconds_bucket{route="/x",le="+Inf"} 4',
+        'test_latency_seconds_sum{route="/x"} 3.65',
+        'test_latency_seconds_count{route="/x"} 4',
+    ]
+
+def test_label_values_are_escaped():
+    counter = metrics.Counter("test_escape_total", "Test counter.", ("path",))
+    counter.inc(('a"b\\c',))
+
+    assert counter.collect() == ['test_escape_total{path="a\\"b\\\\c"} 1']
+
+def test_requests_are_labelled_by_route(api):
+    before = metrics.http_requests.values().get(("GET", "/contacts/{contact_id}", "404"), 0)
+
+    response = api.get("/contacts/12345")
+
+    assert response.status_code == 404
+    assert metrics.http_requests.values()[("GET", "/contacts/{contact_id}", "404")] == before + 1
+    assert "db;dur=" in response.headers["server-timing"]
+
+def test_unknown_paths_share_one_series(api):
+    api.get("/no/such/path/1")
+    api.get("/no/such/path/2")
+
+    routes = {labels[1] for labels in metrics.http_requests.values()}
+    assert metrics.UNMATCHED_ROUTE in routes
+    assert not any(route.startswith("/no/such") for route in routes)
+
+def test_queries_are_counted_per_request(api):
+    _, before = metrics.http_request_queries.values().get(("GET", "/contacts/"), ([0], 0))
+
+    api.get("/contacts/")
+
+    counts, total = metrics.http_request_queries.values()[("GET", "/contacts/")]
+    assert total - before >= 2
+
+def test_metrics_endpoint(api):
+    api.get("/contacts/")
+
+    response = api.get("/metrics")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    body = response.text
+    assert "# TYPE http_request_duration_seconds histogram" in body
+    assert 'http_requests_in_flight{method="GET"} 1' in body
+    assert 'cache_hits_total{cache="users",tier="l1"}' in body
+    assert "password_hash_queue_depth 0" in body
+    assert 'db_pool_checked_out{engine="sync"}' in body
+    assert 'email_outbox_messages{status="dead"} 0' in body
+
+def test_metrics_reuse_the_outbox_counts(api, db_session):
+    from contacts_api import outbox
+    outbox._stats_cache.clear()
+    api.get("/metrics")
+    outbox.enqueue_email(db_session, "ann@example.com", "Hi", "Hello")
+    db_session.commit()
+
+    body = api.get("/metrics").text
+
+    assert 'email_outbox_messages{status="pending"} 0' in body
+    outbox._stats_cache.clear()
+    assert 'email_outbox_messages{status="pending"} 1' in api.get("/metrics").text
+
+def test_metrics_are_off_by_default(api, monkeypatch):
+    assert Settings.model_fields["METRICS_ENABLED"].default is False
+    monkeypatch.setattr(metrics.settings, "METRICS_ENABLED", False)
+    before = metrics.http_requests.values()
+
+    assert api.get("/metrics").status_code == 404
+    assert "server-timing" not in api.get("/contacts/").headers
+    assert metrics.http_requests.values() == before
+
+def test_metric_types_must_collect():
+    class Untyped(metrics._Metric):
+        pass
+
+    with pytest.raises(TypeError):
+        Untyped("test_untyped", "Test metric.")
+
@@ -0,0 +1,97 @@
+import sqlite3
+from pathlib import Path
+import pytest
+from alembic import command
+from alembic.config import Config
+from sqlalchemy import create_engine, inspect, text
+from contacts_api import lifecycle
+
+MIGRATIONS = Path(__file__).resolve().parents[2] / "migrations"
+
+# The schema of the first release, before any migration
+BASELINE_DDL = """
+CREATE TABLE users (
+    id INTEGER NOT NULL PRIMARY KEY, username VARCHAR NOT NULL, email VARCHAR NOT NULL,
+    hashed_password VARCHAR NOT NULL, is_verified BOOLEAN, avatar_url VARCHAR
+);
+CREATE INDEX ix_users_id ON users (id);
+CREATE UNIQUE INDEX ix_users_username ON users (username);
+CREATE UNIQUE INDEX ix_users_email ON users (email);
+CREATE TABLE contacts (
+    id INTEGER NOT NULL PRIMARY KEY, first_name VARCHAR, last_name VARCHAR, phone_number VARCHAR,
+    birthday DATE, extra_data VARCHAR, user_id INTEGER REFERENCES users (id)
+);
+CREATE INDEX ix_contacts_id ON contacts (id);
+CREATE INDEX ix_contacts_first_name ON contacts (first_name);
+CREATE INDEX ix_contacts_last_name ON contacts (last_name);
+INSERT INTO users VALUES (1, 'owner', 'owner@example.com', 'x', 1, NULL);
+"""
+
+def alembic_config(path) -> Config:
+    config = Config()
+    config.set_main_option("script_location", str(MIGRATIONS))
+    config.set_main_option("sqlalchemy.url", f"sqlite:///{path}")
+    return config
+
+def test_upgrade_creates_the_models_schema(tmp_path):
+    config = alembic_config(tmp_path / "contacts.db")
+
+    command.upgrade(config, "head")
+
+    command.check(config)
+
+def test_upgrade_migrates_a_baseline_database_with_backfills(tmp_path):
+    path = tmp_path / "contacts.db"
+    with sqlite3.connect(path) as conn:
+        conn.executescript(BASELINE_DDL)
+        conn.executemany(
+            "INSERT INTO contacts (first_name, last_name, birthday, extra_data, user_id) VALUES (?, 'Smith', ?, ?, 1)",
+            [("Ann", "1990-12-31", "company=Acme"), ("Bob", None, None), ("Cid", "1985-02-03", '{"vip": true}')],
+        )
+        conn.execute("INSERT INTO contacts (first_name, user_id) VALUES ('Dee', 1)")
+    config = alembic_config(path)
+
+    command.upgrade(config, "head")
+
+    command.check(config)
+    engine = create_engine(f"sqlite:///{path}")
+    try:
+        with engine.connect() as conn:
+            rows = conn.execute(text("SELECT birthday_md, extra_data, updated_at, last_name FROM contacts ORDER BY id")).all()
+            matches = conn.execute(text("SELECT rowid FROM contacts_fts WHERE contacts_fts MATCH 'cid'")).scalars().all()
+            triggers = conn.execute(text("SELECT name FROM sqlite_master WHERE type = 'trigger'")).scalars().all()
+        columns = {column["name"]: column for column in inspect(engine).get_columns("contacts")}
+    finally:
+        engine.dispose()
+    assert [(row.birthday_md, row.extra_data) for row in rows] == [
+        (1231, '{"company": "Acme"}'), (None, None), (203, '{"vip": true}'), (None, None)
+    ]
+    assert rows[-1].last_name == "" and not columns["last_name"]["nullable"]
+    assert all(row.updated_at for row in rows) and not columns["updated_at"]["nullable"]
+    assert matches == [3] and len(triggers) == 3
+
+def test_upgrade_adopts_a_database_created_by_create_all(tmp_path):
+    path = tmp_path / "contacts.db"
+    engine = create_engine(f"sqlite:///{path}")
+    lifecycle.setup_database(engine)
+    engine.dispose()
+    config = alembic_config(path)
+
+    command.upgrade(config, "head")
+    command.check(config)
+    command.downgrade(config, "base")
+
+    with sqlite3.connect(path) as conn:
+        tables = {name for name, in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    assert tables >= {"alembic_version", "backfill_checkpoints"} and "contacts" not in tables
+
+@pytest.mark.parametrize("revision", ["0004", "0007"])
+def test_offline_sql_defers_backfills(revision, capsys):
+    config = Config()
+    config.set_main_option("script_location", str(MIGRATIONS))
+    config.set_main_option("sqlalchemy.url", "postgresql://localhost/contacts_api")
+
+    command.upgrade(config, f"{int(revision) - 1:04d}:{revision}", sql=True)
+
+    sql = capsys.readouterr().out
+    assert "python -m contacts_api.backfill run" in sql and "CREATE INDEX CONCURRENTLY" in sql
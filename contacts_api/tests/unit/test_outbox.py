@@ -0,0 +1,205 @@
+import asyncio
+import socket
+from datetime import timedelta
+import pytest
+from aiosmtpd.controller import Controller
+from sqlalchemy.orm import sessionmaker
+from contacts_api import outbox
+from contacts_api.models import OutboxEmail
+
+class RecordingHandler:
+    """aiosmtpd handler that records delivered messages and can reject recipients."""
+
+    def __init__(self):
+        self.messages = []
+        self.sessions = set()
+        self.responses = {}
+
+    async def handle_RCPT(self, server, session, envelope, address, rcpt_options):
+        response = self.responses.get(address)
+        if response:
+            return response
+        envelope.rcpt_tos.append(address)
+        return "250 OK"
+
+    async def handle_DATA(self, server, session, envelope):
+        self.sessions.add(id(session))
+        self.messages.append(envelope)
+        return "250 Message accepted for delivery"
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+@pytest.fixture
+def smtp_server():
+    handler = RecordingHandler()
+    controller = Controller(handler, hostname="127.0.0.1", port=free_port())
+    controller.start()
+    try:
+        yield handler, controller
+    finally:
+        controller.stop()
+
+@pytest.fixture
+def make_worker(db_session, smtp_server):
+    _, controller = smtp_server
+    factory = sessionmaker(bind=db_session.get_bind())
+
+    def make(**kwargs):
+        smtp = outbox.SMTPConnection(
+            hostname=controller.hostname, port=controller.port, use_tls=False, start_tls=False, login=False
+        )
+        return outbox.OutboxWorker(session_factory=factory, smtp=smtp, **kwargs)
+
+    return make
+
+def test_enqueue_only_stores_the_message(db_session):
+    message = outbox.enqueue_email(db_session, "a@example.com", "Hi", "Body")
+
+    assert message.status == outbox.PENDING
+    assert outbox.outbox_stats(db_session) == {"pending": 1, "sending": 0, "sent": 0, "dead": 0}
+
+def test_batch_is_delivered_over_one_session(db_session, smtp_server, make_worker):
+    handler, _ = smtp_server
+    for i in range(5):
+        outbox.enqueue_email(db_session, f"user{i}@example{i}.com", "Hi", f"Body {i}")
+    worker = make_worker(batch_size=10)
+
+    async def deliver():
+        claimed = await worker.process_batch()
+        await worker.smtp.close()
+        return claimed
+
+    assert asyncio.run(deliver()) == 5
+    assert len(handler.messages) == 5
+    assert len(handler.sessions) == 1
+    assert worker.smtp.connects == 1
+    db_session.expire_all()
+    assert outbox.outbox_stats(db_session)["sent"] == 5
+
+def test_transient_failure_backs_off(db_session, smtp_server, make_worker):
+    handler, _ = smtp_server
+    handler.responses["busy@example.com"] = "451 Try again later"
+    message = outbox.enqueue_email(db_session, "busy@example.com", "Hi", "Body")
+    before = outbox.utcnow()
+
+    asyncio.run(make_worker().process_batch())
+
+    db_session.refresh(message)
+    assert message.status == outbox.PENDING
+    assert message.attempts == 1
+    assert "451" in message.last_error
+    assert message.next_attempt_at >= before + timedelta(seconds=outbox.retry_delay(1))
+
+def test_permanent_failure_is_dead_lettered(db_session, smtp_server, make_worker):
+    handler, _ = smtp_server
+    handler.responses["nobody@example.com"] = "550 No such user"
+    message = outbox.enqueue_email(db_session, "nobody@example.com", "Hi", "Body")
+
+    asyncio.run(make_worker().process_batch())
+
+    db_session.refresh(message)
+    assert message.status == outbox.DEAD
+    assert outbox.requeue_dead(db_session) == 1
+    db_session.refresh(message)
+    assert (message.status, message.attempts) == (outbox.PENDING, 0)
+
+def test_last_attempt_is_dead_lettered(db_session, smtp_server, make_worker, monkeypatch):
+    handler, _ = smtp_server
+    handler.responses["busy@example.com"] = "451 Try again later"
+    monkeypatch.setattr(outbox.settings, "EMAIL_MAX_ATTEMPTS", 2)
+    message = outbox.enqueue_email(db_session, "busy@example.com", "Hi", "Body")
+    message.attempts = 1
+    db_session.commit()
+
+    asyncio.run(make_worker().process_batch())
+
+    db_session.refresh(message)
+    assert (message.status, message.attempts) == (outbox.DEAD, 2)
+
+def test_unexpected_error_fails_only_its_message(db_session, smtp_server, make_worker, monkeypatch):
+    handler, _ = smtp_server
+    build_message = outbox.build_message
+
+    def broken_for_bad(row):
+        if row.recipient == "bad@example.org":
+            raise UnicodeEncodeError("ascii", "", 0, 1, "boom")
+        return build_message(row)
+
+    monkeypatch.setattr(outbox, "build_message", broken_for_bad)
+    bad = outbox.enqueue_email(db_session, "bad@example.org", "Hi", "Body")
+    outbox.enqueue_email(db_session, "good@example.com", "Hi", "Body")
+
+    assert asyncio.run(make_worker().process_batch()) == 2
+
+    assert [e.rcpt_tos[0] for e in handler.messages] == ["good@example.com"]
+    db_session.refresh(bad)
+    assert (bad.status, bad.attempts) == (outbox.PENDING, 1) and "UnicodeEncodeError" in bad.last_error
+
+def test_outcomes_are_recorded_when_the_batch_is_interrupted(db_session, smtp_server, make_worker):
+    for recipient in ("first@example.com", "second@example.org"):
+        outbox.enqueue_email(db_session, recipient, "Hi", "Body")
+    worker = make_worker()
+    send = worker.smtp.send
+
+    async def send_then_stop(message):
+        if message["To"] == "second@example.org":
+            raise asyncio.CancelledError
+        await send(message)
+
+    worker.smtp.send = send_then_stop
+    with pytest.raises(asyncio.CancelledError):
+        asyncio.run(worker.process_batch())
+
+    db_session.expire_all()
+    assert outbox.outbox_stats(db_session) == {"pending": 0, "sending": 1, "sent": 1, "dead": 0}
+
+def test_claim_that_never_finished_its_last_attempt_is_dead_lettered(db_session, monkeypatch):
+    monkeypatch.setattr(outbox.settings, "EMAIL_MAX_ATTEMPTS", 2)
+    message = outbox.enqueue_email(db_session, "poison@example.com", "Hi", "Body")
+    factory = sessionmaker(bind=db_session.get_bind())
+
+    for _ in range(2):
+        [row] = outbox.claim_batch(factory(), 10)
+        db_session.refresh(message)
+        message.next_attempt_at = outbox.utcnow()
+        db_session.commit()
+
+    assert outbox.claim_batch(factory(), 10) == []
+    db_session.refresh(message)
+    assert (message.status, message.attempts) == (outbox.DEAD, 2)
+
+def test_domain_rate_limit_defers_messages(db_session, smtp_server, make_worker):
+    handler, _ = smtp_server
+    for i in range(3):
+        outbox.enqueue_email(db_session, f"user{i}@example.com", "Hi", "Body")
+    outbox.enqueue_email(db_session, "other@example.org", "Hi", "Body")
+    worker = make_worker(rate_limiter=outbox.DomainRateLimiter(per_minute=1))
+
+    asyncio.run(worker.process_batch())
+
+    assert sorted(e.rcpt_tos[0] for e in handler.messages) == ["other@example.org", "user0@example.com"]
+    db_session.expire_all()
+    deferred = db_session.query(OutboxEmail).filter(OutboxEmail.status == outbox.PENDING).all()
+    assert len(deferred) == 2
+    assert all(m.attempts == 0 and m.next_attempt_at > outbox.utcnow() for m in deferred)
+
+def test_worker_wakes_on_notify(db_session, smtp_server, make_worker):
+    handler, _ = smtp_server
+    worker = make_worker(poll_interval=60)
+
+    async def scenario():
+        worker.start()
+        await asyncio.sleep(0.1)
+        outbox.enqueue_email(db_session, "a@example.com", "Hi", "Body")
+        worker.notify()
+        for _ in range(50):
+            if handler.messages:
+                break
+            await asyncio.sleep(0.05)
+        await worker.stop()
+
+    asyncio.run(scenario())
+    assert len(handler.messages) == 1
@@ -0,0 +1,40 @@
+import asyncio
+import pytest
+from fastapi import HTTPException
+from passlib.context import CryptContext
+from contacts_api import passwords
+from contacts_api.config import settings
+
+def test_hash_and_verify_on_pool():
+    hashed = asyncio.run(passwords.hash_password("secret"))
+
+    assert asyncio.run(passwords.verify_password("secret", hashed))
+    assert not asyncio.run(passwords.verify_password("wrong", hashed))
+    assert passwords.queue_depth() == 0
+
+def test_full_queue_is_rejected(monkeypatch):
+    monkeypatch.setattr(settings, "PASSWORD_HASH_QUEUE_LIMIT", 0)
+
+    with pytest.raises(HTTPException) as exc:
+        asyncio.run(passwords.hash_password("secret"))
+
+    assert exc.value.status_code == 503
+    assert exc.value.headers["Retry-After"] == "1"
+
+def test_verify_and_update_rehashes_weaker_hash():
+    weak = CryptContext(schemes=["bcrypt"], bcrypt__rounds=settings.BCRYPT_ROUNDS - 1).hash("secret")
+
+    valid, new_hash = asyncio.run(passwords.verify_and_update("secret", weak))
+    assert valid
+    assert new_hash is not None and new_hash != weak
+
+    assert asyncio.run(passwords.verify_and_update("secret", new_hash)) == (True, None)
+    assert asyncio.run(passwords.verify_and_update("wrong", weak)) == (False, None)
+
+def test_hash_password_utils_import():
+    from contacts_api.utils import hash_password as utils
+
+    hashed = utils.hash_password("secret")
+
+    assert utils.verify_password("secret", hashed)
+    assert utils.crypt_context() is passwords.crypt_context()
@@ -0,0 +1,73 @@
+import logging
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import select, text
+from contacts_api import query_budget
+from contacts_api.models import Contact, User
+
+@pytest.fixture
+def db(db_session):
+    query_budget.instrument_engine(db_session.get_bind())
+    return db_session
+
+def add_contacts(db, count: int):
+    for i in range(count):
+        user = User(username=f"u{i}", email=f"u{i}@example.com", hashed_password="x")
+        db.add(user)
+        db.flush()
+        db.add(Contact(user_id=user.id, first_name="A", last_name="B", email=f"c{i}@example.com", phone_number="1"))
+    db.commit()
+
+def test_lazy_loads_are_flagged_as_n_plus_one(db):
+    add_contacts(db, 8)
+
+    with query_budget.track_queries() as tracker:
+        owners = [contact.owner.username for contact in db.scalars(select(Contact))]
+
+    assert len(owners) == 8
+    assert tracker.count == 9
+    [(statement, count)] = tracker.repeated().items()
+    assert count == 8 and "FROM users" in statement
+
+def test_raise_mode_fails_the_query_over_budget(db):
+    with query_budget.track_queries(budget=1, raise_errors=True) as tracker:
+        db.execute(text("SELECT 1"))
+        with pytest.raises(query_budget.QueryBudgetExceeded):
+            db.execute(text("SELECT 2"))
+    assert tracker.count == 2
+
+def test_queries_outside_a_tracker_are_ignored(db):
+    db.execute(text("SELECT 1"))
+
+    assert query_budget.current_tracker.get() is None
+
+def test_middleware_logs_routes_over_budget(db, caplog):
+    app = FastAPI()
+    app.add_middleware(query_budget.QueryBudgetMiddleware, mode="log")
+
+    @app.get("/items")
+    @query_budget.declare(1)
+    def items():
+        db.execute(text("SELECT 1"))
+        db.execute(text("SELECT 2"))
+        return []
+
+    with caplog.at_level(logging.WARNING, logger="contacts_api.query_budget"):
+        assert TestClient(app).get("/items").status_code == 200
+
+    assert "GET /items: 2 queries exceed the budget of 1" in caplog.text
+
+def test_middleware_raise_mode(db):
+    app = FastAPI()
+    app.add_middleware(query_budget.QueryBudgetMiddleware, mode="raise")
+
+    @app.get("/items")
+    @query_budget.declare(1)
+    def items():
+        db.execute(text("SELECT 1"))
+        db.execute(text("SELECT 2"))
+        return []
+
+    with pytest.raises(query_budget.QueryBudgetExceeded):
+        TestClient(app).get("/items")
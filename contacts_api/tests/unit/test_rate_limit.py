@@ -0,0 +1,123 @@
+import asyncio
+import pytest
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+from redis.exceptions import RedisError
+from sqlalchemy import event
+from contacts_api import passwords, rate_limit
+from contacts_api.database import get_session
+from contacts_api.models import User
+from contacts_api.rate_limit import MemoryBackend, Rate, RateLimiter, parse_rate
+from contacts_api.routers import auth as auth_router
+
+@pytest.fixture(autouse=True)
+def clear_limits():
+    rate_limit.limiter.memory.clear()
+
+def test_parse_rate():
+    assert parse_rate("5/minute") == Rate(5, 60)
+    assert parse_rate("100 / hours") == Rate(100, 3600)
+    assert parse_rate("10/30second") == Rate(10, 30)
+    assert parse_rate("") is None
+    assert parse_rate("0/minute") is None
+    with pytest.raises(ValueError):
+        parse_rate("5 per minute")
+
+def test_limit_within_one_window():
+    backend = MemoryBackend(maxsize=10)
+    rate = Rate(5, 60)
+
+    assert [backend.hit("k", rate, now=600.0 + i) for i in range(5)] == [0] * 5
+    retry_after = backend.hit("k", rate, now=610.0)
+
+    # The fifth hit only leaves the window once it has become the previous one and decayed
+    assert retry_after == pytest.approx(50 + 60 * (1 - 4 / 5))
+    assert backend.hit("k", rate, now=610.0 + retry_after + 0.01) == 0
+
+def test_previous_window_is_weighted():
+    backend = MemoryBackend(maxsize=10)
+    rate = Rate(4, 60)
+    for _ in range(4):
+        backend.hit("k", rate, now=0.0)
+
+    # A quarter into the next window, 3 of the previous 4 hits still count
+    assert backend.hit("k", rate, now=75.0) == 0
+    assert backend.hit("k", rate, now=75.0) > 0
+    # After two idle windows nothing counts any more
+    assert backend.hit("k", rate, now=300.0) == 0
+
+def test_keys_are_bounded():
+    backend = MemoryBackend(maxsize=3)
+    for key in "abcd":
+        backend.hit(key, Rate(1, 60), now=0.0)
+
+    assert list(backend._windows) == ["b", "c", "d"]
+
+def test_redis_errors_fall_back_to_memory():
+    class BrokenRedis:
+        calls = 0
+
+        def register_script(self, script):
+            BrokenRedis.calls += 1
+            raise RedisError("down")
+
+    limiter = RateLimiter(use_redis=True, redis_factory=BrokenRedis)
+
+    async def hits():
+        return [await limiter.hit("k", Rate(2, 60)) for _ in range(3)]
+
+    first, second, third = asyncio.run(hits())
+    assert (first, second) == (0, 0) and third > 0
+    assert BrokenRedis.calls == 1
+
+@pytest.mark.parametrize("proxies,forwarded,expected", [
+    (1, "203.0.113.7", "203.0.113.7"),
+    (1, "1.2.3.4, 203.0.113.7", "203.0.113.7"),
+    (2, "1.2.3.4, 203.0.113.7, 10.0.0.2", "203.0.113.7"),
+    (2, "203.0.113.7", "testclient"),
+    (1, "", "testclient"),
+])
+def test_client_ip_skips_entries_the_client_sent(monkeypatch, proxies, forwarded, expected):
+    monkeypatch.setattr(rate_limit.settings, "RATE_LIMIT_TRUST_FORWARDED", True)
+    monkeypatch.setattr(rate_limit.settings, "RATE_LIMIT_TRUSTED_PROXIES", proxies)
+    request = Request({"type": "http", "headers": [(b"x-forwarded-for", forwarded.encode())], "client": ("testclient", 1)})
+
+    assert rate_limit.client_ip(request) == expected
+
+@pytest.fixture
+def login_client(db_session, monkeypatch):
+    verified = []
+
+    async def verify_and_update(password, hashed):
+        verified.append(password)
+        return False, None
+
+    monkeypatch.setattr(passwords, "verify_and_update", verify_and_update)
+    monkeypatch.setattr(rate_limit.settings, "RATE_LIMIT_LOGIN_PER_USERNAME", "3/minute")
+    db_session.add(User(username="victim", email="victim@example.com", hashed_password="x"))
+    db_session.commit()
+    app = FastAPI()
+    app.include_router(auth_router.router)
+    app.dependency_overrides[get_session] = lambda: db_session
+    return TestClient(app), verified
+
+def test_login_is_throttled_per_username_before_any_work(login_client, db_session):
+    client, verified = login_client
+    queries = []
+    event.listen(db_session.get_bind(), "before_cursor_execute", lambda *args: queries.append(args[2]))
+
+    statuses = [client.post("/login", data={"username": "victim", "password": "guess"}).status_code for _ in range(3)]
+    queries.clear()
+    denied = client.post("/login", data={"username": "Victim", "password": "guess"})
+
+    assert statuses == [400, 400, 400]
+    assert denied.status_code == 429
+    assert int(denied.headers["retry-after"]) >= 1
+    assert queries == [] and len(verified) == 3
+    assert client.post("/login", data={"username": "someone-else", "password": "guess"}).status_code == 400
+
+def test_limits_can_be_disabled(login_client, monkeypatch):
+    client, _ = login_client
+    monkeypatch.setattr(rate_limit.settings, "RATE_LIMIT_ENABLED", False)
+
+    assert all(client.post("/login", data={"username": "u", "password": "p"}).status_code == 400 for _ in range(5))
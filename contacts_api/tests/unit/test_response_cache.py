@@ -0,0 +1,132 @@
+import asyncio
+import pytest
+from sqlalchemy import event
+from contacts_api import crud, response_cache, schemas
+
+@pytest.fixture(autouse=True)
+def clear_caches():
+    response_cache.contacts_versions.l1.clear()
+    response_cache.response_cache.clear()
+
+def count_queries(db):
+    statements = []
+    event.listen(db.get_bind(), "before_cursor_execute", lambda *args: statements.append(args[2]))
+    return statements
+
+def contact_data(**overrides):
+    return {"first_name": "Ada", "last_name": "Lovelace", "email": "ada@example.com",
+            "phone_number": "123", "birthday": None, "extra_data": None, **overrides}
+
+def test_writes_bump_the_version(db_session, user):
+    assert crud.get_contacts_version(db_session, user.id) == 0
+
+    contact = crud.create_contact(db_session, user.id, contact_data())
+    crud.update_contact(db_session, user.id, contact.id, {"first_name": "Augusta"})
+    crud.delete_contact(db_session, user.id, contact.id)
+    crud.delete_contact(db_session, user.id, contact.id)
+
+    assert crud.get_contacts_version(db_session, user.id) == 3
+
+def test_commit_drops_the_cached_version(db_session, user):
+    assert asyncio.run(response_cache.get_contacts_version(db_session, user.id)) == 0
+    assert response_cache.contacts_versions.l1.get(user.id) is not None
+
+    crud.create_contact(db_session, user.id, contact_data())
+
+    assert response_cache.contacts_versions.l1.get(user.id) is None
+    assert asyncio.run(response_cache.get_contacts_version(db_session, user.id)) == 1
+
+def test_if_none_match_is_answered_without_queries(api, db_session, user):
+    crud.create_contact(db_session, user.id, contact_data())
+    first = api.get("/contacts/")
+    assert first.status_code == 200
+    assert first.json()["items"][0]["first_name"] == "Ada"
+    etag = first.headers["etag"]
+
+    queries = count_queries(db_session)
+    second = api.get("/contacts/", headers={"If-None-Match": etag})
+
+    assert second.status_code == 304
+    assert second.headers["etag"] == etag
+    assert queries == []
+
+def test_contact_is_encoded_like_contact_out(api, db_session, user):
+    contact = crud.create_contact(db_session, user.id, contact_data(tags=["work"], extra_data={"company": "Acme"}))
+
+    response = api.get(f"/contacts/{contact.id}")
+
+    assert response.content == schemas.ContactOut.model_validate(contact).model_dump_json().encode()
+
+def test_write_changes_the_etag(api, db_session, user):
+    contact = crud.create_contact(db_session, user.id, contact_data())
+    etag = api.get(f"/contacts/{contact.id}").headers["etag"]
+
+    api.put(f"/contacts/{contact.id}", json={"first_name": "Augusta"})
+    response = api.get(f"/contacts/{contact.id}", headers={"If-None-Match": etag})
+
+    assert response.status_code == 200
+    assert response.headers["etag"] != etag
+    assert response.json()["first_name"] == "Augusta"
+
+def test_etag_depends_on_parameters(api, db_session, user):
+    crud.create_contact(db_session, user.id, contact_data())
+
+    assert api.get("/contacts/?limit=1").headers["etag"] != api.get("/contacts/?limit=2").headers["etag"]
+    assert api.get("/contacts/birthdays/?days=7").headers["etag"] != api.get("/contacts/birthdays/?days=30").headers["etag"]
+
+def test_response_cache_serves_repeat_reads(api, db_session, user, monkeypatch):
+    monkeypatch.setattr(response_cache.settings, "RESPONSE_CACHE_ENABLED", True)
+    crud.create_contact(db_session, user.id, contact_data())
+    first = api.get("/contacts/")
+
+    queries = count_queries(db_session)
+    second = api.get("/contacts/")
+
+    assert second.content == first.content
+    assert queries == []
+
+def test_missing_contact_is_not_cached(api, monkeypatch):
+    monkeypatch.setattr(response_cache.settings, "RESPONSE_CACHE_ENABLED", True)
+
+    assert api.get("/contacts/999").status_code == 404
+    assert response_cache.response_cache.stats()["size"] == 0
+
+def test_changes_feed(api, db_session, user):
+    contact = crud.create_contact(db_session, user.id, contact_data())
+    full = api.get("/contacts/changes").json()
+    assert [item["id"] for item in full["items"]] == [contact.id]
+
+    api.delete(f"/contacts/{contact.id}")
+    changes = api.get("/contacts/changes", params={"since": full["next_cursor"]}).json()
+
+    [tombstone] = changes["items"]
+    assert set(tombstone) == {"id", "updated_at", "deleted_at"}
+    assert tombstone["id"] == contact.id and tombstone["deleted_at"] is not None
+    assert api.get("/contacts/changes", params={"since": "bogus"}).status_code == 400
+
+def test_multi_get_by_ids(api, db_session, user):
+    ids = [crud.create_contact(db_session, user.id, contact_data(email=f"c{i}@example.com")).id for i in range(3)]
+    crud.delete_contact(db_session, user.id, ids[1])
+
+    queries = count_queries(db_session)
+    response = api.get("/contacts/", params={"ids": f"{ids[2]},{ids[1]},{ids[0]},999", "fields": "id,first_name"})
+
+    assert response.json()["items"] == [{"id": ids[2], "first_name": "Ada"}, {"id": ids[0], "first_name": "Ada"}]
+    assert len([sql for sql in queries if "FROM contacts" in sql]) == 1
+    assert api.get("/contacts/", params={"ids": "1,x"}).status_code == 400
+
+def test_facets_are_cached_until_a_write(api, db_session, monkeypatch):
+    monkeypatch.setattr(response_cache.settings, "RESPONSE_CACHE_ENABLED", False)
+    api.post("/contacts/", json=contact_data(tags=["work"]))
+    first = api.get("/contacts/facets")
+    statements = count_queries(db_session)
+
+    assert api.get("/contacts/facets").content == first.content
+    assert not statements
+
+    api.post("/contacts/", json=contact_data(email="bob@other.org", tags=["work", "friends"]))
+    facets = api.get("/contacts/facets").json()
+
+    assert first.json()["tags"] == [{"value": "work", "count": 1}]
+    assert facets["tags"] == [{"value": "work", "count": 2}, {"value": "friends", "count": 1}]
+    assert facets["email_domains"] == [{"value": "example.com", "count": 1}, {"value": "other.org", "count": 1}]
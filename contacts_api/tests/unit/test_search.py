@@ -0,0 +1,43 @@
+import pytest
+from contacts_api import search
+from contacts_api.models import Contact, User
+
+@pytest.fixture
+def user(db_session):
+    search.ensure_search_index(db_session.get_bind())
+    user = User(username="owner", email="owner@example.com", hashed_password="x")
+    other = User(username="other", email="other@example.com", hashed_password="x")
+    db_session.add_all([user, other])
+    db_session.commit()
+    db_session.add_all([
+        Contact(first_name="Johnathan", last_name="Smith", email="jsmith@example.com", user_id=user.id),
+        Contact(first_name="Joan", last_name="Smithers", email="joan@acme.io", user_id=user.id),
+        Contact(first_name="Mary", last_name="Jones", email="mary@example.com", user_id=user.id),
+        Contact(first_name="John", last_name="Smith", email="john@example.com", user_id=other.id),
+    ])
+    db_session.commit()
+    return user
+
+def names(contacts):
+    return [contact.first_name for contact in contacts]
+
+def test_search_matches_word_prefixes_for_own_contacts_only(db_session, user):
+    assert names(search.search_contacts(db_session, user.id, "smi")) == ["Johnathan", "Joan"]
+    assert names(search.search_contacts(db_session, user.id, "jo smithers")) == ["Joan"]
+    assert names(search.search_contacts(db_session, user.id, "acme")) == ["Joan"]
+
+def test_search_tolerates_typos(db_session, user):
+    assert names(search.search_contacts(db_session, user.id, "jnoes")) == ["Mary"]
+
+def test_search_index_follows_updates_and_deletes(db_session, user):
+    mary = db_session.query(Contact).filter(Contact.first_name == "Mary").one()
+    mary.last_name = "Watson"
+    db_session.commit()
+    assert names(search.search_contacts(db_session, user.id, "watson")) == ["Mary"]
+
+    db_session.delete(mary)
+    db_session.commit()
+    assert search.search_contacts(db_session, user.id, "watson") == []
+
+def test_search_applies_limit(db_session, user):
+    assert len(search.search_contacts(db_session, user.id, "example", limit=1)) == 1
@@ -0,0 +1,35 @@
+from datetime import date, datetime, timezone
+from pydantic import TypeAdapter
+from contacts_api import schemas, serialization
+from contacts_api.models import Contact
+
+contact_list_adapter = TypeAdapter(list[schemas.ContactOut])
+
+CONTACTS = [
+    Contact(id=1, first_name="Zoë", last_name="Ødegaard", email="zoe@example.com", phone_number="+47 1",
+            birthday=date(1990, 2, 28), extra_data={"company": "Acme", "employees": 12, "vip": True}, tags=["friends", "work"]),
+    Contact(id=2, first_name="Bob", last_name='O"Neil', email=None, phone_number=None, birthday=None, extra_data=None, tags=[]),
+]
+
+def test_contact_dicts_encode_like_contact_out():
+    expected = contact_list_adapter.dump_json(contact_list_adapter.validate_python(CONTACTS, from_attributes=True))
+
+    assert serialization.dumps(serialization.contact_dicts(CONTACTS)) == expected
+
+def test_row_dicts_encode_like_contact_out():
+    rows = [tuple(getattr(contact, name) for name in serialization.CONTACT_OUT_FIELDS) for contact in CONTACTS]
+    expected = contact_list_adapter.dump_json(contact_list_adapter.validate_python(CONTACTS, from_attributes=True))
+
+    assert serialization.dumps(serialization.row_dicts(rows)) == expected
+
+def test_datetimes_are_written_like_pydantic():
+    values = [datetime(2024, 5, 1, 12, 30, 0, 123456), datetime(2024, 5, 1, tzinfo=timezone.utc)]
+
+    assert serialization.dumps(values) == TypeAdapter(list[datetime]).dump_json(values)
+
+def test_orjson_response():
+    response = serialization.ORJSONResponse({"when": date(2024, 1, 2)}, status_code=201)
+
+    assert response.status_code == 201
+    assert response.body == b'{"when":"2024-01-02"}'
+    assert response.headers["content-type"] == "application/json"
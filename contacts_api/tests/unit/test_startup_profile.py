@@ -0,0 +1,55 @@
+import subprocess
+import sys
+from contacts_api import startup_profile
+
+IMPORTTIME = """\
+import time: self [us] | cumulative | imported package
+import time:       120 |        120 |     _io
+import time:      1500 |       1500 |       sqlalchemy.sql.base
+import time:       500 |       2000 |     sqlalchemy.sql
+import time:       250 |       2250 |   sqlalchemy
+import time:      3000 |       5370 | contacts_api.main
+"""
+
+def test_parse_importtime():
+    modules = startup_profile.parse_importtime(IMPORTTIME)
+
+    assert [module["module"] for module in modules] == ["_io", "sqlalchemy.sql.base", "sqlalchemy.sql", "sqlalchemy", "contacts_api.main"]
+    assert [module["depth"] for module in modules] == [2, 3, 2, 1, 0]
+    assert modules[1]["self_ms"] == 1.5 and modules[-1]["cumulative_ms"] == 5.37
+
+def test_by_package_sums_self_time():
+    totals = startup_profile.by_package(startup_profile.parse_importtime(IMPORTTIME))
+
+    assert totals == {"contacts_api": 3.0, "sqlalchemy": 2.25, "_io": 0.12}
+    assert list(totals) == ["contacts_api", "sqlalchemy", "_io"]
+
+def test_optional_integrations_are_not_imported_with_the_app():
+    code = (
+        "import sys, contacts_api.main; "
+        "print(sorted(m for m in ('redis', 'passlib', 'aiosmtplib', 'PIL', 'cloudinary') if m in sys.modules))"
+    )
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+
+    assert result.stdout.strip() == "[]"
+
+def test_settings_resolve_on_first_use():
+    code = (
+        "import sys; from contacts_api import config; "
+        "loaded = config.get_settings.cache_info().currsize; "
+        "config.settings.DB_POOL_SIZE; "
+        "print(loaded, config.get_settings.cache_info().currsize)"
+    )
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+
+    assert result.stdout.split() == ["0", "1"]
+
+def test_app_imports_without_settings():
+    code = (
+        "from contacts_api import config; "
+        "import contacts_api.main, contacts_api.server; "
+        "print(config.get_settings.cache_info().currsize)"
+    )
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+
+    assert result.stdout.strip() == "0"
@@ -1,60 +1,88 @@
-import os
-from fastapi import APIRouter, UploadFile, Depends, HTTPException
-from sqlalchemy.orm import Session
-from dotenv import load_dotenv
-import cloudinary
-import cloudinary.uploader
-from contacts_api.database import get_db
-from contacts_api.models import User
-from contacts_api.dependencies import get_current_user
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from fastapi.responses import RedirectResponse
+from contacts_api import async_crud, avatars
+from contacts_api.database import get_session
+from contacts_api.user import get_current_user
 
 router = APIRouter()
 
-load_dotenv()
+def etag_matches(header: str, etag: str) -> bool:
+    """
+    Evaluates an If-None-Match header against an ETag, with the weak comparison it calls for.
+
+    Args:
+        header (str): The header value: ``*`` or a comma-separated list of entity tags.
+        etag (str): The current strong ETag.
 
-cloudinary.config(
-    cloud_name=os.getenv("CLOUDINARY_CLOUD_NAME"),
-    api_key=os.getenv("CLOUDINARY_API_KEY"),
-    api_secret=os.getenv("CLOUDINARY_API_SECRET"),
-)
+    Returns:
+        bool: Whether the client's copy is current.
+    """
+    tags = [tag.strip().removeprefix("W/") for tag in header.split(",")]
+    return "*" in tags or etag in tags
 
-MAX_FILE_SIZE = 2 * 1024 * 1024  # 2MB
-ALLOWED_CONTENT_TYPES = {"image/jpeg", "image/png", "image/jpg"}
+# Variants are immutable, so clients and proxies may keep them for a year
+AVATAR_CACHE_CONTROL = "public, max-age=31536000, immutable"
 
 @router.put("/me/avatar/")
-def update_avatar(
-    file: UploadFile, 
-    user: User = Depends(get_current_user), 
-    db: Session = Depends(get_db)
-):
+async def update_avatar(request: Request, user=Depends(get_current_user), db=Depends(get_session)):
     """Updates the avatar of the authenticated user.
 
+    The image is sent as the raw request body or as the `file` field of a
+    multipart form. It is resized to 64, 256 and 512 px WebP variants; the
+    256 px one becomes the user's `avatar_url`.
+
     Args:
-        file (UploadFile): The uploaded avatar file.
-        user (User): The currently authenticated user.
-        db (Session): Database session.
+        request (Request): The upload request.
+        user (UserCached): The currently authenticated user.
+        db (AsyncSession or Session): Database session.
 
     Raises:
-        HTTPException: If the file size exceeds 2MB.
-        HTTPException: If the file type is unsupported.
-        HTTPException: If there's an error uploading the file.
+        HTTPException: If the file size exceeds AVATAR_MAX_FILE_SIZE.
+        HTTPException: If the file is not a JPEG, PNG or WebP image.
+        HTTPException: If there's an error storing the file.
 
     Returns:
-        dict: Success message and the URL of the uploaded avatar.
+        dict: Success message, the URL of the avatar and the URLs of all variants.
     """
-
-    file_size = file.file.seek(0, 2)  
-    if file_size > MAX_FILE_SIZE:
-        raise HTTPException(status_code=413, detail="File too large. Max size is 2MB.")
-    file.file.seek(0)  
-    
-    if file.content_type not in ALLOWED_CONTENT_TYPES:
-        raise HTTPException(status_code=415, detail="Invalid file type. Only JPEG and PNG allowed.")
-
+    data = await avatars.read_upload(request)
     try:
-        result = cloudinary.uploader.upload(file.file, folder="avatars/")
-        user.avatar_url = result["secure_url"]
-        db.commit()
-        return {"message": "Avatar updated successfully.", "avatar_url": user.avatar_url}
+        urls = await avatars.process_avatar(user.id, data)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error uploading file: {str(e)}")
+    avatar_url = urls[avatars.DEFAULT_SIZE]
+    await async_crud.update_user(db, user.id, {"avatar_url": avatar_url})
+    return {"message": "Avatar updated successfully.", "avatar_url": avatar_url, "variants": urls}
+
+@router.get("/avatars/{user_id}/{name}")
+async def read_avatar(user_id: int, name: str, request: Request):
+    """Serves an avatar variant with a strong ETag.
+
+    Args:
+        user_id (int): The ID of the avatar's owner.
+        name (str): The variant file name, e.g. ``0123456789abcdef_64.webp``.
+        request (Request): The request, for If-None-Match.
+
+    Raises:
+        HTTPException: If the variant does not exist.
+
+    Returns:
+        Response: The WebP image, 304 if the client's copy is current, or a
+        redirect to the storage backend's URL.
+    """
+    key = f"{user_id}/{name}"
+    if not avatars.VARIANT_KEY.match(key):
+        raise HTTPException(status_code=404, detail="Avatar not found")
+    storage = avatars.get_storage()
+    data = await storage.load(key)
+    if data is None:
+        if isinstance(storage, avatars.LocalAvatarStorage):
+            raise HTTPException(status_code=404, detail="Avatar not found")
+        return RedirectResponse(storage.url(key), status_code=307)
+
+    etag = avatars.variant_etag(key)
+    headers = {"ETag": etag, "Cache-Control": AVATAR_CACHE_CONTROL}
+    if etag_matches(request.headers.get("if-none-match", ""), etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=data, media_type="image/webp", headers=headers)
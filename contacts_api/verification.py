@@ -1,6 +1,7 @@
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
-from contacts_api.database import get_db
+from contacts_api import rate_limit
+from contacts_api.database import get_db, get_session
 from contacts_api.models import User
 from contacts_api.dependencies import create_email_token, verify_email_token
 from contacts_api.user import get_current_user, send_email_verification
@@ -8,25 +9,27 @@ from contacts_api.user import get_current_user, send_email_verification
 router = APIRouter()
 
 @router.post("/verify-email/")
-def send_verification_email(
-    user: User = Depends(get_current_user), db: Session = Depends(get_db)
-):
-    """Sends a verification email to the user.
+async def send_verification_email(user=Depends(get_current_user), db=Depends(get_session)):
+    """Queues a verification email to the user.
 
     Args:
-        user (User): The currently authenticated user.
-        db (Session): Database session.
+        user (UserCached): The currently authenticated user.
+        db (AsyncSession or Session): Database session.
 
     Raises:
         HTTPException: If the user's email is already verified.
+        HTTPException: 429 if too many emails were sent to the address recently.
 
     Returns:
-        dict: A message indicating the email was sent.
+        dict: A message indicating the email was queued.
     """
     if user.is_verified:
         raise HTTPException(status_code=400, detail="Email already verified.")
+    await rate_limit.limiter.enforce(
+        "email_address", user.email.lower(), rate_limit.configured_rate("RATE_LIMIT_EMAIL_PER_ADDRESS")
+    )
     token = create_email_token(user.email)
-    send_email_verification(user.email, token)  
+    await send_email_verification(db, user.email, token)
     return {"message": "Verification email sent."}
 
 @router.get("/verify-email/{token}")